@@ -1,28 +1,206 @@
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+import argparse
+import hashlib
 import json
+import os
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from crawler import CrawlMetrics, backoff_delay, crawl_sync
+from doc_index import build_index, load_or_build
+from doc_store import DOCS_STORE_PATH, DocStore
+from extract import (RAW_HTML_DIR, ExtractPool, RawHtmlStore, boilerplate_lines, declared_charset, html_to_text,
+                     strip_boilerplate)
+from retriever import RETRIEVER_MODE
+from tracing import span, trace
+
+CRAWL_STATE_FILE = "crawl_state.json"      # ETag / Last-Modified / hash ต่อ URL
+CRAWL_CHANGES_FILE = "crawl_changes.json"  # รายการ ID ที่เปลี่ยนในรอบล่าสุด (เขียนเมื่อดัชนีพร้อม; qa_engine เฝ้าไฟล์นี้)
+FETCH_FAILED_TEXT = "ไม่สามารถดึงข้อมูลได้"
 
 # ฟังก์ชันสำหรับดึงข้อมูล HTML
 def fetch_html(url, retries=3, timeout=30):
-    for _ in range(retries):
+    result = fetch_html_conditional(url, retries=retries, timeout=timeout)
+    return result["text"]
+
+# header แบบมีเงื่อนไขจาก state เดิม (ส่งเฉพาะเมื่อมีข้อความเดิมให้ใช้ซ้ำได้)
+def _conditional_headers(prev_state=None, has_prev=False):
+    prev_state = prev_state or {}
+    headers = {}
+    if has_prev:
+        if prev_state.get("etag"):
+            headers["If-None-Match"] = prev_state["etag"]
+        if prev_state.get("last_modified"):
+            headers["If-Modified-Since"] = prev_state["last_modified"]
+    return headers
+
+# แปลงผลตอบกลับเป็น dict: etag, last_modified, hash, status ("changed" / "unchanged" / "failed")
+# หน้าที่เปลี่ยนได้ body + charset ไปเข้าขั้นตอน extract, หน้าที่ไม่เปลี่ยนใช้ข้อความเดิม
+# headers ต้องค้นด้วยชื่อตัวพิมพ์เล็กได้
+def _page_result(status, body, headers, charset=None, prev_state=None, has_prev=False):
+    prev_state = prev_state or {}
+    if status is None or status >= 400:
+        return {"status": "failed"}
+    etag = headers.get("etag", prev_state.get("etag"))
+    last_modified = headers.get("last-modified", prev_state.get("last_modified"))
+    if status == 304 and has_prev:
+        return {"etag": etag, "last_modified": last_modified,
+                "hash": prev_state.get("hash"), "status": "unchanged"}
+
+    content_hash = hashlib.sha256(body).hexdigest()
+    if has_prev and content_hash == prev_state.get("hash"):
+        # เนื้อหาเหมือนเดิม ไม่ต้อง parse ใหม่
+        return {"etag": etag, "last_modified": last_modified,
+                "hash": content_hash, "status": "unchanged"}
+
+    return {"body": body, "charset": charset or declared_charset(headers.get("content-type"), body),
+            "etag": etag, "last_modified": last_modified, "hash": content_hash, "status": "changed"}
+
+# ดึงหน้าเว็บหน้าเดียวแบบมีเงื่อนไข (synchronous) ด้วย requests
+def fetch_html_conditional(url, prev_state=None, prev_text=None, retries=3, timeout=30):
+    has_prev = prev_text is not None
+    headers = _conditional_headers(prev_state, has_prev)
+    for attempt in range(retries):
         try:
-            response = requests.get(url, timeout=timeout)
-            response.encoding = response.apparent_encoding
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # เอาเฉพาะเนื้อหาหลักของเว็บ
-            html_text = soup.get_text(separator="\n", strip=True)
-            return html_text
+            response = requests.get(url, timeout=timeout, headers=headers)
+            page = _page_result(response.status_code, response.content, response.headers,
+                                None, prev_state, has_prev)
+            if page["status"] == "changed":
+                page["text"] = html_to_text(page["body"], page["charset"])
+            elif page["status"] == "unchanged":
+                page["text"] = prev_text
+            return page
         except requests.exceptions.RequestException as e:
             print(f"❌ Error fetching {url}: {e}")
-            time.sleep(5)  # ลองใหม่หลังจาก 5 วินาที
-    return None
+            if attempt + 1 < retries:
+                time.sleep(backoff_delay(attempt))  # ลองใหม่แบบ exponential backoff + jitter
+    return {"text": None, "status": "failed"}
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _write_json(path, data, indent=None):
+    # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ ป้องกันไฟล์เสียถ้าเขียนไม่จบ
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+# ข้อความเดิมของแต่ละ URL อ่านจาก DocStore เมื่อต้องใช้เท่านั้น
+class _StoredText:
+    def __init__(self, store):
+        self.store = store
+        self.url_to_id = {m.get("URL"): m.get("ID") for m in store.metadata()}
+
+    def get(self, url):
+        doc_id = self.url_to_id.get(url)
+        body = self.store.get_body(doc_id) if doc_id is not None else None
+        return None if body in (None, FETCH_FAILED_TEXT) else body
+
+# เขียนผลของแต่ละหน้าลง store ทันทีที่ได้ข้อความ (เรียกได้ทั้งจาก event loop และ thread ของ extract pool)
+# - ตัด boilerplate ด้วยชุดบรรทัดของรอบก่อนและนับบรรทัดของรอบนี้ไว้ finish() เขียนซ้ำเฉพาะเมื่อชุดบรรทัดเปลี่ยน
+# - new_state / kinds (added/changed/unchanged เทียบกับ record ก่อนรอบนี้) อัปเดตทุก record และบันทึก
+#   crawl_state.json เป็นระยะ: หยุดกลางคันรอบหน้ายังส่ง ETag ของหน้าที่เขียนลง store แล้วได้
+class _StoreWriter:
+    CHECKPOINT_EVERY = 100
+
+    def __init__(self, store, rows, state, prev_text, raw_store):
+        self.store = store
+        self.rows = rows
+        self.state = state
+        self.prev_text = prev_text
+        self.raw_store = raw_store
+        self.chrome = raw_store.load_boilerplate()
+        self.new_state = {}
+        self.kinds = {}
+        self.statuses = [None] * len(rows)
+        self._before = {}  # ID -> hash ของ record ก่อนรอบนี้
+        self._counts = Counter()
+        self._n_texts = 0
+        self._written = 0
+        self._lock = threading.RLock()
+
+    def write(self, i, page, html_text):
+        url = self.rows[i]["URL"]
+        with self._lock:
+            self.statuses[i] = page["status"]
+            if page["status"] == "failed":
+                # ดึงไม่สำเร็จ: ใช้ข้อความรอบก่อน (ถ้ามี) แทนการเขียนทับด้วยข้อความ error
+                html_text = self.prev_text.get(url)
+                if html_text and url in self.state:
+                    self.new_state[url] = self.state[url]
+            elif html_text:
+                self.new_state[url] = {"etag": page.get("etag"), "last_modified": page.get("last_modified"),
+                                       "hash": page.get("hash")}
+            if html_text:
+                self._counts.update(set(html_text.splitlines()))
+                self._n_texts += 1
+            self._put(self.rows[i], strip_boilerplate(html_text, self.chrome))
+            self._written += 1
+            if self._written % self.CHECKPOINT_EVERY == 0:
+                self.checkpoint()
+
+    def checkpoint(self):
+        with self._lock:
+            _write_json(CRAWL_STATE_FILE, {**self.state, **self.new_state})
+
+    def _put(self, row, html_text):
+        result = {
+            "ID": row["ID"],
+            "URL": row["URL"],
+            "Header": row["Header"],
+            "Center": row["Center"],
+            "NamePage": row["NamePage"],
+            "Tag": row["Tag"],
+            "HTML": html_text if html_text else FETCH_FAILED_TEXT
+        }
+        doc_id = str(result["ID"])
+        if doc_id not in self._before:
+            self._before[doc_id] = self.store.digest(doc_id)
+        self.store.put(result)
+        before = self._before[doc_id]
+        self.kinds[doc_id] = ("added" if before is None else
+                              "changed" if self.store.digest(doc_id) != before else "unchanged")
+
+    def finish(self):
+        """ตัด boilerplate ด้วยชุดบรรทัดของรอบนี้ (เขียนเฉพาะหน้าที่ผลเปลี่ยน) แล้วเก็บชุดบรรทัดไว้ใช้รอบหน้า"""
+        chrome = boilerplate_lines(self._counts, self._n_texts)
+        if chrome != self.chrome:
+            for i, row in enumerate(self.rows):
+                text = self.raw_store.load_text(row["URL"]) if self.statuses[i] != "failed" else None
+                if text is None:
+                    # ไม่มีข้อความก่อนตัด (crawl รุ่นก่อน / ดึงไม่สำเร็จ) ใช้ข้อความที่เขียนไว้
+                    text = self.store.get_body(row["ID"])
+                if text and text != FETCH_FAILED_TEXT:
+                    self._put(row, strip_boilerplate(text, chrome))
+            self.chrome = chrome
+        self.raw_store.save_boilerplate(chrome)
+
+    def changes(self):
+        changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        for doc_id, kind in self.kinds.items():
+            changes[kind].append(doc_id)
+        return changes
 
 # ฟังก์ชันหลักที่ใช้โหลด CSV และดึงข้อมูล HTML
-def main():
+# incremental=True: ใช้ ETag/Last-Modified/hash จากรอบก่อน ไม่ดาวน์โหลด/parse หน้าที่ไม่เปลี่ยน
+# per_host / max_connections / rate: จำกัดการเชื่อมต่อต่อ host, การเชื่อมต่อรวม และคำขอต่อวินาที (0 = ไม่จำกัด)
+# reextract=True: ไม่ดึงเว็บ แต่ extract ข้อความใหม่จาก HTML ดิบที่เก็บไว้
+def main(incremental=True, per_host=4, max_connections=32, rate=0.0, reextract=False):
+    # ทุกขั้นตอน (fetch / extract / store / index / embed) เป็น span ของ trace "crawl"
+    # (QA_TRACE_LOG=- พิมพ์ trace เป็น JSON, QA_PROFILE_DIR=dir เก็บ cProfile ของทั้งรอบ)
+    with trace("crawl", incremental=incremental, reextract=reextract) as t:
+        _crawl(incremental, per_host, max_connections, rate, reextract)
+    print("ℹ️ stages: " + ", ".join(f"{s.name} {s.duration:.2f}s" for s in t.spans if s.depth == 0))
+
+def _crawl(incremental, per_host, max_connections, rate, reextract):
     # โหลดไฟล์ CSV
     csv_file = "ข้อมูลลิงก์เว็บ - BIO-INDUSTRIES.csv"
     df = pd.read_csv(csv_file)
@@ -33,36 +211,108 @@ def main():
         if col not in df.columns:
             raise ValueError(f"❌ Column '{col}' not found in the CSV file")
 
-    results = []
-
-    # ดึงข้อมูล HTML ขนานจากหลายๆ URL
+    # ดึงหน้าเว็บขนาน (asyncio + connection pool) แล้วเขียนลงคลังเอกสารทีละ record ทันทีที่หน้านั้น
+    # ดึง + extract เสร็จ (ไม่ถือ HTML/ข้อความทั้งรอบไว้ในหน่วยความจำ; หยุดกลางคันหน้าที่เสร็จแล้วยังอยู่ใน store)
+    # ถือล็อก store ตลอดรอบ กันแอปแปลง output_data.json ทับพร้อมกัน
     urls = df["URL"].tolist()
-    with ThreadPoolExecutor() as executor:
-        html_data = list(executor.map(fetch_html, urls))
+    rows = [row for _, row in df.iterrows()]
+    store = DocStore(DOCS_STORE_PATH)
+    raw_store = RawHtmlStore(RAW_HTML_DIR)
+    # state มีเฉพาะ URL ที่เคยดึงสำเร็จ (มีข้อความเดิมใน store ให้ใช้ซ้ำได้)
+    # reextract ไม่ดึงเว็บ จึงโหลด state เสมอ (แม้ --full) เพื่อเก็บ ETag/Last-Modified เดิมไว้ให้รอบ incremental ถัดไป
+    state = _load_json(CRAWL_STATE_FILE, {}) if incremental or reextract else {}
+    metrics = CrawlMetrics()
+    with span("crawl.store") as sp, store.writing():
+        writer = _StoreWriter(store, rows, state, _StoredText(store), raw_store)
+        try:
+            with ExtractPool(raw_store, len(urls)) as pool:
+                def on_page(i, page):
+                    # หน้าที่เปลี่ยน: เก็บ HTML ดิบลงดิสก์แล้วแปลงใน pool; หน้าที่ไม่เปลี่ยนใช้ข้อความที่ extract ไว้
+                    # (ก่อนตัด boilerplate) ถ้าไม่มีใช้ข้อความเดิมใน store; reextract=True แปลงใหม่จาก HTML ดิบทุกหน้า
+                    url = urls[i]
+                    if page["status"] == "changed":
+                        raw_store.save_raw(url, page.pop("body"), page["charset"])
+                    elif page["status"] == "unchanged":
+                        cached = None if reextract else raw_store.load_text(url)
+                        if cached is not None or not raw_store.has_raw(url):
+                            writer.write(i, page, cached if cached is not None else writer.prev_text.get(url))
+                            return
+                    else:
+                        writer.write(i, page, None)
+                        return
+                    pool.submit(url, lambda text: writer.write(i, page, text))
 
-    # สร้างผลลัพธ์ที่ต้องการ
-    for index, row in df.iterrows():
-        html_text = html_data[index]  # ดึง HTML ที่ได้จาก ThreadPoolExecutor
+                if reextract:
+                    for i, url in enumerate(urls):
+                        on_page(i, {"status": "unchanged", **state.get(url, {})})
+                else:
+                    with span("crawl.fetch", urls=len(urls)) as fsp:
+                        crawl_sync(
+                            urls,
+                            headers_for=lambda url: _conditional_headers(state.get(url), url in state),
+                            per_host=per_host, max_connections=max_connections, rate=rate,
+                            metrics=metrics, on_progress=lambda m: print(f"⏳ {m.format()}"),
+                            on_result=lambda i, p: on_page(i, _page_result(p.status, p.body, p.headers, p.charset,
+                                                                           state.get(p.url), p.url in state)),
+                        )
+                        fsp.set(retries=metrics.retries)
+                with span("crawl.extract", pages=pool.count):
+                    pool.close()  # รอหน้าที่ยังแปลงอยู่
+        except BaseException:
+            writer.checkpoint()  # หยุดกลางคัน: เก็บ ETag ของหน้าที่เขียนลง store แล้ว
+            raise
+        print(f"ℹ️ extracted {pool.count} pages")
+        writer.finish()
 
-        result = {
-            "ID": row["ID"],
-            "URL": row["URL"],
-            "Header": row["Header"],
-            "Center": row["Center"],
-            "NamePage": row["NamePage"],
-            "Tag": row["Tag"],
-            "HTML": html_text if html_text else "ไม่สามารถดึงข้อมูลได้"
-        }
+        current_ids = {str(i) for i in df["ID"]}
+        for doc_id in store.ids():
+            if doc_id not in current_ids:
+                store.delete(doc_id)
+                writer.kinds[doc_id] = "removed"
+        store.compact_if_needed()
+        changes = writer.changes()
+        sp.set(**{k: len(v) for k, v in changes.items()})
+    new_state = writer.new_state
+    fetched = writer.statuses
+
+    n_fetched = fetched.count("changed")
+    n_reused = fetched.count("unchanged")
+    print(f"ℹ️ fetched {n_fetched}, reused {n_reused}, failed {len(fetched) - n_fetched - n_reused}")
+    if not reextract:
+        print(f"ℹ️ crawl: {metrics.format()}, retries {metrics.retries}")
+
+    _write_json(CRAWL_STATE_FILE, new_state)
+
+    print(f"✅ Data has been saved to {DOCS_STORE_PATH}")
+    print(f"ℹ️ added {len(changes['added'])}, changed {len(changes['changed'])}, removed {len(changes['removed'])}")
 
-        results.append(result)
+    # fit ดัชนี TF-IDF ใหม่เฉพาะเมื่อมีเอกสารเปลี่ยน แล้วเก็บลงดิสก์ให้ qa_engine โหลดตอนเริ่ม
+    index = None
+    if changes["added"] or changes["changed"] or changes["removed"] or not incremental:
+        with span("crawl.index"):
+            index = build_index(store)
+        print("✅ TF-IDF index has been saved")
+    else:
+        print("ℹ️ No document changed, index is up to date")
 
-    # บันทึกผลลัพธ์เป็นไฟล์ JSON
-    output_file = "output_data.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # embedding ของ chunk/สินค้าที่ยังไม่มี (RETRIEVER=dense/hybrid) คำนวณตอน ingest เท่านั้น ไม่ใช่ตอนถาม
+    if RETRIEVER_MODE != "tfidf":
+        from products import load_products
+        from vector_index import ingest
+        with span("crawl.embed"):
+            ingest(store, index or load_or_build(store), load_products())
 
-    print("✅ Data has been saved to output_data.json")
+    # เขียนหลังสุด: แอปที่รันอยู่โหลดข้อมูลรุ่นใหม่เมื่อไฟล์นี้เปลี่ยน (ดัชนี/เวกเตอร์พร้อมแล้ว)
+    _write_json(CRAWL_CHANGES_FILE, {"timestamp": time.time(), **changes})
 
 # เรียกใช้ฟังก์ชันหลัก
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="ดาวน์โหลดทุกหน้าใหม่ทั้งหมด (ไม่ใช้ ETag/hash เดิม)")
+    parser.add_argument("--per-host", type=int, default=4, help="จำนวนการเชื่อมต่อพร้อมกันสูงสุดต่อ host")
+    parser.add_argument("--max-connections", type=int, default=32, help="จำนวนการเชื่อมต่อพร้อมกันสูงสุดรวม")
+    parser.add_argument("--rate", type=float, default=0.0, help="จำนวนคำขอต่อวินาทีสูงสุดรวม (0 = ไม่จำกัด)")
+    parser.add_argument("--reextract", action="store_true", help="extract ข้อความใหม่จาก HTML ดิบที่เก็บไว้ (ไม่ดึงเว็บ)")
+    args = parser.parse_args()
+    main(incremental=not args.full, per_host=args.per_host, max_connections=args.max_connections, rate=args.rate,
+         reextract=args.reextract)
@@ -0,0 +1,180 @@
+# ann.py
+# ค้นเวกเตอร์ใกล้สุดโดยประมาณ (approximate nearest neighbour) บนเวกเตอร์ที่ normalize แล้ว (inner product = cosine)
+# - hnswlib ถ้าติดตั้งไว้ (pip install hnswlib)
+# - ไม่มี hnswlib: IVF ด้วย numpy (spherical k-means แบ่งเวกเตอร์เป็นกลุ่ม ค้นเฉพาะ nprobe กลุ่มที่ใกล้คำถาม)
+# - เวกเตอร์น้อยกว่า ANN_MIN_VECTORS: คูณทั้งเมทริกซ์ตรงๆ (เร็วพออยู่แล้วและแม่นยำ 100%)
+# vectors คือ VectorFile (vector_index.py) ที่อ่านจาก memory-mapped file: dot(q), dot_rows(ids, q), rows(ids)
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+ANN_MIN_VECTORS = 4096
+IVF_NPROBE = 8          # จำนวนกลุ่มที่ค้นขั้นต่ำ (ดัชนีใหญ่ค้น n_lists / 32 กลุ่ม)
+HNSW_EF_SEARCH = 64
+
+_ANN_META = "ann.json"
+_IVF_FILE = "ivf.npz"
+_HNSW_FILE = "hnsw.bin"
+
+
+def _top(ids: np.ndarray, sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(ids) > k:
+        part = np.argpartition(-sims, k - 1)[:k]
+        ids, sims = ids[part], sims[part]
+    order = np.lexsort((ids, -sims))
+    return ids[order], sims[order]
+
+
+class ExactSearch:
+    kind = "exact"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        sims = self.vectors.dot(query)
+        return _top(np.arange(len(sims)), sims, k)
+
+    def save(self, index_dir: str) -> None:
+        pass
+
+    @classmethod
+    def load(cls, index_dir: str, vectors) -> "ExactSearch":
+        return cls(vectors)
+
+
+class IVFIndex:
+    """inverted file: centroid ของแต่ละกลุ่ม + รายการแถวในกลุ่ม (เรียงต่อกันใน members, ช่วงตาม offsets)"""
+
+    kind = "ivf"
+
+    def __init__(self, vectors, centroids: np.ndarray, members: np.ndarray, offsets: np.ndarray,
+                 nprobe: Optional[int] = None):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.members = members
+        self.offsets = offsets
+        self.nprobe = nprobe or max(IVF_NPROBE, len(centroids) // 32)
+
+    @classmethod
+    def build(cls, vectors, n_lists: Optional[int] = None, iterations: int = 10, sample: int = 20000,
+              seed: int = 0, block: int = 65536) -> "IVFIndex":
+        n = len(vectors)
+        n_lists = n_lists or max(1, int(4 * np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        train = vectors.rows(np.sort(rng.choice(n, size=min(n, sample), replace=False)))
+        centroids = train[rng.choice(len(train), size=min(n_lists, len(train)), replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            norms = np.linalg.norm(sums, axis=1)
+            keep = norms > 0  # กลุ่มที่ไม่มีสมาชิกใช้ centroid เดิม
+            centroids[keep] = sums[keep] / norms[keep, None]
+        # จัดทุกแถวเข้ากลุ่ม (ทีละ block เพื่อไม่ให้แปลงทั้งไฟล์เป็น float32 พร้อมกัน)
+        assign = np.concatenate([
+            np.argmax(vectors.rows(np.arange(lo, min(lo + block, n))) @ centroids.T, axis=1)
+            for lo in range(0, n, block)
+        ]) if n else np.zeros(0, dtype=np.int64)
+        members = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=len(centroids)))])
+        return cls(vectors, centroids.astype(np.float32), members.astype(np.int64), offsets.astype(np.int64))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = min(self.nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ids = np.concatenate([self.members[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.float32)
+        return _top(ids, self.vectors.dot_rows(ids, query), k)
+
+    def save(self, index_dir: str) -> None:
+        np.savez(os.path.join(index_dir, _IVF_FILE), centroids=self.centroids, members=self.members,
+                 offsets=self.offsets)
+
+    @classmethod
+    def load(cls, index_dir: str, vectors) -> "IVFIndex":
+        with np.load(os.path.join(index_dir, _IVF_FILE)) as data:
+            return cls(vectors, data["centroids"], data["members"], data["offsets"])
+
+
+class HnswIndex:
+    kind = "hnsw"
+
+    def __init__(self, vectors, graph):
+        self.vectors = vectors
+        self.graph = graph
+
+    @classmethod
+    def build(cls, vectors, m: int = 16, ef_construction: int = 200, block: int = 65536) -> "HnswIndex":
+        import hnswlib
+        n = len(vectors)
+        graph = hnswlib.Index(space="ip", dim=vectors.dim)
+        graph.init_index(max_elements=max(n, 1), ef_construction=ef_construction, M=m)
+        for lo in range(0, n, block):
+            ids = np.arange(lo, min(lo + block, n))
+            graph.add_items(vectors.rows(ids), ids)
+        graph.set_ef(HNSW_EF_SEARCH)
+        return cls(vectors, graph)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self.vectors))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        self.graph.set_ef(max(HNSW_EF_SEARCH, k))
+        labels, distances = self.graph.knn_query(query[None, :], k=k)
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def save(self, index_dir: str) -> None:
+        self.graph.save_index(os.path.join(index_dir, _HNSW_FILE))
+
+    @classmethod
+    def load(cls, index_dir: str, vectors) -> "HnswIndex":
+        import hnswlib
+        graph = hnswlib.Index(space="ip", dim=vectors.dim)
+        graph.load_index(os.path.join(index_dir, _HNSW_FILE), max_elements=max(len(vectors), 1))
+        graph.set_ef(HNSW_EF_SEARCH)
+        return cls(vectors, graph)
+
+
+_KINDS = {cls.kind: cls for cls in (ExactSearch, IVFIndex, HnswIndex)}
+
+
+def _have_hnswlib() -> bool:
+    try:
+        import hnswlib  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_ann(vectors, kind: str = "auto"):
+    """kind: auto (เลือกตามขนาด/ไลบรารีที่มี) / exact / ivf / hnsw"""
+    if kind == "auto":
+        if len(vectors) < ANN_MIN_VECTORS:
+            kind = "exact"
+        else:
+            kind = "hnsw" if _have_hnswlib() else "ivf"
+    if kind == "exact":
+        return ExactSearch(vectors)
+    return _KINDS[kind].build(vectors)
+
+
+def save_ann(ann, index_dir: str) -> None:
+    ann.save(index_dir)
+    with open(os.path.join(index_dir, _ANN_META), "w", encoding="utf-8") as f:
+        json.dump({"kind": ann.kind, "n": len(ann.vectors)}, f)
+
+
+def load_ann(index_dir: str, vectors):
+    """ANN ที่บันทึกไว้ (ถ้าไฟล์ไม่ครบ/ไม่ตรงกับจำนวนเวกเตอร์ ใช้การค้นแบบ exact แทน)"""
+    try:
+        with open(os.path.join(index_dir, _ANN_META), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("n") != len(vectors):
+            return ExactSearch(vectors)
+        return _KINDS[meta["kind"]].load(index_dir, vectors)
+    except (OSError, ValueError, KeyError, ImportError, RuntimeError):
+        return ExactSearch(vectors)
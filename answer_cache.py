@@ -0,0 +1,145 @@
+# answer_cache.py
+# แคชคำตอบของ LLM: คีย์มาจากคำถามที่ normalize/ตัดคำแล้ว + chunk ที่ใช้เป็น context (ตามลำดับ) + ชื่อโมเดล
+# + เวอร์ชัน prompt
+# เก็บในหน่วยความจำแบบ LRU + TTL และเลือกเก็บลง SQLite ได้เพื่อให้อยู่รอดหลังรีสตาร์ท
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+
+def make_key(question_tokens: Sequence[str], passages: Sequence[Sequence], model: str, template_version: int) -> str:
+    """passages = [(ID, hash ของเนื้อหา, ต้น chunk, ท้าย chunk), ...] ตามลำดับใน context
+    (chunk คนละชุดจากหน้าเดียวกัน หรือลำดับต่างกัน = prompt ต่างกัน = คนละคีย์)"""
+    payload = json.dumps(
+        {"q": list(question_tokens), "ctx": [[str(v) for v in p] for p in passages], "model": model,
+         "tpl": template_version},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("question", "answer", "created", "hits")
+
+    def __init__(self, question: str, answer: str, created: float, hits: int = 0):
+        self.question = question
+        self.answer = answer
+        self.created = created
+        self.hits = hits
+
+
+class AnswerCache:
+    """LRU + TTL ในหน่วยความจำ และ (ถ้าระบุ db_path) SQLite เป็นชั้นล่าง"""
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 7 * 24 * 3600,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._mem: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, question TEXT, answer TEXT,"
+                " created REAL, last_access REAL, hits INTEGER DEFAULT 0)"
+            )
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None and self._expired(entry.created, now):
+                del self._mem[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._db_get(key, now)
+                if entry is not None:
+                    self._mem_put(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._mem.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            if self._db is not None:
+                self._db.execute("UPDATE answers SET hits = ?, last_access = ? WHERE key = ?", (entry.hits, now, key))
+                self._db.commit()
+            return entry.answer
+
+    def set(self, key: str, question: str, answer: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._mem_put(key, _Entry(question, answer, now))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, question, answer, created, last_access, hits)"
+                    " VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, question, answer, now, now),
+                )
+                self._db_evict(now)
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "size": len(self._mem),
+        }
+
+    def top_questions(self, n: int = 5) -> List[Tuple[str, int]]:
+        """คำถามที่ถูกตอบจากแคชบ่อยที่สุด [(คำถาม, จำนวน hit)]"""
+        with self._lock:
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT question, hits FROM answers WHERE hits > 0 AND created >= ?"
+                    " ORDER BY hits DESC LIMIT ?",
+                    (time.time() - self.ttl_seconds, n),
+                ).fetchall()
+                return [(q, int(h)) for q, h in rows]
+            ranked = sorted((e for e in self._mem.values() if e.hits > 0), key=lambda e: e.hits, reverse=True)
+            return [(e.question, e.hits) for e in ranked[:n]]
+
+    # ----------------------------- ภายใน -----------------------------
+    def _mem_put(self, key: str, entry: _Entry) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _db_get(self, key: str, now: float) -> Optional[_Entry]:
+        row = self._db.execute("SELECT question, answer, created, hits FROM answers WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[2], now):
+            self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return _Entry(row[0], row[1], row[2], int(row[3] or 0))
+
+    def _db_evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM answers WHERE key NOT IN (SELECT key FROM answers ORDER BY last_access DESC LIMIT ?)",
+            (self.max_entries,),
+        )
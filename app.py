@@ -1,9 +1,15 @@
 import streamlit as st
-from qa_engine import answer_question
+from qa_engine import (answer_cache, answer_question, answer_question_stream, data_status, on_reload,
+                       start_data_watcher, warm_up)
+from startup import STARTUP
+from tracing import trace
+import qa_client
 
 # ---------------- NEW: imports & helpers ----------------
-import pandas as pd
 import os
+import threading
+
+MAX_PRODUCT_ROWS_SHOWN = 2000  # แถวที่ส่งให้ตารางในป๊อปอัป (ทั้งแคตตาล็อกทำให้หน้าเว็บช้าเมื่อมีเป็นแสนแถว)
 
 # ตั้งค่าหน้าเว็บ — กว้างเต็มจอ
 st.set_page_config(page_title="🔍 TISTR AI Search", layout="wide")
@@ -44,103 +50,58 @@ button[kind="primary"] {
 """, unsafe_allow_html=True)
 
 
-@st.cache_data(show_spinner=False)
-def _load_products(csv_path="Product List.csv"):
-    """โหลดสินค้า + ทำชื่อคอลัมน์ให้มาตรฐาน: ID / ชื่อสินค้า / ศูนย์ / link"""
-    if not os.path.exists(csv_path):
-        return pd.DataFrame(columns=["ID", "ชื่อสินค้า", "ศูนย์", "link"])
-
-    # รองรับหลาย encoding
-    encodings = [None, "utf-8-sig", "cp874", "latin-1"]
-    last_err = None
-    df = None
-    for enc in encodings:
-        try:
-            df = pd.read_csv(csv_path, encoding=enc) if enc else pd.read_csv(csv_path)
-            break
-        except Exception as e:
-            last_err = e
-    if df is None:
-        st.error(f"ไม่สามารถอ่านไฟล์สินค้าได้: {last_err}")
-        return pd.DataFrame(columns=["ID", "ชื่อสินค้า", "ศูนย์", "link"])
-
-    # ทำให้ชื่อคอลัมน์ยืดหยุ่นขึ้น
-    rename_map = {}
-    cols_norm = {c.lower().strip(): c for c in df.columns}
-
-    if "id" in cols_norm: rename_map[cols_norm["id"]] = "ID"
-    for key in ["name", "product", "product name", "ชื่อสินค้า", "รายชื่อสินค้า", "รายการสินค้า"]:
-        if key in cols_norm: rename_map[cols_norm[key]] = "ชื่อสินค้า"; break
-    for key in ["center", "ศูนย์", "ศูนย์งาน", "หน่วยงาน"]:
-        if key in cols_norm: rename_map[cols_norm[key]] = "ศูนย์"; break
-    # ✅ รองรับทั้ง "ลิงก์" และ "ลิ้งค์" + url
-    for key in ["link", "url", "ลิงก์", "ลิ้งค์"]:
-        if key in cols_norm: rename_map[cols_norm[key]] = "link"; break
-
-    df = df.rename(columns=rename_map)
-
-    # ให้มีคอลัมน์มาตรฐานครบ
-    for col in ["ID", "ชื่อสินค้า", "ศูนย์", "link"]:
-        if col not in df.columns:
-            df[col] = ""
-
-    # ตัดช่องว่างหัว–ท้าย ป้องกันกรองไม่ติด
-    for col in ["ID", "ชื่อสินค้า", "ศูนย์", "link"]:
-        df[col] = df[col].astype(str).fillna("").str.strip()
-
-    # จัดลำดับคอลัมน์
-    df = df[["ID", "ชื่อสินค้า", "ศูนย์", "link"]].copy()
-    return df
-
-
-def _is_valid_url(u: str) -> bool:
-    u = str(u or "").strip().lower()
-    return u.startswith("http://") or u.startswith("https://")
-
-
-def _filter_products(df, keyword="", center="ทั้งหมด"):
-    if df.empty:
-        return df
-
-    filtered = df.copy()
-
-    # ใช้ regex=False เพื่อแมตช์ชื่อศูนย์ตรง ๆ (กันอักขระพิเศษทำพัง)
-    if center and center != "ทั้งหมด":
-        filtered = filtered[
-            filtered["ศูนย์"].str.contains(center, case=False, na=False, regex=False)
-        ]
-
-    if keyword:
-        kw = keyword.strip().lower()
-        mask = (
-            filtered["ID"].str.lower().str.contains(kw, na=False) |
-            filtered["ชื่อสินค้า"].str.lower().str.contains(kw, na=False) |
-            filtered["ศูนย์"].str.lower().str.contains(kw, na=False) |
-            filtered["link"].str.lower().str.contains(kw, na=False)
-        )
-        filtered = filtered[mask]
-
-    return filtered.reset_index(drop=True)
-
-
-def _products_ui(df):
-    # ตัวกรอง
+def _on_data_reload(snapshot):
+    """หลังโหลดเอกสาร/สินค้ารุ่นใหม่ (ใน thread ของตัวเฝ้าไฟล์): สร้างแคตตาล็อกสินค้าใหม่ถ้าไฟล์เปลี่ยน
+    ผู้ใช้ได้ข้อมูลใหม่ตั้งแต่การ rerun ครั้งถัดไปโดยไม่ต้องรีสตาร์ท (ค่าใน session ของรุ่นเดิมล้างที่ _drop_stale_session)"""
+    from product_catalog import refresh_catalog
+    refresh_catalog()
+
+
+def _drop_stale_session():
+    """ข้อมูลถูกโหลดรุ่นใหม่หลัง rerun ครั้งก่อนของ session นี้: ล้างค่าที่คำนวณจากรุ่นเดิม
+    (thread ของตัวเฝ้าไฟล์เข้าถึง session_state ของแต่ละ session ไม่ได้ จึงตรวจตอน rerun)"""
+    version = data_status()["version"]
+    previous = st.session_state.get("data_version")
+    st.session_state.data_version = version
+    if previous and previous != version:
+        st.session_state.pop("last_trace", None)
+        st.session_state.pop("popular_questions", None)
+
+
+@st.cache_resource(show_spinner=False)
+def _start_warm_up():
+    """โหลดดัชนี/ตัวตัดคำ/สินค้าใน background ครั้งเดียวต่อ process หลังหน้าแรกแสดงแล้ว
+    แล้วเฝ้าไฟล์ข้อมูล (output_data.json / crawl_changes.json / Product List.csv) เพื่อโหลดใหม่อัตโนมัติ"""
+    def run():
+        warm_up()
+        from product_catalog import load_catalog
+        with STARTUP.phase("build product catalog"):
+            load_catalog()  # ดัชนีค้นหาของป๊อปอัปรายการสินค้า
+        if os.environ.get("STARTUP_REPORT") == "1":
+            print("⏱️ startup phases:\n" + STARTUP.report())
+        on_reload(_on_data_reload)
+        start_data_watcher()
+    thread = threading.Thread(target=run, name="qa-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _products_ui():
+    # ตัวกรอง (ค้นผ่านดัชนีที่เตรียมไว้ใน product_catalog ไม่สแกน DataFrame ทุกครั้งที่พิมพ์)
+    # import เมื่อเปิดป๊อปอัปครั้งแรก (numpy/pandas ไม่ต้องโหลดก่อนหน้าแรกแสดง)
+    from product_catalog import ALL_CENTERS, load_catalog
+    catalog = load_catalog()
     cols = st.columns([2, 1])
     keyword = cols[0].text_input("🔎 ค้นหา", placeholder="พิมพ์คำค้น เช่น ชื่อสินค้า / ID / ศูนย์ ...", key="products_kw")
-    centers = ["ทั้งหมด"] + sorted([c for c in df["ศูนย์"].dropna().astype(str).unique() if c.strip()])
-    center = cols[1].selectbox("ศูนย์", centers, index=0, key="products_center")
-
-    filtered = _filter_products(df, keyword, center)
+    center = cols[1].selectbox("ศูนย์", [ALL_CENTERS] + catalog.centers, index=0, key="products_center")
 
-    # ✅ ปรับคอลัมน์ link:
-    # - ถ้าเป็น URL: คงค่า URL ไว้ → แสดงเป็นลิงก์กดได้
-    # - ถ้าไม่มี / ว่าง / NaN: ให้เป็นค่าว่าง
-    df_show = filtered.copy()
-    df_show["link"] = df_show["link"].apply(lambda u: (u if _is_valid_url(u) else ""))
+    rows = catalog.filter(keyword, center)
+    if len(rows) > MAX_PRODUCT_ROWS_SHOWN:
+        st.caption(f"แสดง {MAX_PRODUCT_ROWS_SHOWN:,} จาก {len(rows):,} รายการ (พิมพ์คำค้นเพิ่มเพื่อกรอง)")
 
-    # แสดงตาราง
+    # แสดงตาราง (link ที่ไม่ใช่ URL เป็นค่าว่างแล้ว)
     st.dataframe(
-        df_show[["ID", "ชื่อสินค้า", "ศูนย์", "link"]],
+        catalog.frame(rows, limit=MAX_PRODUCT_ROWS_SHOWN),
         use_container_width=True,
         height=560,
         column_config={
@@ -148,22 +109,52 @@ def _products_ui(df):
         }
     )
 
-    # ปุ่มดาวน์โหลดเฉพาะผลกรอง
-    csv = df_show.to_csv(index=False).encode("utf-8-sig")
-    st.download_button("⬇️ ดาวน์โหลดผลลัพธ์ (CSV)", data=csv, file_name="products_filtered.csv", mime="text/csv")
+    # ไฟล์ CSV ของผลกรองสร้างเมื่อผู้ใช้ขอเท่านั้น
+    if st.button("⬇️ เตรียมไฟล์ CSV ของผลลัพธ์", key="products_csv"):
+        st.download_button("⬇️ ดาวน์โหลดผลลัพธ์ (CSV)", data=catalog.to_csv(rows),
+                           file_name="products_filtered.csv", mime="text/csv")
+
+
+def _show_trace(trace: dict):
+    """แผง debug: span ของคำถามล่าสุดของ session นี้ (trace ของคำถาม หรือข้อมูลจาก qa_service)"""
+    import pandas as pd
+    with st.expander("🛠️ เวลาแต่ละขั้นตอนของคำถามล่าสุด", expanded=True):
+        spans = trace.get("spans")
+        if not spans:
+            st.json(trace)
+            return
+        st.caption(f"trace {trace['trace_id']} · รวม {trace['duration_s'] * 1000:.0f} ms"
+                   + (" · ตอบจากแคช" if trace.get("cache_hit") else ""))
+        rows = pd.DataFrame(spans)
+        rows["name"] = ["\u00a0\u00a0" * d + n for d, n in zip(rows["depth"], rows["name"])]
+        rows["ms"] = (rows.pop("duration_s") * 1000).round(1)
+        rows["start ms"] = (rows.pop("start_s") * 1000).round(1)
+        st.dataframe(rows.drop(columns=["depth"]), use_container_width=True, hide_index=True)
+        llm = next((s for s in spans if s["name"] == "llm"), None)
+        if llm and llm.get("completion_tokens"):
+            st.caption(f"LLM: prompt {llm.get('prompt_tokens', '?')} tokens, "
+                       f"คำตอบ {llm['completion_tokens']} tokens"
+                       + (f", {llm['tokens_per_s']} tokens/s" if llm.get("tokens_per_s") else ""))
+        if trace.get("profile"):
+            st.caption(f"cProfile: {trace['profile']}")
 
 
 # ---------------- Header / Intro ----------------
 st.title("🔍 ระบบ AI ถาม-ตอบจากเว็บไซต์ TISTR")
 st.markdown("ยินดีต้อนรับสู่ระบบ AI ถาม-ตอบจากเว็บไซต์ TISTR! คุณสามารถถามคำถามเกี่ยวกับบริการ ผลิตภัณฑ์ หรือเนื้อหาอื่นๆ ที่เกี่ยวข้องกับ TISTR ได้ที่นี่")
+if not qa_client.QA_SERVICE_URL:
+    _start_warm_up()  # โหมดไคลเอนต์: ดัชนีอยู่ที่ qa_service ไม่ต้องโหลดในนี้
+    _drop_stale_session()
 
 # โหลดคำถามยอดนิยมจาก session_state หรือกำหนดค่าเริ่มต้น
 if "popular_questions" not in st.session_state:
     st.session_state.popular_questions = []
-
-# ---------------- NEW: โหลดสินค้าหนึ่งครั้ง ----------------
-if "products_df" not in st.session_state:
-    st.session_state.products_df = _load_products()
+# คำถามยอดนิยม = คำถามที่ถูกตอบจากแคชคำตอบบ่อยที่สุด
+if qa_client.QA_SERVICE_URL:
+    top_questions, cache_stats = qa_client.popular(5)
+else:
+    top_questions, cache_stats = answer_cache.top_questions(5), answer_cache.stats()
+st.session_state.popular_questions = [q for q, _ in top_questions]
 
 # ---------------- NEW: ปุ่มเปิดป๊อปอัปสินค้า ----------------
 st.markdown("### 🧾 รายการสินค้า")
@@ -173,7 +164,7 @@ open_btn = st.button("📋 รายชื่อสินค้า/บริก
 if hasattr(st, "dialog"):
     @st.dialog("🧾 รายการสินค้า (เลื่อนและค้นหาได้)")
     def products_modal():
-        _products_ui(st.session_state.products_df)
+        _products_ui()
 
     if open_btn:
         products_modal()
@@ -181,7 +172,18 @@ else:
     # Fallback: เรนเดอร์ในส่วนขยายบนหน้า (ไม่ป๊อปอัป แต่เต็มความกว้าง)
     if open_btn:
         with st.expander("🧾 รายการสินค้า (Fallback โหมด)", expanded=True):
-            _products_ui(st.session_state.products_df)
+            _products_ui()
+
+# ---------------- NEW: คำถามยอดนิยม (กดเพื่อถามซ้ำ) ----------------
+if st.session_state.popular_questions:
+    st.markdown("### 🔥 คำถามยอดนิยม")
+    pq_cols = st.columns(len(st.session_state.popular_questions))
+    for i, pq in enumerate(st.session_state.popular_questions):
+        if pq_cols[i].button(pq, key=f"popular_q_{i}"):
+            st.session_state.selected_question = pq
+    if cache_stats:
+        st.caption(f"แคชคำตอบ: hit {cache_stats['hits']} / miss {cache_stats['misses']} "
+                   f"({cache_stats['hit_rate']:.0%})")
 
 # ---------------- เดิม: ฟิลด์ถาม-ตอบ ----------------
 question = st.text_input(
@@ -190,8 +192,38 @@ question = st.text_input(
 )
 
 if st.button("📤 ถามเลย") and question:
-    with st.spinner("🧠 กำลังประมวลผล..."):
-        answer = answer_question(question)
+    if qa_client.QA_SERVICE_URL:
+        # ส่งคำถามไปที่ qa_service (คิว LLM กลางที่ใช้ร่วมกันทุก session)
+        with st.spinner("🧠 กำลังประมวลผล..."):
+            try:
+                reply = qa_client.ask(question)
+                answer = reply["answer"]
+                # บริการไม่ส่ง span กลับมา แสดงเฉพาะข้อมูลประกอบของคำตอบ (ดูรายขั้นตอนที่ /metrics ของบริการ)
+                st.session_state.last_trace = {k: v for k, v in reply.items() if k != "answer"}
+            except qa_client.ServiceError as e:
+                answer = f"❌ {e}"
         st.markdown("### 📄 คำตอบ")
         st.markdown(answer)
+    else:
+        # trace ของคำถามนี้ใน session นี้ (answer_question เป็น span ภายใน) ไม่ใช่ trace ล่าสุดของทั้งโปรเซส
+        # ที่อาจเป็นคำถามของผู้ใช้คนอื่น
+        with trace("app.ask", question=question) as t:
+            if hasattr(st, "write_stream"):
+                # แสดงคำตอบทีละส่วนทันทีที่โมเดลเริ่มตอบ
+                st.markdown("### 📄 คำตอบ")
+                st.write_stream(answer_question_stream(question))
+            else:
+                with st.spinner("🧠 กำลังประมวลผล..."):
+                    answer = answer_question(question)
+                    st.markdown("### 📄 คำตอบ")
+                    st.markdown(answer)
+        st.session_state.last_trace = t.as_dict()
     st.session_state.selected_question = ""  # รีเซ็ตคำถามหลังการตอบ
+
+# ---------------- Debug: เวลาแต่ละขั้นตอนของคำถามล่าสุด ----------------
+if not qa_client.QA_SERVICE_URL:
+    data = data_status()
+    if data["version"]:
+        st.sidebar.caption(f"ข้อมูลรุ่นที่ {data['version']}" + (" · ⚠️ โหลดรุ่นใหม่ไม่สำเร็จ" if data["last_error"] else ""))
+if st.sidebar.checkbox("🛠️ Debug", value=False) and st.session_state.get("last_trace"):
+    _show_trace(st.session_state.last_trace)
@@ -0,0 +1,217 @@
+# batch_qa.py
+# ถาม-ตอบเป็นชุดจากไฟล์คำถาม (JSONL หรือ CSV) สำหรับ regression run / สร้าง FAQ
+# - ค้นเอกสารและสินค้าของทุกคำถามพร้อมกัน (คูณ sparse matrix ครั้งเดียวต่อดัชนี)
+# - เรียก LLM พร้อมกันไม่เกิน --concurrency งาน, คำถามที่ได้คีย์แคชเดียวกันเรียก LLM ครั้งเดียว
+# - เขียนผลลง JSONL ทีละบรรทัดทันทีที่ได้คำตอบ แล้วสรุป throughput และเวลาของแต่ละขั้นตอน
+#
+#   python batch_qa.py questions.jsonl -o answers.jsonl --concurrency 4
+#   python batch_qa.py questions.csv --fake          # ใช้ fake_ollama (ไม่ต้องมีเซิร์ฟเวอร์ Ollama)
+#
+# ไฟล์ JSONL: หนึ่งบรรทัดต่อคำถาม เป็น {"id": ..., "question": ...} หรือสตริงล้วน
+# ไฟล์ CSV: คอลัมน์ question (ไม่มีใช้คอลัมน์แรก) และ id (ถ้ามี)
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, TextIO
+
+import qa_engine
+from ollama_utils import ask_llama
+
+DEFAULT_CONCURRENCY = 4
+
+
+def read_questions(path: str) -> List[dict]:
+    """[{"id", "question"}] จากไฟล์ .jsonl หรือ .csv (ข้ามบรรทัดว่าง)"""
+    items = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            q_col = "question" if "question" in fields else (fields[0] if fields else None)
+            for row in reader:
+                items.append({"id": row.get("id"), "question": (row.get(q_col) or "").strip()})
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                if isinstance(obj, str):
+                    obj = {"question": obj}
+                items.append({"id": obj.get("id"), "question": str(obj.get("question", "")).strip()})
+    items = [it for it in items if it["question"]]
+    for i, it in enumerate(items):
+        if it["id"] is None:
+            it["id"] = i
+    return items
+
+
+class StageTimer:
+    """เวลารวมของแต่ละขั้นตอน (วินาที)"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def timed(self, stage: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.add(stage, time.perf_counter() - t0)
+
+
+def run_batch(items: List[dict], out: TextIO, concurrency: int = DEFAULT_CONCURRENCY,
+              use_cache: bool = True, timer: Optional[StageTimer] = None) -> dict:
+    """ตอบทุกคำถามใน items แล้วเขียน JSONL ลง out ตามลำดับที่เสร็จ คืนสรุปสถิติ
+    use_cache=False: ไม่อ่านคำตอบจากแคช (ยังบันทึกคำตอบใหม่ลงแคช)"""
+    timer = timer or StageTimer()
+    started = time.perf_counter()
+    questions = [it["question"] for it in items]
+    # ทั้งรอบใช้ข้อมูลรุ่นเดียว (thread ของ LLM pin รุ่นนี้เองเพราะ contextvar ไม่ตามเข้า thread pool)
+    snapshot = qa_engine.current_snapshot()
+
+    # 1) ค้นเอกสาร / สินค้าของทุกคำถามพร้อมกัน
+    with qa_engine.pinned_snapshot(snapshot):
+        chunks_list = timer.timed("retrieve_docs", qa_engine.find_best_chunks_batch, questions)
+        products_list = timer.timed("retrieve_products", qa_engine.find_related_products_batch, questions)
+
+    # 2) คีย์แคช: คำถามที่ได้คีย์เดียวกันรอคำตอบจากการเรียก LLM ครั้งเดียว
+    t0 = time.perf_counter()
+    groups: Dict[str, List[int]] = {}
+    with qa_engine.pinned_snapshot(snapshot):
+        for i, (question, chunks) in enumerate(zip(questions, chunks_list)):
+            if chunks:
+                groups.setdefault(qa_engine.answer_cache_key(question, chunks), []).append(i)
+    timer.add("cache_key", time.perf_counter() - t0)
+
+    write_lock = threading.Lock()
+    counts = {"answered": 0, "cached": 0, "no_context": 0, "llm_calls": 0, "errors": 0}
+
+    def emit(i: int, reply: Optional[str], cached: bool, llm_s: float, error: Optional[str] = None) -> None:
+        question, chunks = questions[i], chunks_list[i]
+        t = time.perf_counter()
+        answer = qa_engine.compose_answer(question, chunks, reply or "", products_list[i]) if error is None else None
+        record = {
+            "id": items[i]["id"],
+            "question": question,
+            "answer": answer,
+            "doc_ids": [c.get("ID") for c, _ in chunks],
+            "cached": cached,
+            "llm_s": round(llm_s, 4),
+        }
+        if error is not None:
+            record["error"] = error
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        timer.add("compose", time.perf_counter() - t)
+        t = time.perf_counter()
+        with write_lock:
+            out.write(line)
+            out.flush()
+            if error is not None:
+                counts["errors"] += 1
+            elif not chunks:
+                counts["no_context"] += 1
+            else:
+                counts["answered"] += 1
+                counts["cached"] += cached
+        timer.add("write", time.perf_counter() - t)
+
+    # ไม่พบเนื้อหา: ไม่ต้องเรียก LLM
+    for i, chunks in enumerate(chunks_list):
+        if not chunks:
+            emit(i, None, False, 0.0)
+
+    # 3) แคช หรือเรียก LLM แบบจำกัดจำนวนงานพร้อมกัน
+    def call_llm(first: int) -> str:
+        with qa_engine.pinned_snapshot(snapshot):
+            prompt = timer.timed("prompt", qa_engine.answer_prompt, questions[first], chunks_list[first])
+        return timer.timed("llm", ask_llama, prompt, model=qa_engine.LLM_MODEL, system=qa_engine.ANSWER_SYSTEM_PROMPT)
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for key, members in groups.items():
+            reply = timer.timed("cache_lookup", qa_engine.answer_cache.get, key) if use_cache else None
+            if reply is not None:
+                for i in members:
+                    emit(i, reply, True, 0.0)
+                continue
+            pending[executor.submit(call_llm, members[0])] = (key, members, time.perf_counter())
+            counts["llm_calls"] += 1
+
+        for future in as_completed(pending):
+            key, members, submitted = pending[future]
+            llm_s = time.perf_counter() - submitted  # รวมเวลารอคิวด้วย
+            try:
+                reply = future.result()
+            except Exception as e:
+                # บันทึกข้อผิดพลาดรายคำถามแล้วทำคำถามอื่นต่อ
+                for i in members:
+                    emit(i, None, False, llm_s, error=f"{type(e).__name__}: {e}")
+                continue
+            qa_engine.answer_cache.set(key, questions[members[0]], reply)
+            for n, i in enumerate(members):
+                emit(i, reply, n > 0, llm_s)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "questions": len(items),
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "questions_per_min": round(len(items) / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        "concurrency": concurrency,
+        "stage_s": {k: round(v, 4) for k, v in timer.totals.items()},
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"questions {summary['questions']}: answered {summary['answered']} (cached {summary['cached']}), "
+        f"no context {summary['no_context']}, errors {summary['errors']}, LLM calls {summary['llm_calls']}",
+        f"elapsed {summary['elapsed_s']:.2f} s, {summary['questions_per_min']:.1f} questions/min "
+        f"(concurrency {summary['concurrency']})",
+        "stage time (summed over workers):",
+    ]
+    for stage, seconds in summary["stage_s"].items():
+        lines.append(f"  {stage:<18} {seconds * 1000:10.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description="ถาม-ตอบเป็นชุดจากไฟล์ JSONL/CSV")
+    parser.add_argument("questions", help="ไฟล์คำถาม .jsonl หรือ .csv")
+    parser.add_argument("-o", "--output", default="-", help="ไฟล์ผลลัพธ์ JSONL (- = stdout)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="จำนวนการเรียก LLM พร้อมกันสูงสุด")
+    parser.add_argument("--fake", action="store_true", help="ใช้ fake_ollama แทนเซิร์ฟเวอร์ Ollama จริง")
+    parser.add_argument("--no-cache", action="store_true", help="ไม่ใช้คำตอบที่มีอยู่ในแคช (เรียก LLM ทุกคำถาม)")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        import fake_ollama
+        from ollama_utils import set_client
+        set_client(fake_ollama)
+
+    items = read_questions(args.questions)
+    timer = StageTimer()
+    timer.timed("warm_up", qa_engine.warm_up)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_batch(items, out, concurrency=args.concurrency, use_cache=not args.no_cache, timer=timer)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(format_summary(summary), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_batch_qa.py
+# เทียบ batch_qa.run_batch กับการเรียก answer_question ทีละคำถาม โดยใช้ fake_ollama (ไม่ต้องมี Ollama)
+# ต้องรันในโฟลเดอร์ที่มี docs.jsonl / Product List.csv (หรือ output_data.json)
+#
+#   FAKE_OLLAMA_TOKEN_DELAY=0.005 python benchmarks/bench_batch_qa.py --questions 200 --concurrency 8
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_ollama  # noqa: E402
+import qa_engine  # noqa: E402
+from batch_qa import StageTimer, format_summary, run_batch  # noqa: E402
+from ollama_utils import set_client  # noqa: E402
+
+_WORDS = ["บริการ", "ตรวจ", "วิเคราะห์", "ผลิตภัณฑ์", "จุลินทรีย์", "ทดสอบ", "มาตรฐาน",
+          "ห้องปฏิบัติการ", "สินค้า", "ราคา", "ติดต่อ", "อาหาร", "เกษตร", "วัสดุ"]
+
+
+def make_questions(n: int, seed: int = 0) -> list:
+    rnd = random.Random(seed)
+    # สุ่มคำถามไม่ซ้ำกัน (ไม่ให้แคชคำตอบช่วย)
+    return [{"id": i, "question": " ".join(rnd.sample(_WORDS, 4)) + f" ข้อ {i}"} for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    set_client(fake_ollama)
+    qa_engine.warm_up()
+    items = make_questions(args.questions)
+
+    qa_engine.answer_cache.clear()
+    t0 = time.perf_counter()
+    for it in items:
+        qa_engine.answer_question(it["question"])
+    sequential = time.perf_counter() - t0
+
+    qa_engine.answer_cache.clear()
+    summary = run_batch(items, io.StringIO(), concurrency=args.concurrency, timer=StageTimer())
+    print(format_summary(summary))
+    print(f"\nsequential answer_question: {sequential:.2f} s ({len(items) / sequential * 60:.1f} questions/min)")
+    print(f"batch_qa.run_batch:         {summary['elapsed_s']:.2f} s ({summary['questions_per_min']:.1f} questions/min)"
+          f"  -> {sequential / max(summary['elapsed_s'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
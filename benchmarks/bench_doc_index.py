@@ -0,0 +1,68 @@
+# benchmarks/bench_doc_index.py
+# เทียบ latency ต่อคำถามของ find_best_context แบบเดิม (fit TF-IDF ใหม่ทุกคำถาม)
+# กับแบบใช้ดัชนีที่ fit ไว้แล้ว (transform + sparse dot) ที่ 500 / 5k / 50k เอกสาร
+# เอกสารสังเคราะห์จาก synthetic.make_docs (ตัวเดียวกับ run_benchmarks.py)
+#
+#   python benchmarks/bench_doc_index.py
+#   python benchmarks/bench_doc_index.py --sizes 500 5000 --doc-chars 1000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from doc_index import DocIndex, doc_text  # noqa: E402
+from synthetic import make_docs  # noqa: E402
+
+
+def _make_vectorizer():
+    # ตัวตัดคำเดิม: regex ของ sklearn + stop word อังกฤษ (ข้อความไทยทั้งวลีกลายเป็นคำเดียว)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words="english")
+
+
+def old_query(docs: list, query: str):
+    vectorizer = _make_vectorizer()
+    matrix = vectorizer.fit_transform([doc_text(d) for d in docs])
+    scores = (matrix * vectorizer.transform([query]).T).toarray().ravel()
+    return scores.argmax()
+
+
+def _time_per_call(fn, repeats: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--doc-chars", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    query = "บริการ ทดสอบ จุลินทรีย์ lab"
+    print(f"{'docs':>8} {'build(s)':>10} {'load(s)':>9} {'before(ms)':>12} {'after(ms)':>11} {'speedup':>9}")
+    for n in args.sizes:
+        docs = make_docs(n, doc_chars=args.doc_chars)
+
+        t0 = time.perf_counter()
+        index = DocIndex.build(docs)
+        build_s = time.perf_counter() - t0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            t0 = time.perf_counter()
+            index = DocIndex.load(tmp)
+            load_s = time.perf_counter() - t0
+
+        before = _time_per_call(lambda: old_query(docs, query), repeats=1 if n > 5000 else 3)
+        after = _time_per_call(lambda: index.scores(query).argmax(), repeats=args.queries)
+        print(f"{n:>8} {build_s:>10.2f} {load_s:>9.3f} {before * 1000:>12.1f} {after * 1000:>11.2f} {before / after:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
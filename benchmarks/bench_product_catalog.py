@@ -0,0 +1,80 @@
+# benchmarks/bench_product_catalog.py
+# เทียบตัวกรองสินค้าแบบเดิมของ app.py (copy DataFrame + str.lower().str.contains 4 คอลัมน์ทุกครั้งที่พิมพ์)
+# กับ product_catalog (search key + ดัชนี trigram + รหัสศูนย์) บนแคตตาล็อกสังเคราะห์ 1k / 10k / 100k แถว
+# รายงานเวลาสร้างดัชนี และเวลาต่อการกรองหนึ่งครั้ง (เฉลี่ยจากคำค้นชุดเดียวกัน) พร้อมตรวจว่าผลตรงกัน
+#
+#   python benchmarks/bench_product_catalog.py
+#   python benchmarks/bench_product_catalog.py --sizes 100000
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_catalog import ALL_CENTERS, ProductCatalog  # noqa: E402
+
+_WORDS = ["ปุ๋ย", "ชีวภาพ", "หมัก", "เชื้อ", "จุลินทรีย์", "Bio", "Enzyme", "ผง", "น้ำ", "สกัด", "Extract",
+          "Probiotic", "ยีสต์", "แบคทีเรีย", "หัวเชื้อ", "Starter", "สารชีวภัณฑ์", "Culture"]
+_CENTERS = ["ศูนย์จุลินทรีย์", "ศูนย์เทคโนโลยีชีวภาพ", "ศูนย์นวัตกรรมเกษตร", "ศูนย์อาหาร", "ศูนย์เคมี", "ศูนย์วัสดุ"]
+_QUERIES = [("ปุ๋ย", ALL_CENTERS), ("bio", _CENTERS[1]), ("p00012", ALL_CENTERS), ("9", ALL_CENTERS),
+            ("รุ่น 5", ALL_CENTERS), ("ชีวภาพ หมัก", ALL_CENTERS), ("https", ALL_CENTERS), ("ไม่มีคำนี้", ALL_CENTERS),
+            ("", _CENTERS[2]), ("ย", ALL_CENTERS), ("starter", _CENTERS[0])]
+
+
+def make_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "ID": [f"P{i:06d}" for i in range(n)],
+        "ชื่อสินค้า": [" ".join(rng.sample(_WORDS, 3)) + f" รุ่น {i % 97}" for i in range(n)],
+        "ศูนย์": [rng.choice(_CENTERS) for _ in range(n)],
+        "link": [f"https://www.tistr.or.th/product/{i}" if i % 5 else "" for i in range(n)],
+    })
+
+
+def filter_products_baseline(df, keyword="", center=ALL_CENTERS):
+    """_filter_products ของ app.py ก่อนใช้ product_catalog"""
+    filtered = df.copy()
+    if center and center != ALL_CENTERS:
+        filtered = filtered[filtered["ศูนย์"].str.contains(center, case=False, na=False, regex=False)]
+    if keyword:
+        kw = keyword.strip().lower()
+        mask = (
+            filtered["ID"].str.lower().str.contains(kw, na=False) |
+            filtered["ชื่อสินค้า"].str.lower().str.contains(kw, na=False) |
+            filtered["ศูนย์"].str.lower().str.contains(kw, na=False) |
+            filtered["link"].str.lower().str.contains(kw, na=False)
+        )
+        filtered = filtered[mask]
+    return filtered.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'build(s)':>9} {'baseline ms':>12} {'catalog ms':>11} {'speedup':>8}")
+    for n in args.sizes:
+        df = make_catalog(n)
+        t0 = time.perf_counter()
+        catalog = ProductCatalog(df)
+        build_s = time.perf_counter() - t0
+        base_s = new_s = 0.0
+        for keyword, center in _QUERIES:
+            t0 = time.perf_counter()
+            expected = filter_products_baseline(df, keyword, center)
+            base_s += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            rows = catalog.filter(keyword, center)
+            new_s += time.perf_counter() - t0
+            assert expected["ID"].tolist() == df["ID"].iloc[rows].tolist(), (keyword, center)
+        base_ms, new_ms = base_s / len(_QUERIES) * 1000, new_s / len(_QUERIES) * 1000
+        print(f"{n:>8} {build_s:>9.2f} {base_ms:>12.2f} {new_ms:>11.2f} {base_ms / new_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_qa_service.py
+# ยิงคำถามพร้อมกันไปที่ qa_service ที่ต่อกับ Ollama จำลอง (benchmarks/mock_ollama.py) ผ่าน HTTP จริง
+# รายงาน latency / throughput, จำนวนที่ถูก dedupe / ปฏิเสธ (คิวเต็ม) และจำนวนการเรียก Ollama พร้อมกันสูงสุด
+# ต้องรันในโฟลเดอร์ที่มี docs.jsonl / Product List.csv (หรือ output_data.json)
+#
+#   python benchmarks/bench_qa_service.py --clients 64 --unique 16 --workers 2 --queue-size 8
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllama  # noqa: E402
+
+
+async def _run(args, mock: MockOllama) -> None:
+    import aiohttp
+    from aiohttp import web
+
+    import qa_engine
+    from metrics import Registry
+    from qa_service import QAService, create_app
+
+    qa_engine.answer_cache.clear()
+    service = QAService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout,
+                        registry=Registry())
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/answer"
+
+    questions = [f"บริการตรวจวิเคราะห์ จุลินทรีย์ ข้อ {i % args.unique}" for i in range(args.clients)]
+    statuses, latencies = {}, []
+
+    async with aiohttp.ClientSession() as session:
+        async def one(q):
+            t0 = time.perf_counter()
+            async with session.post(url, json={"question": q}) as resp:
+                await resp.read()
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+                if resp.status == 200:
+                    latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in questions))
+        elapsed = time.perf_counter() - t0
+        async with session.get(f"http://127.0.0.1:{port}/status") as resp:
+            status = await resp.json()
+    await runner.cleanup()
+
+    m = status["metrics"]
+    print(f"clients {args.clients} ({args.unique} distinct questions), workers {args.workers}, "
+          f"queue {args.queue_size}")
+    print(f"HTTP status: {statuses}")
+    if latencies:
+        latencies.sort()
+        print(f"latency p50 {statistics.median(latencies) * 1000:.0f} ms, "
+              f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.0f} ms, "
+              f"throughput {len(latencies) / elapsed:.1f} answers/s")
+    print(f"LLM calls {m['qa_llm_calls_total']:g}, deduplicated {m['qa_deduplicated_total']:g}, "
+          f"cache hits {m['qa_cache_hits_total']:g}, rejected {m['qa_rejected_total']:g}, "
+          f"timeouts {m['qa_timeouts_total']:g}")
+    print(f"retrieval batches {m['qa_retrieve_batch_size']['count']}, "
+          f"mock Ollama requests {mock.requests}, max concurrent {mock.max_concurrent} (limit {args.workers})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--unique", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    with MockOllama(token_delay=args.token_delay) as mock:
+        # ไคลเอนต์ ollama อ่าน OLLAMA_HOST ตอน import ครั้งแรก
+        os.environ["OLLAMA_HOST"] = mock.host
+        os.environ.pop("OLLAMA_FAKE", None)
+        asyncio.run(_run(args, mock))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_retriever.py
+# latency และ recall@10 ของการค้นเวกเตอร์ (vector_index + ann) เทียบ exact / IVF (numpy) / HNSW (ถ้ามี hnswlib)
+# บนเวกเตอร์สังเคราะห์ที่จับกลุ่มกัน (คล้าย embedding จริงของหน้าเว็บหลายหมวด) ที่ 10k / 100k แถว
+# พร้อมขนาดไฟล์ float32 เทียบ int8
+#
+#   python benchmarks/bench_retriever.py
+#   python benchmarks/bench_retriever.py --sizes 10000 --dim 1024 --dtype int8
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ann  # noqa: E402
+from vector_index import VectorFile, build_vectors  # noqa: E402
+
+
+class _SyntheticEmbedder:
+    """embed("row-<i>") คืนแถวที่ i ของเวกเตอร์ที่สร้างไว้ (แทนโมเดลจริง)"""
+
+    model = "synthetic"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed(self, texts):
+        return self.vectors[[int(t.split("-")[1]) for t in texts]]
+
+
+def make_vectors(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _dir_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "int8"])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    kinds = ["exact", "ivf"] + (["hnsw"] if ann._have_hnswlib() else [])
+    print(f"dim {args.dim}, dtype {args.dtype}, ANN kinds: {', '.join(kinds)}")
+    print(f"{'rows':>8} {'ann':>6} {'build(s)':>9} {'file MB':>8} {'ms/query':>9} {'recall@10':>10}")
+    for n in args.sizes:
+        data = make_vectors(n, args.dim)
+        rng = np.random.default_rng(1)
+        queries = data[rng.integers(n, size=args.queries)] + 0.3 * rng.standard_normal(
+            (args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = [set(np.argsort(-(data @ q))[:10].tolist()) for q in queries]
+        for kind in kinds:
+            with tempfile.TemporaryDirectory() as tmp:
+                t0 = time.perf_counter()
+                build_vectors(((f"row-{i}", f"row-{i}") for i in range(n)), tmp, _SyntheticEmbedder(data),
+                              dtype=args.dtype, ann_kind=kind)
+                build_s = time.perf_counter() - t0
+                vectors = VectorFile.open(tmp)
+                t0 = time.perf_counter()
+                found = [vectors.search(q, 10)[0] for q in queries]
+                ms = (time.perf_counter() - t0) / len(queries) * 1000
+                recall = np.mean([len(t & set(f.tolist())) / 10 for t, f in zip(truth, found)])
+                print(f"{n:>8} {kind:>6} {build_s:>9.2f} {_dir_mb(tmp):>8.1f} {ms:>9.2f} {recall:>10.3f}")
+                del vectors
+
+
+if __name__ == "__main__":
+    main()
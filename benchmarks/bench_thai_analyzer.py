@@ -0,0 +1,145 @@
+# benchmarks/bench_thai_analyzer.py
+# เทียบดัชนีเอกสารแบบเดิม (TfidfVectorizer: regex ของ sklearn + stop word อังกฤษ กับข้อความไทยดิบ)
+# กับดัชนีที่ใช้ thai_analyzer (newmm + stop word ไทย + normalize) บนข้อมูล BIO-INDUSTRIES
+# รายงานขนาดดัชนี (จำนวนคำ, nnz, ขนาดเมทริกซ์), เวลา build และคุณภาพการค้น (hit@1, hit@5, MRR)
+#
+# เอกสาร: docs.jsonl ในโฟลเดอร์ปัจจุบัน (หน้าเว็บที่ crawl แล้ว) ถ้าไม่มีจะใช้ชื่อหน้า/ศูนย์/แท็กจาก
+# "ข้อมูลลิงก์เว็บ - BIO-INDUSTRIES.csv" เป็นเนื้อหาแทน
+# คำถาม: วลีต่อเนื่อง 2-4 คำจากชื่อหน้า (NamePage) พิมพ์ติดกันแบบภาษาไทย คำตอบที่ถูก = หน้าที่มีชื่อนั้น
+#
+#   python benchmarks/bench_thai_analyzer.py
+#   python benchmarks/bench_thai_analyzer.py --docs docs.jsonl --queries 300
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chunking import chunk_spans, normalize_text  # noqa: E402
+from doc_index import DocIndex, _field, doc_text  # noqa: E402
+from thai_analyzer import word_tokenize  # noqa: E402
+
+CSV_PATH = os.path.join(ROOT, "ข้อมูลลิงก์เว็บ - BIO-INDUSTRIES.csv")
+_TEMPLATES = ["{}", "{}มีอะไรบ้าง", "อยากทราบเรื่อง{}", "ขอข้อมูล{}หน่อยครับ"]
+
+
+def load_docs(docs_path: str) -> tuple:
+    import pandas as pd
+    meta = pd.read_csv(CSV_PATH).fillna("")
+    if docs_path and os.path.exists(docs_path):
+        from doc_store import DocStore
+        with DocStore(docs_path) as store:
+            docs = list(store.iter_records())
+        names = dict(zip(meta["ID"], meta["NamePage"]))
+        for d in docs:
+            d.setdefault("NamePage", names.get(d.get("ID"), ""))
+        return docs, f"{docs_path} ({len(docs)} pages)"
+    docs = [{"ID": r.ID, "URL": r.URL, "Header": r.Header, "Tag": r.Tag, "NamePage": r.NamePage,
+             "HTML": f"{r.NamePage}\n{r.Center}"} for r in meta.itertuples()]
+    return docs, f"{os.path.basename(CSV_PATH)} metadata ({len(docs)} rows)"
+
+
+def make_queries(docs: list, n: int, seed: int = 0) -> list:
+    """(คำถาม, ชุด index ของหน้าที่ถูก) จากวลีในชื่อหน้า"""
+    by_name = defaultdict(set)
+    for i, d in enumerate(docs):
+        name = _field(d, "NamePage").strip()
+        if name:
+            by_name[name].add(i)
+    rnd = random.Random(seed)
+    names = sorted(by_name)
+    rnd.shuffle(names)
+    queries = []
+    for name in names[:n]:
+        words = [w for w in word_tokenize(name) if w.strip() and any(ch.isalnum() for ch in w)]
+        if not words:
+            continue
+        size = min(len(words), rnd.randint(2, 4))
+        start = rnd.randrange(len(words) - size + 1)
+        phrase = "".join(words[start:start + size])
+        queries.append((rnd.choice(_TEMPLATES).format(phrase), by_name[name]))
+    return queries
+
+
+class OldIndex:
+    """ดัชนีระดับ chunk แบบก่อนมี thai_analyzer: sklearn fit บนข้อความดิบ คำถามตัดด้วย newmm แล้วคั่นช่องว่าง"""
+
+    def __init__(self, docs: list):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        texts, chunk_doc = [], []
+        for i, entry in enumerate(docs):
+            body = normalize_text(_field(entry, "HTML"))
+            for start, end in chunk_spans(body):
+                texts.append(doc_text({"HTML": body[start:end], "Header": _field(entry, "Header"),
+                                       "Tag": _field(entry, "Tag")}))
+                chunk_doc.append(i)
+        self.vectorizer = TfidfVectorizer(stop_words="english")
+        self.matrix = self.vectorizer.fit_transform(texts).tocsr()
+        self.n_docs = len(docs)
+        self._chunk_doc = np.array(chunk_doc, dtype=np.int64)
+
+    def scores(self, question: str) -> np.ndarray:
+        qv = self.vectorizer.transform([" ".join(word_tokenize(question.lower()))])
+        doc_scores = np.zeros(self.n_docs)
+        np.maximum.at(doc_scores, self._chunk_doc, (self.matrix @ qv.T).toarray().ravel())
+        return doc_scores
+
+
+def evaluate(index, queries: list) -> dict:
+    hit1 = hit5 = 0
+    rr = 0.0
+    t0 = time.perf_counter()
+    for question, relevant in queries:
+        scores = index.scores(question)
+        order = np.argsort(-scores, kind="stable")
+        order = order[scores[order] > 0]
+        for rank, i in enumerate(order[:10], start=1):
+            if i in relevant:
+                hit1 += rank == 1
+                hit5 += rank <= 5
+                rr += 1.0 / rank
+                break
+    n = max(len(queries), 1)
+    return {"hit@1": hit1 / n, "hit@5": hit5 / n, "mrr@10": rr / n,
+            "query_ms": (time.perf_counter() - t0) / n * 1000}
+
+
+def matrix_stats(matrix) -> dict:
+    return {"terms": matrix.shape[1], "nnz": matrix.nnz,
+            "kb": (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", default="docs.jsonl", help="DocStore ของหน้าที่ crawl แล้ว (ไม่มี = ใช้ metadata จาก CSV)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs, source = load_docs(args.docs)
+    queries = make_queries(docs, args.queries, args.seed)
+    print(f"documents: {source}, queries: {len(queries)}")
+
+    rows = []
+    for name, build in (("sklearn regex (before)", lambda: OldIndex(docs)),
+                        ("thai_analyzer (after)", lambda: DocIndex.build(docs))):
+        t0 = time.perf_counter()
+        index = build()
+        build_s = time.perf_counter() - t0
+        rows.append((name, build_s, matrix_stats(index.matrix), evaluate(index, queries)))
+
+    print(f"{'index':<24} {'build(s)':>8} {'terms':>7} {'nnz':>8} {'KB':>8} "
+          f"{'hit@1':>6} {'hit@5':>6} {'MRR':>6} {'ms/q':>6}")
+    for name, build_s, size, quality in rows:
+        print(f"{name:<24} {build_s:>8.2f} {size['terms']:>7} {size['nnz']:>8} {size['kb']:>8.1f} "
+              f"{quality['hit@1']:>6.3f} {quality['hit@5']:>6.3f} {quality['mrr@10']:>6.3f} {quality['query_ms']:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
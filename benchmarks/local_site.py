@@ -0,0 +1,148 @@
+# benchmarks/local_site.py
+# เว็บจำลองในเครื่องสำหรับทดสอบ/วัดความเร็ว crawler โดยไม่ยิงเว็บจริง
+# - /page/<n>     หน้า HTML ภาษาไทยพร้อม ETag / Last-Modified (ตอบ 304 ถ้า If-None-Match ตรง)
+# - latency       หน่วงเวลาต่อคำขอ (วินาที)
+# - fail_rate     สัดส่วนคำขอที่ตอบ 503 (ใช้ทดสอบ backoff)
+# - script(n, [(status, headers), ...])  คำตอบที่กำหนดไว้ล่วงหน้าของหน้า n (ใช้ก่อนคำตอบปกติ เช่น 429 + Retry-After)
+# - max_active    จำนวนคำขอที่กำลังประมวลผลพร้อมกันสูงสุดที่เคยเกิด, hits[n] = เวลาที่หน้า n ถูกขอ (ใช้ในการทดสอบ)
+#
+#   python benchmarks/local_site.py --port 8765
+import argparse
+import hashlib
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BOOT_TIME = formatdate(time.time(), usegmt=True)
+
+
+def page_html(n: int, words: int = 400) -> bytes:
+    rnd = random.Random(n)
+    vocab = ["บริการ", "ทดสอบ", "วิเคราะห์", "จุลินทรีย์", "เกษตร", "ผลิตภัณฑ์", "สมุนไพร", "มาตรฐาน", "ห้องปฏิบัติการ"]
+    body = " ".join(rnd.choice(vocab) for _ in range(words))
+    return (
+        "<html><head><meta charset=\"utf-8\"><title>หน้า {n}</title></head><body>"
+        "<nav><a href=\"/\">หน้าแรก</a> | <a href=\"/about\">เกี่ยวกับเรา</a></nav>"
+        "<main><h1>หน้า {n}</h1><p>{body}</p></main>"
+        "<footer>สถาบันวิจัยวิทยาศาสตร์และเทคโนโลยีแห่งประเทศไทย</footer></body></html>"
+    ).format(n=n, body=body).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        site = self.server.site
+        with site.lock:
+            site.requests += 1
+            site.active += 1
+            site.max_active = max(site.max_active, site.active)
+        try:
+            self._get(site)
+        finally:
+            with site.lock:
+                site.active -= 1
+
+    def _get(self, site):
+        try:
+            n = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+        except ValueError:
+            n = None
+        with site.lock:
+            if n is not None:
+                site.hits.setdefault(n, []).append(time.monotonic())
+            scripted = site.scripts.get(n)
+            response = scripted.pop(0) if scripted else None
+        if site.latency:
+            time.sleep(site.latency)
+        if response is not None:
+            status, headers = response
+            self._send(status, b"scripted", extra=headers)
+            return
+        if site.fail_rate and random.random() < site.fail_rate:
+            self._send(503, b"busy")
+            return
+        if n is None:
+            self._send(404, b"not found")
+            return
+        body = page_html(n, site.words)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            with site.lock:
+                site.not_modified += 1
+            self._send(304, b"", etag)
+            return
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None, extra=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", _BOOT_TIME)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class LocalSite:
+    """รันเว็บจำลองใน thread พื้นหลัง: with LocalSite() as site: site.url(3)"""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_rate: float = 0.0, words: int = 400):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.words = words
+        self.requests = 0
+        self.not_modified = 0
+        self.active = 0
+        self.max_active = 0
+        self.hits = {}
+        self.scripts = {}
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.site = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, n: int) -> str:
+        return f"http://127.0.0.1:{self.port}/page/{n}"
+
+    def script(self, n: int, responses) -> None:
+        """ให้หน้า n ตอบตาม responses [(status, headers), ...] ทีละคำขอ ก่อนกลับไปตอบหน้าปกติ"""
+        with self.lock:
+            self.scripts[n] = list(responses)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    with LocalSite(args.port, args.latency, args.fail_rate) as site:
+        print(f"serving {site.url(1)} ... (Ctrl+C เพื่อหยุด)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
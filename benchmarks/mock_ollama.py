@@ -0,0 +1,146 @@
+# benchmarks/mock_ollama.py
+# เซิร์ฟเวอร์จำลอง endpoint /api/chat และ /api/embed ของ Ollama (ตอบแบบเดียวกับ fake_ollama)
+# ใช้ทดสอบ/วัดความเร็ว qa_service โดยใช้ไคลเอนต์ ollama ตัวจริงผ่าน HTTP: ตั้ง OLLAMA_HOST=http://127.0.0.1:<port>
+# - token_delay   หน่วงเวลาต่อ token (วินาที) เพื่อจำลองความเร็วการ generate
+# - นับจำนวนคำขอ และจำนวนคำขอพร้อมกันสูงสุด (max_concurrent) เพื่อตรวจว่าบริการจำกัดงานได้จริง
+#
+#   python benchmarks/mock_ollama.py --port 11435 --token-delay 0.02
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import _reply_tokens, embed  # noqa: E402
+
+
+def _chunk(model: str, content: str, done: bool, **extra) -> dict:
+    return {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+        **extra,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        # ไคลเอนต์บางตัวเช็ก /api/version หรือ / ก่อนใช้งาน
+        self._send_json(200, {"version": "0.0.0-mock"})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path not in ("/api/chat", "/api/embed"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if path == "/api/embed":
+            self._send_json(200, embed(payload.get("model", ""), payload.get("input") or ""))
+            return
+        mock = self.server.mock
+        mock.enter()
+        try:
+            model = payload.get("model", "")
+            if not payload.get("messages"):  # โหลดโมเดลอย่างเดียว (ollama_utils.preload_model)
+                self._send_json(200, _chunk(model, "", True, done_reason="load"))
+                return
+            tokens = _reply_tokens(payload.get("messages") or [])
+            if payload.get("stream", True):
+                self._stream(model, tokens, mock.token_delay)
+            else:
+                time.sleep(mock.token_delay * len(tokens))
+                self._send_json(200, _chunk(model, "".join(tokens), True, done_reason="stop",
+                                            prompt_eval_count=0, eval_count=len(tokens)))
+        finally:
+            mock.leave()
+
+    def _stream(self, model, tokens, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for tok in tokens:
+            time.sleep(delay)
+            self._write_chunk(json.dumps(_chunk(model, tok, False), ensure_ascii=False) + "\n")
+        self._write_chunk(json.dumps(_chunk(model, "", True, done_reason="stop", eval_count=len(tokens))) + "\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockOllama:
+    """เซิร์ฟเวอร์ /api/chat ใน thread แยก ใช้เป็น context manager: with MockOllama() as m: m.host"""
+
+    def __init__(self, port: int = 0, token_delay: float = 0.01):
+        self.token_delay = token_delay
+        self.requests = 0
+        self.active = 0
+        self.max_concurrent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def enter(self):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_concurrent = max(self.max_concurrent, self.active)
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    with MockOllama(args.port, args.token_delay) as m:
+        print(f"mock Ollama on {m.host} (OLLAMA_HOST={m.host})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,231 @@
+# benchmarks/run_benchmarks.py
+# ชุดวัดประสิทธิภาพของเส้นทางหลัก (ค้นเอกสาร / ค้นสินค้า / crawl) บนข้อมูลสังเคราะห์ 1x / 10x / 100x
+# (benchmarks/synthetic.py) แต่ละขนาดรันในโปรเซสแยกในโฟลเดอร์ชั่วคราว (ดัชนีสร้างใหม่จากศูนย์ และ peak RSS
+# เป็นของขนาดนั้นจริงๆ) แล้ววัด
+# - เวลาสร้าง: คลังเอกสาร + ดัชนี TF-IDF (ครั้งแรก), โหลดดัชนีจากดิสก์, ดัชนีสินค้า, แคตตาล็อกสินค้า
+# - latency ต่อคำถาม (p50 / p99 / mean, ms): find_best_context, find_best_chunks, _tfidf_rank_products,
+#   find_related_products, ProductCatalog.filter
+# - peak RSS ของโปรเซส (MB)
+# - throughput ของ crawler.crawl_sync และ Req.fetch_html (ทีละหน้า) กับเว็บจำลองในเครื่อง (local_site.py)
+# ผลบันทึกเป็น JSON (benchmarks/results/<เวลา>.json) ใช้ --compare กับไฟล์ผลรอบก่อนเพื่อดูว่าอะไรช้าลง
+#
+#   python benchmarks/run_benchmarks.py                       # 1x 10x 100x (100x ใช้เวลาหลายนาที)
+#   python benchmarks/run_benchmarks.py --scales 1 10 --compare benchmarks/results/baseline.json
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+
+# ทิศทางของแต่ละค่า: ค่าที่ลงท้ายเหล่านี้ "มากกว่า = ดีกว่า" ที่เหลือ "น้อยกว่า = ดีกว่า"
+_HIGHER_IS_BETTER = ("pages_per_s", "mb_per_s")
+_SETTINGS = ("scale", "docs", "products", "doc_chars", "pages", "latency_s")  # ขนาด/ค่าตั้ง ไม่ใช่ผลวัด
+
+
+def _latency(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "p50_ms": round(statistics.median(times), 3),
+        "p99_ms": round(times[min(len(times) - 1, int(len(times) * 0.99))], 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+    }
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - t0, 3)
+
+
+def _crawl(n_pages: int, n_fetch_html: int, latency: float) -> dict:
+    sys.path.insert(0, HERE)
+    import Req
+    from crawler import CrawlMetrics, crawl_sync
+    from local_site import LocalSite
+
+    with LocalSite(latency=latency) as site:
+        urls = [site.url(i) for i in range(n_pages)]
+        metrics = CrawlMetrics()
+        crawl_sync(urls, metrics=metrics)  # ค่าเริ่มต้นเดียวกับ Req.py (4 การเชื่อมต่อต่อ host)
+        m = metrics.snapshot()
+        t0 = time.perf_counter()
+        for url in urls[:n_fetch_html]:
+            Req.fetch_html(url)
+        fetch_s = time.perf_counter() - t0
+    return {
+        "pages": n_pages,
+        "latency_s": latency,
+        "crawl_sync": {"pages_per_s": round(m["pages_per_s"], 1), "mb_per_s": round(m["bytes_per_s"] / 1e6, 2)},
+        "fetch_html": {"pages_per_s": round(n_fetch_html / fetch_s, 1) if fetch_s else 0.0},
+    }
+
+
+def run_scale(scale: float, n_queries: int, crawl_pages: int, crawl_latency: float) -> dict:
+    """วัดหนึ่งขนาดในโฟลเดอร์ปัจจุบัน (เรียกผ่าน --worker ในโปรเซสแยก)"""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    from synthetic import make_queries, write_corpus
+
+    sizes = write_corpus(".", scale)
+    queries = make_queries(n_queries)
+
+    import qa_engine
+    from doc_index import load_or_build
+    from product_catalog import ProductCatalog
+
+    build = {
+        "doc_index_s": _timed(qa_engine._retriever),  # แปลง output_data.json เป็น DocStore + ตัดคำ + fit
+        "doc_index_load_s": _timed(lambda: load_or_build(qa_engine._doc_store())),
+        "product_index_s": _timed(qa_engine._product_index),
+        "product_catalog_s": _timed(lambda: ProductCatalog(qa_engine.current_products())),
+    }
+    catalog = ProductCatalog(qa_engine.current_products())
+    for q in queries[:5]:  # warm-up (แคชของ tokenizer ฯลฯ)
+        qa_engine.find_best_chunks(q)
+        qa_engine.find_related_products(q)
+
+    latency = {
+        "find_best_context": _latency(qa_engine.find_best_context, queries),
+        "find_best_chunks": _latency(qa_engine.find_best_chunks, queries),
+        "_tfidf_rank_products": _latency(qa_engine._tfidf_rank_products, queries),
+        "find_related_products": _latency(qa_engine.find_related_products, queries),
+        "catalog_filter": _latency(lambda q: catalog.filter(q.split()[0]), queries),
+    }
+    crawl = _crawl(min(sizes["docs"], crawl_pages), min(sizes["docs"], crawl_pages, 100), crawl_latency)
+    return {
+        "scale": scale,
+        **sizes,
+        "build": build,
+        "latency": latency,
+        "crawl": crawl,
+        # ru_maxrss เป็น KB บน Linux, byte บน macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1e6 if sys.platform == "darwin" else 1e3), 1),
+    }
+
+
+def _flatten(d: dict, prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """รายการค่าที่แย่ลงเกิน threshold (เช่น 0.2 = 20%) เทียบกับ baseline"""
+    regressions = []
+    for scale, result in current["scales"].items():
+        old = baseline.get("scales", {}).get(scale)
+        if not old:
+            continue
+        new_flat, old_flat = _flatten(result), _flatten(old)
+        changed = [k for k in new_flat if k.split(".")[-1] in _SETTINGS and new_flat[k] != old_flat.get(k)]
+        if changed:
+            print(f"ℹ️ {scale}: not compared, settings differ ({', '.join(changed)})")
+            continue
+        for key, new in new_flat.items():
+            before = old_flat.get(key)
+            if not before or key.split(".")[-1] in _SETTINGS:
+                continue
+            change = (before - new) / before if key.endswith(_HIGHER_IS_BETTER) else (new - before) / before
+            if change > threshold:
+                regressions.append(f"{scale} {key}: {before:g} -> {new:g} ({change:+.0%} worse)")
+    return regressions
+
+
+def _print_table(results: Dict[str, dict]) -> None:
+    print(f"{'scale':>6} {'docs':>7} {'build s':>8} {'ctx p50':>8} {'ctx p99':>8} {'prod p50':>9} "
+          f"{'prod p99':>9} {'RSS MB':>7} {'crawl p/s':>10}")
+    for name, r in results.items():
+        ctx, prod = r["latency"]["find_best_chunks"], r["latency"]["find_related_products"]
+        print(f"{name:>6} {r['docs']:>7} {r['build']['doc_index_s']:>8.2f} {ctx['p50_ms']:>8.2f} "
+              f"{ctx['p99_ms']:>8.2f} {prod['p50_ms']:>9.2f} {prod['p99_ms']:>9.2f} {r['peak_rss_mb']:>7.0f} "
+              f"{r['crawl']['crawl_sync']['pages_per_s']:>10.0f}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--crawl-pages", type=int, default=2000, help="จำนวนหน้าสูงสุดที่ crawl ต่อขนาด")
+    parser.add_argument("--crawl-latency", type=float, default=0.02, help="เวลาตอบของเว็บจำลอง (วินาที)")
+    parser.add_argument("--out", help="ไฟล์ JSON ของผล (ค่าเริ่มต้น benchmarks/results/<เวลา>.json)")
+    parser.add_argument("--compare", help="ไฟล์ผลรอบก่อนสำหรับเทียบ")
+    parser.add_argument("--threshold", type=float, default=0.2, help="แย่ลงเกินสัดส่วนนี้ถือว่า regression")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scale(args.scales[0], args.queries, args.crawl_pages, args.crawl_latency),
+                         ensure_ascii=False))
+        return
+
+    results = {}
+    env = {**os.environ, "RETRIEVER": "tfidf", "PYTHONPATH": ROOT}
+    env.pop("ANSWER_CACHE_DB", None)
+    for scale in args.scales:
+        name = f"{scale:g}x"
+        print(f"⏳ {name} ...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", "--scales", str(scale),
+                 "--queries", str(args.queries), "--crawl-pages", str(args.crawl_pages),
+                 "--crawl-latency", str(args.crawl_latency)],
+                cwd=tmp, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"❌ {name} failed:\n{proc.stderr[-2000:]}")
+            continue
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scales": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    _print_table(results)
+    print(f"✅ results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        print("\n".join(["⚠️ regressions:"] + regressions) if regressions else "✅ no regressions")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/synthetic.py
+# สร้างข้อมูลสังเคราะห์หน้าตาเหมือนข้อมูลจริง ขนาดเป็นจำนวนเท่าของข้อมูลปัจจุบัน (1x = 493 หน้า / 636 สินค้า)
+# - output_data.json: ID / URL / Header / Center / NamePage / Tag / HTML (ข้อความที่ extract แล้ว หลายบรรทัด
+#   มีเมนู/ท้ายหน้าซ้ำทุกหน้าเหมือนเว็บจริง)
+# - Product List.csv: ID / ชื่อสินค้า / ศูนย์ / link
+# metadata และคำในชื่อสินค้าสุ่มจากไฟล์ CSV จริงใน repo (ถ้ามี) เพื่อให้การตัดคำ/ดัชนีทำงานกับคำไทยจริง
+#
+#   python benchmarks/synthetic.py --scale 10 --out /tmp/corpus10
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from products import load_products  # noqa: E402
+
+LINKS_CSV = os.path.join(ROOT, "ข้อมูลลิงก์เว็บ - BIO-INDUSTRIES.csv")
+PRODUCTS_CSV = os.path.join(ROOT, "Product List.csv")
+BASE_DOCS = 493
+BASE_PRODUCTS = 636
+
+_WORDS = (
+    "บริการ ทดสอบ วิเคราะห์ จุลินทรีย์ เกษตร ผลิตภัณฑ์ อาหาร สมุนไพร ห้องปฏิบัติการ มาตรฐาน "
+    "ศูนย์ เทคโนโลยี ชีวภาพ เพาะเลี้ยง เนื้อเยื่อ พืช ปุ๋ย หมัก สารสกัด เครื่องสำอาง ตัวอย่าง "
+    "ค่าบริการ ติดต่อ ระยะเวลา ผลการทดสอบ รับรอง คุณภาพ การผลิต วัตถุดิบ กระบวนการ "
+    "tistr bio innoag lab iso service culture strain sample report quality"
+).split()
+_NAV = ["หน้าแรก | เกี่ยวกับเรา | บริการ | ติดต่อเรา", "ค้นหา", "English | ไทย"]
+_FOOTER = ["สถาบันวิจัยวิทยาศาสตร์และเทคโนโลยีแห่งประเทศไทย (วว.)",
+           "35 หมู่ 3 ถนนเทคโนธานี ตำบลคลองห้า อำเภอคลองหลวง จังหวัดปทุมธานี 12120",
+           "โทรศัพท์ 0 2577 9000"]
+
+
+def _link_rows() -> List[Dict[str, str]]:
+    try:
+        with open(LINKS_CSV, encoding="utf-8-sig") as f:
+            return [row for row in csv.DictReader(f)]
+    except OSError:
+        return [{"Header": "BIO-INDUSTRIES", "Center": "ศูนย์ทดสอบ", "NamePage": "บริการทดสอบ", "Tag": "บริการ"}]
+
+
+def _word(rnd: random.Random, n_docs: int) -> str:
+    # คำเฉพาะ ~10% ทำให้คลังคำโตตามจำนวนหน้าเหมือนข้อมูลจริง
+    return rnd.choice(_WORDS) if rnd.random() < 0.9 else f"term{rnd.randrange(n_docs * 5)}"
+
+
+def make_docs(n: int, doc_lines: int = 30, seed: int = 0, doc_chars: Optional[int] = None) -> List[dict]:
+    """หน้าเว็บ n หน้าในรูปแบบ output_data.json
+    doc_chars: ความยาวเนื้อหาต่อหน้า (ตัวอักษร) แทนการสุ่มจำนวนบรรทัดตาม doc_lines"""
+    rnd = random.Random(seed)
+    rows = _link_rows()
+    docs = []
+    for i in range(n):
+        meta = rows[i % len(rows)]
+        lines = list(_NAV) + [meta.get("NamePage", "")]
+        size = sum(len(line) + 1 for line in lines)
+        n_lines = rnd.randint(doc_lines // 2, doc_lines)
+        while (size < doc_chars) if doc_chars else (len(lines) - len(_NAV) - 1 < n_lines):
+            line = " ".join(_word(rnd, n) for _ in range(rnd.randint(6, 18)))
+            lines.append(line)
+            size += len(line) + 1
+        lines += _FOOTER
+        docs.append({
+            "ID": f"BIO-{i + 1}",
+            "URL": f"https://www.tistr.or.th/Bio-Industries/page/{i + 1}/",
+            "Header": meta.get("Header", ""),
+            "Center": meta.get("Center", ""),
+            "NamePage": meta.get("NamePage", "") if i < len(rows) else f"{meta.get('NamePage', '')} {i + 1}",
+            "Tag": meta.get("Tag", ""),
+            "HTML": "\n".join(lines),
+        })
+    return docs
+
+
+def make_products(n: int, seed: int = 0) -> List[dict]:
+    """สินค้า n รายการในรูปแบบ Product List.csv"""
+    rnd = random.Random(seed)
+    real = load_products(PRODUCTS_CSV)
+    words = sorted({w for name in real.get("ชื่อสินค้า", []) for w in str(name).split()}) or _WORDS
+    centers = sorted({c for c in real.get("ศูนย์", []) if c}) or ["ศูนย์ทดสอบ"]
+    products = []
+    for i in range(n):
+        products.append({
+            "ID": f"BIO-{i + 1:03d}",
+            "ชื่อสินค้า": " ".join(rnd.sample(words, min(len(words), rnd.randint(1, 4)))),
+            "ศูนย์": rnd.choice(centers),
+            "link": f"https://www.tistr.or.th/Bio-Industries/product/{i + 1}/" if rnd.random() < 0.9 else "",
+        })
+    return products
+
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    rnd = random.Random(seed)
+    templates = ["{}", "{}มีอะไรบ้าง", "อยากทราบเรื่อง{}", "ขอข้อมูล{} {}", "ราคา{}"]
+    return [rnd.choice(templates).format(*(rnd.choice(_WORDS) for _ in range(2))) for _ in range(n)]
+
+
+def write_corpus(out_dir: str, scale: float, doc_lines: int = 30, seed: int = 0) -> Dict[str, int]:
+    """เขียน output_data.json และ Product List.csv ขนาด scale เท่าของข้อมูลปัจจุบันลง out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    docs = make_docs(max(1, int(BASE_DOCS * scale)), doc_lines, seed)
+    products = make_products(max(1, int(BASE_PRODUCTS * scale)), seed)
+    with open(os.path.join(out_dir, "output_data.json"), "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, "Product List.csv"), "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["ID", "ชื่อสินค้า", "ศูนย์", "link"])
+        writer.writeheader()
+        writer.writerows(products)
+    return {"docs": len(docs), "products": len(products),
+            "doc_chars": sum(len(d["HTML"]) for d in docs)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1.0, help="จำนวนเท่าของข้อมูลปัจจุบัน")
+    parser.add_argument("--out", required=True, help="โฟลเดอร์ที่จะเขียนไฟล์")
+    parser.add_argument("--doc-lines", type=int, default=30)
+    args = parser.parse_args()
+    print(write_corpus(args.out, args.scale, args.doc_lines))
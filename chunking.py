@@ -0,0 +1,74 @@
+# chunking.py
+# แบ่งข้อความของหน้าเว็บ (ฟิลด์ HTML) เป็นช่วงสั้นๆ ที่ซ้อนทับกัน สำหรับดัชนีระดับ chunk
+import math
+from typing import List, Tuple
+
+CHUNK_CHARS = 800
+CHUNK_OVERLAP_CHARS = 150
+# ค่าประมาณคร่าวๆ สำหรับข้อความไทยปนอังกฤษ (ใช้คุมขนาด context ไม่ได้ต้องแม่นยำ)
+CHARS_PER_TOKEN = 3.0
+
+
+def estimate_tokens(text: str) -> int:
+    return chars_to_tokens(len(text))
+
+
+def chars_to_tokens(n_chars: int) -> int:
+    return int(math.ceil(n_chars / CHARS_PER_TOKEN))
+
+
+def normalize_text(text: str) -> str:
+    """ตัดช่องว่างหัว-ท้ายบรรทัดและบรรทัดว่างออก (ตำแหน่ง chunk อ้างอิงข้อความรูปนี้)"""
+    return "\n".join(line.strip() for line in (text or "").splitlines() if line.strip())
+
+
+def _split_long_line(length: int, size: int) -> List[int]:
+    # แบ่งเป็นชิ้นยาวเท่าๆ กัน เพื่อไม่ให้เหลือเศษชิ้นสั้นๆ ท้ายบรรทัด
+    n = int(math.ceil(length / size))
+    step = int(math.ceil(length / n))
+    return [min(step, length - i) for i in range(0, length, step)]
+
+
+def chunk_spans(text: str, chunk_chars: int = CHUNK_CHARS,
+                overlap_chars: int = CHUNK_OVERLAP_CHARS) -> List[Tuple[int, int]]:
+    """ช่วง (start, end) ของแต่ละ chunk ใน text ที่ normalize แล้ว: ตัดตามบรรทัดให้ยาวไม่เกิน
+    chunk_chars และซ้อนท้าย chunk ก่อนหน้า overlap_chars"""
+    if not text:
+        return [(0, 0)]
+    pieces: List[Tuple[int, int]] = []
+    pos = 0
+    for line in text.split("\n"):
+        for length in (_split_long_line(len(line), chunk_chars) if len(line) > chunk_chars else [len(line)]):
+            pieces.append((pos, pos + length))
+            pos += length
+        pos += 1  # "\n"
+
+    spans = []
+    current: List[Tuple[int, int]] = []
+    size = 0
+    for piece in pieces:
+        length = piece[1] - piece[0]
+        if current and size + length + 1 > chunk_chars:
+            spans.append((current[0][0], current[-1][1]))
+            # เก็บบรรทัดท้ายๆ ไว้เป็นส่วนซ้อนทับของ chunk ถัดไป
+            tail: List[Tuple[int, int]] = []
+            tail_size = 0
+            for prev in reversed(current):
+                if tail_size + (prev[1] - prev[0]) + 1 > overlap_chars:
+                    break
+                tail.insert(0, prev)
+                tail_size += (prev[1] - prev[0]) + 1
+            if tail_size + length + 1 > chunk_chars:
+                tail, tail_size = [], 0
+            current, size = tail, tail_size
+        current.append(piece)
+        size += length + 1
+    spans.append((current[0][0], current[-1][1]))
+    return spans
+
+
+def split_into_chunks(text: str, chunk_chars: int = CHUNK_CHARS,
+                      overlap_chars: int = CHUNK_OVERLAP_CHARS) -> List[str]:
+    """ข้อความของแต่ละ chunk (ดู chunk_spans)"""
+    norm = normalize_text(text)
+    return [norm[start:end] for start, end in chunk_spans(norm, chunk_chars, overlap_chars)]
@@ -0,0 +1,69 @@
+# context_builder.py
+# ประกอบเนื้อหาเว็บที่ส่งให้ LLM ภายในงบ token ของโมเดล
+# - นับ token ด้วย tokenizer ของโมเดลจริงถ้าตั้ง LLM_TOKENIZER (ชื่อ tokenizer บน Hugging Face หรือ path ของ
+#   tokenizer.json, ต้องมี pip install tokenizers) ไม่งั้นใช้ค่าประมาณจากจำนวนตัวอักษร (chunking.estimate_tokens)
+# - เรียง chunk ตามคะแนนความเกี่ยวข้อง ใส่ทีละชิ้นจนเต็มงบ (ชิ้นที่ใหญ่เกินงบที่เหลือถูกข้าม ลองชิ้นถัดไป)
+# - บรรทัดที่ซ้ำกับที่ใส่ไปแล้ว (chunk ที่ซ้อนทับกัน, เมนู/ท้ายหน้าที่ซ้ำทุกหน้า) ถูกตัดออกก่อนนับ
+import os
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+from chunking import estimate_tokens
+
+LLM_TOKENIZER = os.environ.get("LLM_TOKENIZER") or None
+
+TokenCount = Callable[[str], int]
+
+
+@lru_cache(maxsize=None)
+def token_counter(tokenizer: Optional[str] = LLM_TOKENIZER) -> TokenCount:
+    """ฟังก์ชันนับ token ของข้อความ (โหลด tokenizer ไม่ได้ = ใช้ค่าประมาณ)"""
+    if tokenizer:
+        try:
+            from tokenizers import Tokenizer
+            tok = (Tokenizer.from_file(tokenizer) if os.path.exists(tokenizer)
+                   else Tokenizer.from_pretrained(tokenizer))
+            return lambda text: len(tok.encode(text, add_special_tokens=False).ids)
+        except Exception as e:  # ไม่มีแพ็กเกจ / ดาวน์โหลดไม่ได้
+            print(f"⚠️ Cannot load tokenizer {tokenizer} ({e}), estimating tokens from characters")
+    return estimate_tokens
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.split()).lower()
+
+
+def dedupe_lines(text: str, seen: Set[str]) -> str:
+    """บรรทัดของ text ที่ยังไม่อยู่ใน seen (และเพิ่มลง seen) ไม่นับบรรทัดว่าง"""
+    kept = []
+    for line in text.splitlines():
+        key = _line_key(line)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def assemble_context(blocks: List[Tuple[str, str]], budget: int,
+                     count: Optional[TokenCount] = None) -> Tuple[str, int, int]:
+    """blocks: (หัวเรื่อง, เนื้อหา) เรียงตามความเกี่ยวข้อง
+    คืน (context, จำนวน token ที่ใช้, จำนวน block ที่ใส่)"""
+    count = count or token_counter()
+    seen: Set[str] = set()
+    parts: List[str] = []
+    used = 0
+    for title, body in blocks:
+        # เก็บบรรทัดไว้ที่ seen เมื่อ block ถูกใส่จริงเท่านั้น
+        trial = set(seen)
+        body = dedupe_lines(body, trial)
+        if not body:
+            continue
+        block = f"{title}\n{body}" if title else body
+        cost = count(block) + (count("\n\n") if parts else 0)
+        if used + cost > budget:
+            continue
+        parts.append(block)
+        seen = trial
+        used += cost
+    return "\n\n".join(parts), used, len(parts)
@@ -0,0 +1,175 @@
+# crawler.py
+# ตัวดึงหน้าเว็บแบบ asyncio: ใช้ aiohttp session เดียว (connection pool + keep-alive)
+# จำกัดจำนวนการเชื่อมต่อพร้อมกันต่อ host, จำกัดอัตราคำขอรวม (token bucket)
+# และลองใหม่ด้วย exponential backoff + jitter พร้อมรายงานความเร็ว (pages/s, bytes/s, error rate)
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """exponential backoff แบบ full jitter: สุ่มระหว่าง 0 ถึง min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: Optional[int] = None     # None = ดึงไม่สำเร็จ
+    body: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)  # ชื่อ header เป็นตัวพิมพ์เล็ก
+    charset: Optional[str] = None    # charset ที่ประกาศใน Content-Type (ถ้ามี)
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+
+class CrawlMetrics:
+    """ตัวนับความเร็วการ crawl"""
+
+    def __init__(self, total: int = 0):
+        self.reset(total)
+
+    def reset(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "done": self.done,
+            "total": self.total,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "elapsed_s": elapsed,
+            "pages_per_s": self.done / elapsed,
+            "bytes_per_s": self.bytes / elapsed,
+            "error_rate": (self.errors / self.done) if self.done else 0.0,
+        }
+
+    def format(self) -> str:
+        m = self.snapshot()
+        return (f"{m['done']}/{m['total']} pages, {m['pages_per_s']:.1f} pages/s, "
+                f"{m['bytes_per_s'] / 1e6:.2f} MB/s, errors {m['error_rate']:.1%}")
+
+
+class RateLimiter:
+    """token bucket สำหรับจำกัดจำนวนคำขอรวมต่อวินาที (rate <= 0 = ไม่จำกัด)"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after(headers, attempt: int, base: float, cap: float) -> float:
+    value = headers.get("Retry-After") if headers else None
+    if value and value.isdigit():
+        return min(cap, float(value))
+    return backoff_delay(attempt, base, cap)
+
+
+async def _fetch_one(session: aiohttp.ClientSession, url: str, headers: Dict[str, str],
+                     host_sem: asyncio.Semaphore, limiter: RateLimiter, metrics: CrawlMetrics,
+                     retries: int, backoff_base: float, backoff_cap: float) -> FetchResult:
+    result = FetchResult(url)
+    t0 = time.perf_counter()
+    for attempt in range(retries):
+        result.attempts = attempt + 1
+        delay = None
+        async with host_sem:
+            await limiter.acquire()
+            try:
+                async with session.get(url, headers=headers) as resp:
+                    body = await resp.read()
+                    if resp.status in RETRY_STATUSES and attempt + 1 < retries:
+                        delay = _retry_after(resp.headers, attempt, backoff_base, backoff_cap)
+                        result.error = f"HTTP {resp.status}"
+                    else:
+                        result.status = resp.status
+                        result.body = body
+                        result.headers = {k.lower(): v for k, v in resp.headers.items()}
+                        result.charset = resp.charset
+                        result.error = None
+                        metrics.bytes += len(body)
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.error = f"{type(e).__name__}: {e}"
+                print(f"❌ Error fetching {url}: {result.error}")
+                delay = backoff_delay(attempt, backoff_base, backoff_cap)
+        # รอ backoff นอก semaphore เพื่อไม่กันคิวของ host เดียวกัน
+        if attempt + 1 < retries:
+            metrics.retries += 1
+            await asyncio.sleep(delay)
+    result.elapsed = time.perf_counter() - t0
+    metrics.done += 1
+    if result.status is None or result.status >= 400:
+        metrics.errors += 1
+    return result
+
+
+async def crawl(urls: List[str], headers_for: Optional[Callable[[str], Dict[str, str]]] = None,
+                per_host: int = 4, max_connections: int = 32, rate: float = 0.0,
+                retries: int = 3, timeout: float = 30.0, backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                metrics: Optional[CrawlMetrics] = None,
+                on_progress: Optional[Callable[[CrawlMetrics], None]] = None,
+                progress_every: int = 50,
+                on_result: Optional[Callable[[int, FetchResult], None]] = None) -> List[FetchResult]:
+    """ดึงทุก URL พร้อมกัน คืน FetchResult เรียงตามลำดับของ urls (ส่ง metrics มาเพื่ออ่านสถิติภายหลัง)
+    on_result(i, result) ถูกเรียกทันทีที่ urls[i] เสร็จ (ใน event loop) แล้วปล่อย body ทิ้ง ไม่ถือไว้ทั้งรอบ"""
+    if metrics is None:
+        metrics = CrawlMetrics()
+    metrics.reset(len(urls))
+    limiter = RateLimiter(rate)
+    host_sems: Dict[str, asyncio.Semaphore] = {}
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=per_host)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        async def run(i: int, url: str) -> FetchResult:
+            host = urlsplit(url).netloc
+            sem = host_sems.setdefault(host, asyncio.Semaphore(per_host))
+            headers = headers_for(url) if headers_for else {}
+            res = await _fetch_one(session, url, headers, sem, limiter, metrics,
+                                   retries, backoff_base, backoff_cap)
+            if on_result:
+                on_result(i, res)
+                res.body = None
+            if on_progress and (metrics.done % progress_every == 0 or metrics.done == metrics.total):
+                on_progress(metrics)
+            return res
+
+        results = await asyncio.gather(*(run(i, u) for i, u in enumerate(urls)))
+    return list(results)
+
+
+def crawl_sync(urls: List[str], **kwargs) -> List[FetchResult]:
+    """เรียก crawl จากโค้ดแบบ synchronous"""
+    return asyncio.run(crawl(urls, **kwargs))
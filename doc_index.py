@@ -0,0 +1,266 @@
+# doc_index.py
+# ดัชนี TF-IDF ของหน้าเว็บที่ fit ครั้งเดียวตอน crawl/ingest แล้วบันทึกลงดิสก์
+# ตอนถามคำถามจะเหลือแค่ transform คำถาม 1 ครั้ง + sparse dot product
+# แต่ละแถวของเมทริกซ์คือ chunk ของหน้าเว็บ (ดู chunking.py) พร้อม metadata ID/URL/Header
+# chunk เก็บแค่ตำแหน่ง (start, end) ข้อความจริงอ่านจาก DocStore เมื่อต้องใช้
+# แต่ละรุ่นของดัชนีอยู่ในโฟลเดอร์ย่อย สลับด้วย manifest.json (เหมือน current.json ของ vector_index.py)
+#
+# เอกสารและคำถามตัดคำด้วย thai_analyzer ตัวเดียวกัน (newmm + stop word ไทย) ผลตัดคำของแต่ละหน้า
+# เก็บใน TokenCache จึง fit ใหม่ได้โดยตัดคำเฉพาะหน้าที่เปลี่ยน; TF-IDF คำนวณด้วย tfidf.py (ไม่ใช้ sklearn)
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from chunking import chars_to_tokens, chunk_spans, normalize_text
+from tfidf import TfidfModel, fit_tfidf, terms_of
+from thai_analyzer import ANALYZER_VERSION, TokenCache, analyze, cached_analyze_spans, text_key
+
+INDEX_DIR = "index_cache"
+INDEX_FORMAT_VERSION = 5  # 5: ไฟล์ดัชนีอยู่ในโฟลเดอร์รุ่น (manifest.json ชี้ด้วย "version")
+
+_MANIFEST_FILE = "manifest.json"
+_VOCAB_FILE = "vocab.npz"
+_MATRIX_FILE = "matrix.npz"
+_CHUNKS_FILE = "chunks.json"
+_TOKENS_FILE = "tokens.sqlite"
+_VERSION_PREFIX = "tfidf-"
+
+
+def file_hash(path: str) -> str:
+    """sha256 ของไฟล์ (อ่านทีละก้อน ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _field(entry: dict, key: str) -> str:
+    # ช่องว่างใน CSV กลายเป็น NaN (float) ในข้อมูลที่ crawl มา
+    value = entry.get(key, "")
+    return value if isinstance(value, str) else ""
+
+
+def doc_text(entry: dict) -> str:
+    """ข้อความที่ใช้ทำดัชนีของแต่ละหน้า (HTML + หัวข้อ + แท็ก)"""
+    return _field(entry, "HTML") + " " + _field(entry, "Header") + " " + _field(entry, "Tag")
+
+
+def chunk_text(chunk: dict, body: str) -> str:
+    """ข้อความของ chunk จากเนื้อหาเต็มของหน้า (ฟิลด์ HTML)"""
+    return normalize_text(body)[chunk["start"]:chunk["end"]]
+
+
+class DocIndex:
+    """เมทริกซ์ TF-IDF ระดับ chunk + vocabulary/idf (TfidfModel) ที่ fit แล้ว"""
+
+    def __init__(self, vectorizer: TfidfModel, matrix: sp.csr_matrix, chunks: List[dict],
+                 n_docs: int, source_hash: str = ""):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.chunks = chunks
+        self.n_docs = n_docs
+        self.source_hash = source_hash
+        self.chunk_doc = np.array([c["doc"] for c in chunks], dtype=np.int64)
+
+    @classmethod
+    def build(cls, docs: Iterable[dict], source_hash: str = "", token_cache: Optional[TokenCache] = None,
+              workers: Optional[int] = None) -> "DocIndex":
+        """แบ่งทุกหน้าเป็น chunk {"doc", "ID", "URL", "Header", "start", "end"} แล้ว fit TF-IDF
+        ตัดคำทั้งหน้าครั้งเดียว (ผ่าน token_cache ถ้ามี) แล้วแบ่งคำให้แต่ละ chunk ตาม offset"""
+        entries, bodies = [], []
+        for entry in docs:
+            entries.append({"ID": entry.get("ID", ""), "URL": entry.get("URL", ""),
+                            "Header": entry.get("Header", ""), "Tag": _field(entry, "Tag")})
+            bodies.append(normalize_text(_field(entry, "HTML")))
+        doc_spans = cached_analyze_spans(bodies, token_cache, workers)
+
+        chunks, token_lists = [], []
+        meta_tokens: Dict[str, List[str]] = {}  # หัวข้อ/แท็กซ้ำกันหลายหน้า ตัดคำครั้งเดียว
+        for i, (entry, body, spans) in enumerate(zip(entries, bodies, doc_spans)):
+            meta = _field(entry, "Header") + " " + entry["Tag"]
+            if meta not in meta_tokens:
+                meta_tokens[meta] = analyze(meta)
+            starts = [start for start, _ in spans]
+            for start, end in chunk_spans(body):
+                chunks.append({
+                    "doc": i,
+                    "ID": entry["ID"],
+                    "URL": entry["URL"],
+                    "Header": entry["Header"],
+                    "start": start,
+                    "end": end,
+                })
+                # ใส่หัวข้อ/แท็กของหน้าลงในทุก chunk เพื่อให้ยังค้นเจอจาก metadata ได้
+                lo, hi = bisect_left(starts, start), bisect_left(starts, end)
+                token_lists.append([token for _, token in spans[lo:hi]] + meta_tokens[meta])
+        if token_cache is not None:
+            token_cache.retain(text_key(body) for body in bodies)
+        vocab, idf, matrix = fit_tfidf(token_lists)
+        return cls(TfidfModel(vocab, idf), matrix, chunks, len(entries), source_hash)
+
+    def chunk_scores(self, query_text: str) -> np.ndarray:
+        """คะแนนความคล้าย (cosine) ของคำถาม (ข้อความดิบ) กับทุก chunk"""
+        qv = self.vectorizer.transform([analyze(query_text)])
+        return (self.matrix @ qv.T).toarray().ravel()
+
+    def scores(self, query_text: str) -> np.ndarray:
+        """คะแนนของแต่ละหน้า = คะแนนของ chunk ที่ดีที่สุดในหน้านั้น"""
+        doc_scores = np.zeros(self.n_docs)
+        np.maximum.at(doc_scores, self.chunk_doc, self.chunk_scores(query_text))
+        return doc_scores
+
+    def search(self, query_text: str, k: int = 5, token_budget: Optional[int] = None) -> List[Tuple[dict, float]]:
+        """chunk ที่เกี่ยวข้องที่สุดข้ามทุกหน้า ไม่เกิน k ชิ้นและรวมกันไม่เกิน token_budget"""
+        scores = self.chunk_scores(query_text)
+        order = np.argsort(-scores, kind="stable")
+        return self.take(order, scores[order], k, token_budget)
+
+    def score_matrix(self, query_texts: List[str]) -> sp.csc_matrix:
+        """คะแนนของทุก chunk กับหลายคำถามในการคูณครั้งเดียว: chunk x คำถาม (เก็บเฉพาะค่าที่ไม่เป็นศูนย์)"""
+        qm = self.vectorizer.transform([analyze(q) for q in query_texts])
+        scores = (self.matrix @ qm.T).tocsc()
+        scores.sort_indices()
+        return scores
+
+    def search_many(self, query_texts: List[str], k: int = 5,
+                    token_budget: Optional[int] = None) -> List[List[Tuple[dict, float]]]:
+        """search หลายคำถามพร้อมกัน: transform ครั้งเดียวแล้วคูณ sparse matrix ครั้งเดียว"""
+        if not query_texts:
+            return []
+        scores = self.score_matrix(query_texts)
+        results = []
+        for j in range(len(query_texts)):
+            lo, hi = scores.indptr[j], scores.indptr[j + 1]
+            idxs, vals = scores.indices[lo:hi], scores.data[lo:hi]
+            order = np.lexsort((idxs, -vals))  # เรียงเหมือน argsort แบบ stable ใน search
+            results.append(self.take(idxs[order], vals[order], k, token_budget))
+        return results
+
+    def take(self, order: np.ndarray, ordered_scores: np.ndarray, k: int,
+             token_budget: Optional[int]) -> List[Tuple[dict, float]]:
+        """chunk ตามลำดับ order ที่คะแนน > 0 ไม่เกิน k ชิ้นและรวมกันไม่เกิน token_budget"""
+        results = []
+        used = 0
+        for i, score in zip(order, ordered_scores):
+            if score <= 0 or len(results) >= k:
+                break
+            chunk = self.chunks[i]
+            cost = chars_to_tokens(chunk["end"] - chunk["start"])
+            if token_budget is not None and used + cost > token_budget:
+                continue  # chunk นี้ใหญ่เกินงบที่เหลือ ลองชิ้นถัดไป
+            results.append((chunk, float(score)))
+            used += cost
+        return results
+
+    # ----------------------------- บันทึก / โหลด -----------------------------
+    def save(self, index_dir: str = INDEX_DIR) -> None:
+        """เขียนไฟล์ดัชนีลงโฟลเดอร์รุ่นใหม่ แล้วสลับ manifest.json (os.replace) ให้ชี้ไปที่รุ่นนั้น
+        ผู้อ่านที่โหลดพร้อมกัน (Req.py / แอป) จึงเห็นรุ่นเก่าหรือรุ่นใหม่ครบชุดเสมอ ไม่เห็นไฟล์ผสมกัน"""
+        os.makedirs(index_dir, exist_ok=True)
+        previous = self.read_manifest(index_dir) or {}
+        version = f"{_VERSION_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(index_dir, version)
+        os.makedirs(path)
+        terms = terms_of(self.vectorizer.vocabulary_)
+        np.savez_compressed(
+            os.path.join(path, _VOCAB_FILE),
+            terms=np.array(terms, dtype=str),
+            idf=self.vectorizer.idf_.astype(np.float64),
+        )
+        sp.save_npz(os.path.join(path, _MATRIX_FILE), self.matrix)
+        with open(os.path.join(path, _CHUNKS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f, ensure_ascii=False)
+        # เขียน manifest ทีหลังสุด: ถ้าเขียนไฟล์ข้างบนไม่ครบ ดัชนีจะไม่ถูกนำมาใช้
+        manifest = {
+            "format": INDEX_FORMAT_VERSION,
+            "version": version,
+            "analyzer": ANALYZER_VERSION,
+            "source_hash": self.source_hash,
+            "n_docs": self.n_docs,
+            "n_chunks": len(self.chunks),
+            "n_terms": len(terms),
+        }
+        tmp = os.path.join(index_dir, f"{_MANIFEST_FILE}.{version}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(index_dir, _MANIFEST_FILE))
+        # เก็บรุ่นก่อนหน้าไว้หนึ่งรุ่น (ผู้อ่านที่เพิ่งอ่าน manifest เดิมยังโหลดได้) ลบรุ่นที่เก่ากว่านั้น
+        keep = {version, previous.get("version")}
+        for name in os.listdir(index_dir):
+            old = os.path.join(index_dir, name)
+            if name.startswith(_VERSION_PREFIX) and name not in keep and os.path.isdir(old):
+                shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def read_manifest(index_dir: str = INDEX_DIR) -> Optional[dict]:
+        path = os.path.join(index_dir, _MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR, manifest: Optional[dict] = None) -> Optional["DocIndex"]:
+        """โหลดรุ่นที่ manifest ชี้ (ส่ง manifest ที่อ่านไว้แล้วมาได้ เพื่อให้ได้รุ่นเดียวกับที่ตรวจ)"""
+        manifest = manifest or cls.read_manifest(index_dir)
+        if (not manifest or manifest.get("format") != INDEX_FORMAT_VERSION
+                or manifest.get("analyzer") != ANALYZER_VERSION):
+            return None
+        path = os.path.join(index_dir, manifest.get("version", ""))
+        try:
+            with np.load(os.path.join(path, _VOCAB_FILE)) as data:
+                terms = data["terms"].tolist()
+                idf = data["idf"]
+            matrix = sp.load_npz(os.path.join(path, _MATRIX_FILE)).tocsr()
+            with open(os.path.join(path, _CHUNKS_FILE), encoding="utf-8") as f:
+                chunks = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        vectorizer = TfidfModel({t: i for i, t in enumerate(terms)}, idf)
+        return cls(vectorizer, matrix, chunks, manifest.get("n_docs", 0), manifest.get("source_hash", ""))
+
+
+def _build(store, source_hash: str, index_dir: str) -> DocIndex:
+    try:
+        token_cache = TokenCache(os.path.join(index_dir, _TOKENS_FILE))
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Cannot open token cache in {index_dir}: {e}")
+        return DocIndex.build(store.iter_records(), source_hash)
+    with token_cache:
+        return DocIndex.build(store.iter_records(), source_hash, token_cache)
+
+
+def build_index(store, index_dir: str = INDEX_DIR) -> DocIndex:
+    """fit ดัชนีจากเอกสารใน DocStore แล้วบันทึกลงดิสก์ (เรียกตอน crawl/ingest)"""
+    index = _build(store, store.fingerprint(), index_dir)
+    index.save(index_dir)
+    return index
+
+
+def load_or_build(store, index_dir: str = INDEX_DIR) -> DocIndex:
+    """โหลดดัชนีจากดิสก์ถ้าตรงกับเวอร์ชันข้อมูลใน DocStore ไม่งั้น fit ใหม่แล้วบันทึก"""
+    source_hash = store.fingerprint()
+    manifest = DocIndex.read_manifest(index_dir)
+    if manifest and manifest.get("source_hash") == source_hash and manifest.get("n_docs") == len(store):
+        index = DocIndex.load(index_dir, manifest)
+        if index is not None:
+            return index
+    index = _build(store, source_hash, index_dir)
+    try:
+        index.save(index_dir)
+    except OSError as e:
+        print(f"⚠️ Cannot save index to {index_dir}: {e}")
+    return index
@@ -0,0 +1,283 @@
+# doc_store.py
+# คลังเอกสารแบบ append-only JSONL (หนึ่งบรรทัดต่อหนึ่งหน้า) แทน output_data.json ก้อนเดียว
+# - crawler เขียนทีละ record (เฉพาะหน้าที่เพิ่ม/เปลี่ยน), ลบด้วย tombstone
+# - ไฟล์ .idx เก็บ offset/ความยาว/hash/metadata ของ record ล่าสุดของแต่ละ ID
+# - อยู่ในหน่วยความจำแค่ metadata + index; เนื้อหา (HTML) อ่านจากดิสก์เมื่อต้องใช้ตาม ID
+# - ผู้เขียน (crawler / แปลง output_data.json) เขียนผ่าน store.writing() ซึ่งถือล็อกไฟล์ <path>.lock ข้ามโปรเซส
+#
+#   python doc_store.py output_data.json        # แปลงไฟล์เดิมเป็น docs.jsonl
+import hashlib
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from file_lock import file_lock
+
+DOCS_STORE_PATH = "docs.jsonl"
+BODY_FIELD = "HTML"
+_DELETED = "_deleted"
+_INDEX_VERSION = 1
+
+
+def _record_line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n").encode("utf-8")
+
+
+class DocStore:
+    """คลังเอกสาร JSONL พร้อม offset index; ใช้ with DocStore(...) as store: เพื่อบันทึก index ตอนปิด"""
+
+    def __init__(self, path: str = DOCS_STORE_PATH):
+        self.path = path
+        self.index_path = path + ".idx"
+        # ID -> [offset, length, sha1, metadata] (เรียงตามลำดับที่ ID ปรากฏครั้งแรก)
+        self._entries: Dict[str, list] = {}
+        self._size = 0
+        self._garbage = 0  # จำนวน record เก่าที่ถูกแทนที่/ลบแล้ว (ใช้ตัดสินใจ compact)
+        self._dirty = False
+        self._partial_tail = False  # มีเศษบรรทัดที่เขียนไม่จบท้ายไฟล์
+        self._lock = threading.Lock()
+        self._reader = None
+        self._load_index()
+
+    # ----------------------------- index -----------------------------
+    def _load_index(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        file_size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _INDEX_VERSION and data.get("size", 0) <= file_size:
+                self._entries = {e[0]: e[1:] for e in data["entries"]}
+                self._size = data["size"]
+                self._garbage = data.get("garbage", 0)
+        except (OSError, ValueError, KeyError):
+            self._entries, self._size, self._garbage = {}, 0, 0
+        if self._size < file_size:
+            # มี record ที่เขียนหลังบันทึก index ครั้งล่าสุด (เช่น โปรแกรมหยุดกลางคัน) อ่านเฉพาะส่วนท้าย
+            self._scan_from(self._size)
+
+    def _scan_from(self, start: int) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    self._partial_tail = True  # บรรทัดสุดท้ายเขียนไม่จบ
+                    break
+                try:
+                    self._apply(json.loads(line), offset, len(line), hashlib.sha1(line).hexdigest())
+                except ValueError:
+                    pass
+                offset += len(line)
+        self._size = offset
+        self._dirty = True
+
+    def _apply(self, record: dict, offset: int, length: int, digest: str) -> None:
+        doc_id = str(record.get("ID"))
+        if doc_id in self._entries:
+            self._garbage += 1
+        if record.get(_DELETED):
+            self._entries.pop(doc_id, None)
+            return
+        meta = {k: v for k, v in record.items() if k != BODY_FIELD}
+        self._entries[doc_id] = [offset, length, digest, meta]
+
+    def save_index(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": _INDEX_VERSION,
+                "size": self._size,
+                "garbage": self._garbage,
+                "entries": [[doc_id] + entry for doc_id, entry in self._entries.items()],
+            }
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    # ----------------------------- เขียน -----------------------------
+    @contextmanager
+    def writing(self) -> Iterator["DocStore"]:
+        """ถือล็อกไฟล์ตลอดการเขียน (ผู้เขียนทีละโปรเซส) อ่าน index ใหม่หลังได้ล็อก และบันทึก index ก่อนปล่อย"""
+        with file_lock(self.path + ".lock"):
+            try:
+                with self._lock:
+                    # โปรเซสอื่นอาจเขียน/compact ไปแล้วหลังเปิด store นี้
+                    self._close_reader()
+                    self._entries, self._size, self._garbage = {}, 0, 0
+                    self._dirty = self._partial_tail = False
+                    self._load_index()
+                yield self
+            finally:
+                self.close()
+
+    def _append(self, line: bytes) -> int:
+        if self._partial_tail:
+            # ตัดเศษบรรทัดที่เขียนไม่จบทิ้งก่อนต่อท้าย
+            with open(self.path, "r+b") as f:
+                f.truncate(self._size)
+            self._partial_tail = False
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+        offset = self._size
+        self._size += len(line)
+        self._dirty = True
+        return offset
+
+    def put(self, record: dict) -> bool:
+        """เพิ่ม/แทนที่ record ตาม ID; คืน True ถ้าเนื้อหาเปลี่ยน (ถ้าเหมือนเดิมจะไม่เขียนซ้ำ)"""
+        line = _record_line(record)
+        digest = hashlib.sha1(line).hexdigest()
+        doc_id = str(record.get("ID"))
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and entry[2] == digest:
+                return False
+            offset = self._append(line)
+            self._apply(record, offset, len(line), digest)
+            return True
+
+    def delete(self, doc_id: str) -> bool:
+        doc_id = str(doc_id)
+        with self._lock:
+            if doc_id not in self._entries:
+                return False
+            line = _record_line({"ID": doc_id, _DELETED: True})
+            offset = self._append(line)
+            self._apply({"ID": doc_id, _DELETED: True}, offset, len(line), "")
+            self._garbage += 1  # ตัว tombstone เอง
+            return True
+
+    def compact(self) -> None:
+        """เขียนไฟล์ใหม่ให้เหลือเฉพาะ record ล่าสุดของแต่ละ ID"""
+        with self._lock:
+            tmp = self.path + ".compact"
+            entries = {}
+            offset = 0
+            with open(tmp, "wb") as out:
+                for doc_id, (old_offset, length, digest, meta) in self._entries.items():
+                    line = self._read_line(old_offset, length)
+                    out.write(line)
+                    entries[doc_id] = [offset, length, digest, meta]
+                    offset += length
+            self._close_reader()
+            os.replace(tmp, self.path)
+            self._entries, self._size, self._garbage, self._dirty = entries, offset, 0, True
+        self.save_index()
+
+    def compact_if_needed(self, max_garbage_ratio: float = 0.5) -> bool:
+        if self._garbage > max(len(self._entries), 1) * max_garbage_ratio:
+            self.compact()
+            return True
+        return False
+
+    # ----------------------------- อ่าน -----------------------------
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def open_reader(self) -> "DocStore":
+        """เปิดไฟล์สำหรับอ่านไว้ทันที: ถ้าโปรเซสอื่น compact (แทนที่ไฟล์) ภายหลัง store นี้ยังอ่านไฟล์เดิมได้ถูกต้อง"""
+        with self._lock:
+            if self._reader is None and os.path.exists(self.path):
+                self._reader = open(self.path, "rb")
+        return self
+
+    def _read_line(self, offset: int, length: int) -> bytes:
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(offset)
+        return self._reader.read(length)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, doc_id) -> bool:
+        return str(doc_id) in self._entries
+
+    def ids(self) -> List[str]:
+        return list(self._entries)
+
+    def meta(self, doc_id: str) -> Optional[dict]:
+        entry = self._entries.get(str(doc_id))
+        return entry[3] if entry else None
+
+    def digest(self, doc_id: str) -> Optional[str]:
+        """sha1 ของ record ปัจจุบัน (เปลี่ยนเมื่อเนื้อหาเปลี่ยน)"""
+        entry = self._entries.get(str(doc_id))
+        return entry[2] if entry else None
+
+    def metadata(self) -> List[dict]:
+        """metadata (ทุกฟิลด์ยกเว้น HTML) ของเอกสารทั้งหมด ตามลำดับใน store"""
+        return [entry[3] for entry in self._entries.values()]
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        """record เต็ม (รวม HTML) อ่านจากดิสก์"""
+        with self._lock:
+            entry = self._entries.get(str(doc_id))
+            if entry is None:
+                return None
+            line = self._read_line(entry[0], entry[1])
+        return json.loads(line)
+
+    def get_body(self, doc_id: str) -> Optional[str]:
+        record = self.get(doc_id)
+        return record.get(BODY_FIELD) if record else None
+
+    def iter_records(self) -> Iterator[dict]:
+        """อ่าน record ปัจจุบันทีละรายการ (ไม่โหลดทั้งไฟล์)"""
+        for doc_id in list(self._entries):
+            record = self.get(doc_id)
+            if record is not None:
+                yield record
+
+    def fingerprint(self) -> str:
+        """hash ของ (ID, hash ของ record) ทั้งหมด ใช้เป็นเวอร์ชันของข้อมูลสำหรับดัชนีปลายทาง"""
+        h = hashlib.sha256()
+        for doc_id, entry in self._entries.items():
+            h.update(f"{doc_id}\t{entry[2]}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def close(self) -> None:
+        self.save_index()
+        self._close_reader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_json(json_path: str, store_path: str = DOCS_STORE_PATH) -> DocStore:
+    """แปลง output_data.json (JSON array) เป็น DocStore"""
+    with open(json_path, encoding="utf-8") as f:
+        records = json.load(f)
+    with DocStore(store_path).writing() as store:
+        seen = set()
+        for record in records:
+            store.put(record)
+            seen.add(str(record.get("ID")))
+        for doc_id in store.ids():
+            if doc_id not in seen:
+                store.delete(doc_id)
+        store.compact_if_needed()
+        if os.path.exists(store_path):
+            os.utime(store_path)  # store ใหม่กว่า json แล้ว แม้ไม่มี record เปลี่ยน (qa_engine เทียบ mtime)
+    return store
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "output_data.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else DOCS_STORE_PATH
+    s = convert_json(src, dst)
+    print(f"✅ Converted {len(s)} documents from {src} to {dst}")
@@ -0,0 +1,218 @@
+# extract.py
+# ขั้นตอนแปลง HTML -> ข้อความ แยกจากการดึงหน้าเว็บ
+# - รันใน process pool (การ parse ใช้ CPU ล้วน ถ้าทำใน thread จะติด GIL)
+# - ใช้ lxml ถ้ามี, ใช้ charset ที่เว็บประกาศไว้ก่อนการเดา
+# - ตัดบรรทัดที่ซ้ำกันในหลายหน้า (เมนู/ส่วนท้ายของเว็บ) ออก
+# - เก็บ HTML ดิบไว้ (RawHtmlStore) เพื่อ extract ใหม่ได้โดยไม่ต้องดึงหน้าเว็บซ้ำ
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+RAW_HTML_DIR = "raw_html"
+# ต่ำกว่านี้ parse ใน process เดียวเร็วกว่าเปิด process pool
+MIN_PAGES_FOR_POOL = 32
+
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+_DROP_TAGS = ["script", "style", "noscript", "template", "svg"]
+
+
+def declared_charset(content_type: Optional[str], body: bytes = b"") -> Optional[str]:
+    """charset จาก Content-Type หรือจาก <meta charset> ช่วงต้นของเอกสาร"""
+    if content_type:
+        m = _CHARSET_RE.search(content_type)
+        if m:
+            return m.group(1)
+    m = _META_CHARSET_RE.search(body[:4096])
+    if m:
+        return m.group(1).decode("ascii", "ignore")
+    return None
+
+
+def decode_html(body: bytes, charset: Optional[str] = None) -> str:
+    """ถอดรหัสด้วย charset ที่ประกาศไว้ ถ้าไม่มี/ใช้ไม่ได้จึงค่อยเดา (utf-8 / cp874 ก่อน)"""
+    for enc in (charset, declared_charset(None, body)):
+        if enc:
+            try:
+                return body.decode(enc)
+            except (LookupError, UnicodeDecodeError):
+                pass
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return UnicodeDammit(body, ["cp874", "tis-620"]).unicode_markup or body.decode("utf-8", "replace")
+
+
+def html_to_text(body: bytes, charset: Optional[str] = None) -> str:
+    """ข้อความหลักของหน้า (หนึ่งบรรทัดต่อหนึ่งส่วนข้อความ)"""
+    soup = BeautifulSoup(decode_html(body, charset), PARSER)
+    for tag in soup(_DROP_TAGS):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def _extract_one(page: Tuple[bytes, Optional[str]]) -> str:
+    return html_to_text(*page)
+
+
+def extract_texts(pages: Sequence[Tuple[bytes, Optional[str]]], workers: Optional[int] = None) -> List[str]:
+    """แปลงหลายหน้าพร้อมกันใน process pool: pages = [(body, charset), ...]"""
+    if len(pages) < MIN_PAGES_FOR_POOL or workers == 1:
+        return [_extract_one(p) for p in pages]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_extract_one, pages, chunksize=8))
+
+
+def boilerplate_lines(counts: Counter, n_pages: int, min_fraction: float = 0.3, min_pages: int = 5) -> Set[str]:
+    """บรรทัดที่พบใน >= min_fraction ของทุกหน้า (และอย่างน้อย min_pages หน้า) เช่น เมนู/ส่วนท้าย
+    counts = จำนวนหน้าที่มีแต่ละบรรทัด (นับบรรทัดละครั้งต่อหน้า)"""
+    threshold = max(min_pages, int(math.ceil(min_fraction * n_pages)))
+    return {line for line, c in counts.items() if c >= threshold}
+
+
+def strip_boilerplate(text: Optional[str], chrome: Set[str]) -> Optional[str]:
+    if not text or not chrome:
+        return text
+    kept = "\n".join(line for line in text.splitlines() if line not in chrome)
+    return kept or text  # ถ้าหน้าไหนเหลือว่าง ให้ใช้ข้อความเดิม
+
+
+def remove_boilerplate(texts: Sequence[Optional[str]], min_fraction: float = 0.3,
+                       min_pages: int = 5) -> List[Optional[str]]:
+    """ตัดบรรทัดที่ซ้ำกันในหลายหน้า (ดู boilerplate_lines) ออกจากทุกหน้า"""
+    pages = [t for t in texts if t]
+    counts = Counter()
+    for t in pages:
+        counts.update(set(t.splitlines()))
+    chrome = boilerplate_lines(counts, len(pages), min_fraction, min_pages)
+    return [strip_boilerplate(t, chrome) for t in texts]
+
+
+class RawHtmlStore:
+    """เก็บ HTML ดิบ (gzip) + charset และข้อความที่ extract แล้ว แยกไฟล์ตาม URL"""
+
+    def __init__(self, root: str = RAW_HTML_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, url: str, ext: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(url.encode("utf-8")).hexdigest() + ext)
+
+    def has_raw(self, url: str) -> bool:
+        return os.path.exists(self._path(url, ".html.gz"))
+
+    def save_raw(self, url: str, body: bytes, charset: Optional[str]) -> None:
+        with gzip.open(self._path(url, ".html.gz"), "wb") as f:
+            f.write(body)
+        with open(self._path(url, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "charset": charset}, f, ensure_ascii=False)
+        # ข้อความเดิมใช้ไม่ได้แล้ว
+        text_path = self._path(url, ".txt.gz")
+        if os.path.exists(text_path):
+            os.remove(text_path)
+
+    def load_raw(self, url: str) -> Tuple[bytes, Optional[str]]:
+        with gzip.open(self._path(url, ".html.gz"), "rb") as f:
+            body = f.read()
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f:
+                charset = json.load(f).get("charset")
+        except (OSError, ValueError):
+            charset = None
+        return body, charset
+
+    def save_text(self, url: str, text: str) -> None:
+        with gzip.open(self._path(url, ".txt.gz"), "wt", encoding="utf-8") as f:
+            f.write(text)
+
+    def load_text(self, url: str) -> Optional[str]:
+        path = self._path(url, ".txt.gz")
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    # บรรทัด boilerplate ของรอบ crawl ล่าสุด: ใช้ตัดหน้าที่เขียนลง store ระหว่าง crawl รอบถัดไป
+    def load_boilerplate(self) -> Set[str]:
+        try:
+            with open(os.path.join(self.root, "boilerplate.json"), encoding="utf-8") as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            return set()
+
+    def save_boilerplate(self, chrome: Set[str]) -> None:
+        path = os.path.join(self.root, "boilerplate.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sorted(chrome), f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+def extract_raw(job: Tuple[str, str]) -> str:
+    """แปลง HTML ดิบที่เก็บไว้แล้ว (root, url) -> ข้อความ; ส่งเข้า process pool ได้โดยไม่ต้องส่ง body"""
+    root, url = job
+    return html_to_text(*RawHtmlStore(root).load_raw(url))
+
+
+class ExtractPool:
+    """แปลงหน้าที่เก็บ HTML ดิบไว้แล้วทีละหน้า: submit(url, done) เรียก done(ข้อความ) เมื่อหน้านั้นเสร็จ
+    (ถ้าหน้ามากพอจะแปลงใน process pool และเรียก done จาก thread ของ pool; แปลงไม่สำเร็จได้ None)
+    ใช้ with ... เพื่อรอทุกหน้าเสร็จ"""
+
+    def __init__(self, raw_store: RawHtmlStore, n_pages: int, workers: Optional[int] = None):
+        self.raw_store = raw_store
+        self.count = 0
+        self._error: Optional[BaseException] = None
+        use_pool = n_pages >= MIN_PAGES_FOR_POOL and workers != 1
+        self._executor = ProcessPoolExecutor(max_workers=workers) if use_pool else None
+
+    def submit(self, url: str, done: Callable[[Optional[str]], None]) -> None:
+        self.count += 1
+        job = (self.raw_store.root, url)
+        if self._executor is None:
+            done(self._text(url, lambda: extract_raw(job)))
+            return
+        future = self._executor.submit(extract_raw, job)
+        future.add_done_callback(lambda f: self._done_in_pool(url, f, done))
+
+    def _text(self, url: str, result: Callable[[], str]) -> Optional[str]:
+        try:
+            text = result()
+        except Exception as e:
+            print(f"❌ Error extracting {url}: {type(e).__name__}: {e}")
+            return None
+        self.raw_store.save_text(url, text)
+        return text
+
+    def _done_in_pool(self, url, future, done) -> None:
+        try:
+            done(self._text(url, future.result))
+        except BaseException as e:  # ข้อผิดพลาดใน thread ของ pool ส่งต่อให้ close()
+            self._error = self._error or e
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
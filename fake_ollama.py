@@ -0,0 +1,72 @@
+# fake_ollama.py
+# ตัวแทน ollama แบบออฟไลน์: มีฟังก์ชัน chat(...) / embed(...) หน้าตาเดียวกับ ollama.chat / ollama.embed
+# ใช้ทดสอบเส้นทาง streaming / batch โดยไม่ต้องมีเซิร์ฟเวอร์ Ollama
+#   OLLAMA_FAKE=1 streamlit run app.py
+#   หรือ ollama_utils.set_client(fake_ollama)
+import os
+import time
+import zlib
+from typing import Iterator, List, Sequence, Union
+
+# หน่วงเวลาต่อ token (วินาที) เพื่อจำลองความเร็วการ generate
+TOKEN_DELAY = float(os.environ.get("FAKE_OLLAMA_TOKEN_DELAY", "0.02"))
+EMBED_DIM = 256
+
+
+def _question_from(messages: list) -> str:
+    prompt = messages[-1]["content"] if messages else ""
+    # build_prompt วางคำถามไว้บรรทัดถัดจาก "คำถาม:"
+    lines = prompt.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip() == "คำถาม:" and i + 1 < len(lines):
+            return lines[i + 1].strip()
+    return prompt.strip()[:200]
+
+
+def _reply_tokens(messages: list) -> list:
+    reply = f"นี่คือคำตอบจำลองจาก fake_ollama สำหรับคำถาม: {_question_from(messages)}"
+    return [w + " " for w in reply.split(" ")]
+
+
+def _response(model: str, content: str, done: bool, **extra) -> dict:
+    return {"model": model, "message": {"role": "assistant", "content": content}, "done": done, **extra}
+
+
+def _stats(messages: list, tokens: list) -> dict:
+    # metadata แบบเดียวกับ Ollama (เวลาเป็นนาโนวินาที) นับ token ของ prompt คร่าวๆ เป็นจำนวนตัวอักษร / 4
+    prompt_chars = sum(len(m.get("content", "")) for m in messages)
+    return {"prompt_eval_count": max(1, prompt_chars // 4), "prompt_eval_duration": 0,
+            "eval_count": len(tokens), "eval_duration": int(TOKEN_DELAY * len(tokens) * 1e9)}
+
+
+def chat(model: str = "", messages: list = None, stream: bool = False, **kwargs) -> Union[dict, Iterator[dict]]:
+    messages = messages or []
+    if not messages:  # เหมือน Ollama: ไม่มีข้อความ = โหลดโมเดลอย่างเดียว
+        return _response(model, "", True)
+    tokens = _reply_tokens(messages)
+    if not stream:
+        time.sleep(TOKEN_DELAY * len(tokens))
+        return _response(model, "".join(tokens), True, **_stats(messages, tokens))
+    return _stream(model, tokens, _stats(messages, tokens))
+
+
+def _stream(model: str, tokens: list, stats: dict) -> Iterator[dict]:
+    for tok in tokens:
+        time.sleep(TOKEN_DELAY)
+        yield _response(model, tok, False)
+    yield _response(model, "", True, **stats)
+
+
+def _fake_embedding(text: str) -> List[float]:
+    # นับ character trigram ลงช่องตาม crc32 (ผลคงที่ข้ามโปรเซส) ข้อความที่มีตัวอักษรคล้ายกันจึงได้เวกเตอร์ใกล้กัน
+    vec = [0.0] * EMBED_DIM
+    text = " ".join(text.lower().split())
+    for i in range(max(len(text) - 2, 1)):
+        vec[zlib.crc32(text[i:i + 3].encode("utf-8")) % EMBED_DIM] += 1.0
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def embed(model: str = "", input: Union[str, Sequence[str]] = "", **kwargs) -> dict:
+    texts = [input] if isinstance(input, str) else list(input)
+    return {"model": model, "embeddings": [_fake_embedding(t) for t in texts]}
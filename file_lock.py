@@ -0,0 +1,41 @@
+# file_lock.py
+# ล็อกไฟล์ข้ามโปรเซส (exclusive) สำหรับผู้เขียนข้อมูลบนดิสก์ที่อาจทำงานพร้อมกัน เช่น Req.py กับแอป
+# ใช้ flock บน POSIX และ msvcrt.locking บน Windows; ล็อกหลุดเองเมื่อโปรเซสตาย
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+
+    def _lock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(f) -> None:
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK รอเองแค่ ~10 วินาที
+                time.sleep(0.5)
+
+    def _unlock(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """ถือล็อกของไฟล์ path (สร้างถ้ายังไม่มี) ตลอดบล็อก รอถ้าโปรเซส/thread อื่นถืออยู่"""
+    with open(path, "a+b") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
@@ -1,12 +1,88 @@
 # ollama_utils.py
-import ollama
-
-def ask_llama(prompt: str, model: str = "gemma2") -> str:
-    response = ollama.chat(
-        model=model,
-        messages=[
-            {"role": "system", "content": "คุณคือผู้ช่วยภาษาไทยสำหรับตอบคำถามจากเนื้อหาเว็บไซต์"},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response['message']['content'].strip()
\ No newline at end of file
+import os
+import time
+from typing import Iterator
+
+from startup import lazy
+from tracing import count_tokens, llm_stats, span
+
+SYSTEM_PROMPT = "คุณคือผู้ช่วยภาษาไทยสำหรับตอบคำถามจากเนื้อหาเว็บไซต์"
+# ขนาด context window ของโมเดล (token) ต้องเท่ากันทุกคำขอ ไม่งั้น Ollama จะโหลดโมเดลใหม่
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+# ระยะเวลาที่ Ollama เก็บโมเดล (และ KV cache ของ system prompt) ไว้ในหน่วยความจำหลังคำขอล่าสุด
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+_client = None  # backend ที่เลือกผ่าน set_client (None = เลือกตอนเรียกครั้งแรก)
+
+
+@lazy("import ollama")
+def _default_client():
+    # ตั้ง OLLAMA_FAKE=1 เพื่อใช้ fake_ollama แทนเซิร์ฟเวอร์จริง (ทดสอบแบบออฟไลน์)
+    if os.environ.get("OLLAMA_FAKE") == "1":
+        import fake_ollama
+        return fake_ollama
+    import ollama
+    return ollama
+
+
+def get_client():
+    return _client if _client is not None else _default_client()
+
+
+def set_client(client) -> None:
+    """เปลี่ยน backend ที่ใช้เรียก chat (ต้องมีเมธอด chat แบบเดียวกับ ollama)"""
+    global _client
+    _client = client
+
+
+def _messages(prompt: str, system: str) -> list:
+    # system message มาก่อนและเหมือนกันทุกคำขอ: Ollama ใช้ KV cache ของส่วนหน้านี้ซ้ำได้
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _chat(model: str, prompt: str, system: str, **kwargs):
+    return get_client().chat(model=model, messages=_messages(prompt, system),
+                             options={"num_ctx": OLLAMA_NUM_CTX}, keep_alive=OLLAMA_KEEP_ALIVE, **kwargs)
+
+
+def preload_model(model: str = "gemma2") -> None:
+    """ให้ Ollama โหลดโมเดลไว้ก่อนคำถามแรก (ข้อความว่าง = โหลดอย่างเดียว ไม่ generate)"""
+    try:
+        get_client().chat(model=model, messages=[], options={"num_ctx": OLLAMA_NUM_CTX},
+                          keep_alive=OLLAMA_KEEP_ALIVE)
+    except Exception as e:  # เซิร์ฟเวอร์ยังไม่พร้อม: โหลดตอนคำถามแรกแทน
+        print(f"⚠️ Cannot preload model {model}: {e}")
+
+
+def ask_llama(prompt: str, model: str = "gemma2", system: str = SYSTEM_PROMPT) -> str:
+    with span("llm", model=model) as s:
+        response = _chat(model, prompt, system)
+        stats = llm_stats(response)  # จำนวน token / เวลา prefill และ generate จาก Ollama
+        s.set(**stats)
+        count_tokens(stats)
+    return response['message']['content'].strip()
+
+
+def ask_llama_stream(prompt: str, model: str = "gemma2", system: str = SYSTEM_PROMPT) -> Iterator[str]:
+    """เหมือน ask_llama แต่ yield ข้อความทีละส่วนตามที่โมเดลสร้าง"""
+    started = False
+    with span("llm", model=model, stream=True) as s:
+        t0 = time.perf_counter()
+        for part in _chat(model, prompt, system, stream=True):
+            if part.get('done'):
+                # ชิ้นสุดท้ายมีจำนวน token และเวลาของทั้งคำตอบ
+                stats = llm_stats(part)
+                s.set(**stats)
+                count_tokens(stats)
+            text = part['message']['content']
+            if not started:
+                # ตัดช่องว่างหน้าคำตอบเหมือน .strip() ของ ask_llama
+                text = text.lstrip()
+                if not text:
+                    continue
+                started = True
+                s.set(first_token_s=round(time.perf_counter() - t0, 4))
+            yield text
@@ -0,0 +1,160 @@
+# product_catalog.py
+# ตัวกรองรายการสินค้าสำหรับหน้า "รายชื่อสินค้า/บริการ" ใน app.py
+# เตรียมทุกอย่างครั้งเดียวต่อไฟล์ CSV แทนการสแกน DataFrame ทุกครั้งที่พิมพ์:
+# - search key ต่อแถว: ID / ชื่อสินค้า / ศูนย์ / link ตัวพิมพ์เล็ก ช่องว่างยุบเหลือหนึ่งตัว คั่นฟิลด์ด้วย \0\0
+# - ดัชนี trigram (inverted index): trigram -> แถวที่มี trigram นั้น เก็บแบบ CSR (rows เรียงตาม gram, ช่วงตาม offsets)
+#   คำค้นยาว >= 3 ตัว: intersect แถวของทุก trigram แล้วยืนยันด้วย substring จริง
+#   คำค้น 1-2 ตัว: รวมแถวของ trigram ที่ขึ้นต้นด้วยคำค้น (ท้ายฟิลด์มี \0\0 ทุกตำแหน่งจึงเป็นต้น trigram ได้)
+# - ศูนย์เป็นรหัส categorical: กรองศูนย์ = เทียบรหัส (int) แทนการเทียบข้อความทุกแถว
+# - คอลัมน์ link สำหรับแสดงผล (URL ที่ไม่ถูกต้อง = "") คำนวณครั้งเดียว
+# ผลการค้นเหมือน _filter_products เดิม ยกเว้นคำค้นถูกตีความเป็นข้อความตรงๆ (เดิมเป็น regex โดยไม่ตั้งใจ)
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+from products import PRODUCT_COLUMNS, PRODUCT_CSV_PATH, load_products
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ALL_CENTERS = "ทั้งหมด"
+_SEP = "\0\0"  # คั่นฟิลด์: คำค้นไม่มี \0 จึงไม่แมตช์ข้ามฟิลด์
+
+
+def search_key(text: str) -> str:
+    """รูปแบบที่ใช้เทียบคำค้น: ตัวพิมพ์เล็ก ช่องว่างยุบเหลือหนึ่งตัว"""
+    return " ".join(str(text).lower().split())
+
+
+def _is_valid_url(u: str) -> bool:
+    u = str(u or "").strip().lower()
+    return u.startswith("http://") or u.startswith("https://")
+
+
+class TrigramIndex:
+    """inverted index ของ trigram บนข้อความหลายแถว (หา substring โดยไม่สแกนทุกแถว)"""
+
+    def __init__(self, keys: List[str]):
+        self.keys = keys
+        blob = "".join(keys)
+        codes = np.frombuffer(blob.encode("utf-32-le"), dtype=np.uint32)
+        # ตัวอักษรที่มีในข้อมูล -> รหัส 0..V-1 (trigram = เลขฐาน V สามหลัก)
+        present = np.bincount(codes) > 0 if len(codes) else np.zeros(1, dtype=bool)
+        self.alphabet = np.flatnonzero(present).astype(np.uint32)
+        self.base = max(len(self.alphabet), 1)
+        chars = (np.cumsum(present) - 1)[codes].astype(np.int64)
+        row_of = np.repeat(np.arange(len(keys), dtype=np.int64), [len(k) for k in keys])
+        start = codes[:-2] != 0  # trigram ที่ขึ้นต้นด้วยตัวคั่นไม่มีวันตรงกับคำค้น
+        grams = (chars[:-2] * self.base + chars[1:-1]) * self.base + chars[2:]
+        # คู่ (gram, แถว) ไม่ซ้ำ เรียงตาม gram (sort + ตัดตัวซ้ำ เร็วกว่า np.unique แบบ hash มาก)
+        n = max(len(keys), 1)
+        pairs = np.sort(grams[start] * n + row_of[:-2][start])
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])] if len(pairs) else pairs
+        gram_of = pairs // n
+        first = np.flatnonzero(np.append(True, gram_of[1:] != gram_of[:-1])) if len(pairs) else pairs
+        self.grams = gram_of[first]
+        self.rows = (pairs % n).astype(np.int32)
+        self.offsets = np.append(first, len(pairs)).astype(np.int64)
+
+    def _char_ids(self, text: str) -> Optional[np.ndarray]:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        ids = np.searchsorted(self.alphabet, codes)
+        if (ids >= len(self.alphabet)).any() or (self.alphabet[ids] != codes).any():
+            return None  # มีตัวอักษรที่ไม่มีในข้อมูลเลย
+        return ids.astype(np.int64)
+
+    def _postings(self, lo_gram: int, hi_gram: int) -> np.ndarray:
+        """แถวของ trigram ที่มีค่าในช่วง [lo_gram, hi_gram)"""
+        lo, hi = np.searchsorted(self.grams, [lo_gram, hi_gram])
+        return self.rows[self.offsets[lo]:self.offsets[hi]]
+
+    def search(self, query: str) -> np.ndarray:
+        """แถว (เรียงจากน้อยไปมาก) ที่มี query เป็น substring"""
+        ids = self._char_ids(query)
+        if ids is None:
+            return np.zeros(0, dtype=np.int64)
+        b = self.base
+        if len(ids) < 3:
+            # trigram ที่ขึ้นต้นด้วยคำค้นเป็นช่วงต่อเนื่องของเลข gram
+            width = b ** (3 - len(ids))
+            lo = int(ids[0] * b + ids[1]) * b if len(ids) == 2 else int(ids[0]) * b * b
+            return np.unique(self._postings(lo, lo + width)).astype(np.int64)
+        grams = np.unique((ids[:-2] * b + ids[1:-1]) * b + ids[2:])
+        postings = sorted((self._postings(g, g + 1) for g in grams), key=len)  # เริ่มจากรายการสั้นสุด
+        rows = postings[0]
+        for p in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, p, assume_unique=True)
+        if len(ids) > 3:  # trigram ครบแต่อาจอยู่คนละตำแหน่ง
+            rows = np.array([r for r in rows if query in self.keys[r]], dtype=np.int64)
+        return rows.astype(np.int64)
+
+
+class ProductCatalog:
+    """รายการสินค้าพร้อมดัชนีค้นหา: filter() คืนเลขแถว, frame() / to_csv() สร้างผลเฉพาะเมื่อเรียก"""
+
+    def __init__(self, df: "pd.DataFrame"):
+        import pandas as pd
+        self.df = df
+        self.index = TrigramIndex([_SEP.join(search_key(v) for v in row) + _SEP
+                                   for row in df[["ID", "ชื่อสินค้า", "ศูนย์", "link"]].itertuples(index=False)])
+        center = pd.Categorical(df["ศูนย์"])
+        self.center_codes = center.codes
+        self._center_names = [search_key(c) for c in center.categories]
+        self.centers = sorted(c for c in center.categories if c.strip())
+        show = df[PRODUCT_COLUMNS].copy()
+        show["link"] = [u if _is_valid_url(u) else "" for u in show["link"]]
+        self.display = show
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def filter(self, keyword: str = "", center: str = ALL_CENTERS) -> np.ndarray:
+        """เลขแถวที่ตรงกับคำค้น (ใน ID / ชื่อ / ศูนย์ / link) และศูนย์ (ชื่อศูนย์ที่มีคำที่เลือกอยู่)"""
+        rows = None
+        if center and center != ALL_CENTERS:
+            wanted = search_key(center)
+            codes = [i for i, name in enumerate(self._center_names) if wanted in name]
+            rows = np.flatnonzero(np.isin(self.center_codes, codes))
+        kw = search_key(keyword)
+        if kw:
+            hits = self.index.search(kw)
+            rows = hits if rows is None else np.intersect1d(rows, hits, assume_unique=True)
+        return np.arange(len(self.df)) if rows is None else rows
+
+    def frame(self, rows: np.ndarray, limit: Optional[int] = None) -> "pd.DataFrame":
+        """ตารางสำหรับแสดงผล (link ไม่ถูกต้อง = "") ของแถวที่เลือก สูงสุด limit แถว"""
+        if limit is not None:
+            rows = rows[:limit]
+        return self.display.iloc[rows].reset_index(drop=True)
+
+    def to_csv(self, rows: np.ndarray) -> bytes:
+        return self.frame(rows).to_csv(index=False).encode("utf-8-sig")
+
+
+_lock = threading.Lock()
+_cache: Tuple[Optional[str], Optional["pd.DataFrame"], Optional[ProductCatalog]] = (None, None, None)
+
+
+def load_catalog(csv_path: str = PRODUCT_CSV_PATH) -> ProductCatalog:
+    """ProductCatalog ปัจจุบัน (ไม่ตรวจไฟล์บนเส้นทางของผู้ใช้) ถ้ายังไม่มีจะสร้างแบบรอจนเสร็จ
+    ไฟล์เปลี่ยน = refresh_catalog() จาก thread ที่เฝ้าไฟล์สร้างรุ่นใหม่ ระหว่างนั้นคืนแคตตาล็อกเดิม"""
+    path, _, catalog = _cache
+    if path == csv_path:
+        return catalog
+    refresh_catalog(csv_path)
+    return _cache[2]
+
+
+def refresh_catalog(csv_path: str = PRODUCT_CSV_PATH) -> bool:
+    """สร้างแคตตาล็อกใหม่ถ้า load_products ได้ DataFrame ใหม่ (ไฟล์เปลี่ยน) คืน True ถ้าสลับแคตตาล็อก"""
+    global _cache
+    with _lock:
+        df = load_products(csv_path)
+        path, frame, _ = _cache
+        if path == csv_path and frame is df:
+            return False
+        _cache = (csv_path, df, ProductCatalog(df))
+        return True
@@ -0,0 +1,162 @@
+# product_index.py
+# ดัชนีค้นหาสินค้า: ตัดคำชื่อสินค้าด้วย thai_analyzer (ตัวเดียวกับดัชนีเอกสารและคำถาม) และสร้างเมทริกซ์ TF-IDF ไว้ครั้งเดียว
+# สร้างใหม่เฉพาะเมื่อไฟล์ CSV เปลี่ยน (ดู mtime ก่อน แล้วค่อยยืนยันด้วย hash) หรือเมื่อมีเวกเตอร์สินค้ารุ่นใหม่
+# ถ้ามีเวกเตอร์ embedding ของสินค้า (vector_index.py, โหมด dense/hybrid) จะรวมคะแนนแบบเดียวกับ retriever.py
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from doc_index import file_hash
+from retriever import HYBRID_ALPHA, fuse_scores
+from tfidf import TfidfModel, fit_tfidf
+from thai_analyzer import analyze, analyze_many
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def product_texts(df: "pd.DataFrame") -> List[str]:
+    """ข้อความของสินค้าแต่ละแถวที่ใช้ทำดัชนี (TF-IDF และ embedding)"""
+    return (df["ID"].fillna("") + " " +
+            df["ชื่อสินค้า"].fillna("") + " " +
+            df["ศูนย์"].fillna("") + " " +
+            df["link"].fillna("")).tolist()
+
+
+def top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """คืน (index, score) k อันดับแรกที่คะแนน > 0 โดยใช้ argpartition แทนการ sort ทั้งหมด"""
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+    if k < n:
+        # คะแนนที่ตำแหน่ง k แล้วเก็บทุกแถวที่ได้ >= ค่านี้ เพื่อให้แถวที่คะแนนเท่ากันถูกเลือกตามลำดับแถวเสมอ
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        idxs = np.flatnonzero(scores >= kth) if kth > 0 else np.flatnonzero(scores > 0)
+    else:
+        idxs = np.arange(n)
+    idxs = idxs[np.lexsort((idxs, -scores[idxs]))][:k]  # คะแนนเท่ากันเรียงตามแถว (ผลคงที่)
+    return [(int(i), float(scores[i])) for i in idxs if scores[i] > 0]
+
+
+class ProductIndex:
+    """เมทริกซ์ TF-IDF ของสินค้าที่ตัดคำไว้ล่วงหน้า (+ เวกเตอร์ embedding ของแต่ละแถว ถ้ามี)
+    alpha = น้ำหนักของ TF-IDF เมื่อมีเวกเตอร์ (0 = dense อย่างเดียว)"""
+
+    def __init__(self, df: "pd.DataFrame", vectors=None, embedder=None, alpha: float = HYBRID_ALPHA):
+        self.df = df
+        self.vectorizer: Optional[TfidfModel] = None
+        self.matrix = None
+        self.dense: Optional[np.ndarray] = None
+        self.embedder = embedder
+        self.alpha = alpha
+        if df.empty:
+            return
+        corpus = product_texts(df)
+        if vectors is not None and embedder is not None:
+            self.dense = _dense_rows(corpus, vectors, embedder.model)
+        vocab, idf, self.matrix = fit_tfidf(analyze_many(corpus))
+        if not vocab:  # ไม่มีคำใดเลย
+            return
+        self.vectorizer = TfidfModel(vocab, idf)
+
+    def rank(self, query: str, topk: int = 10) -> List[Tuple[int, float]]:
+        """จัดอันดับสินค้า (ตำแหน่งแถวใน df, คะแนน) จากความคล้ายกับคำถาม"""
+        if self.vectorizer is None:
+            return []
+        if self.dense is not None:
+            return self.rank_many([query], topk)[0]
+        qv = self.vectorizer.transform([analyze(query)])
+        scores = (self.matrix @ qv.T).toarray().ravel()
+        return top_k(scores, topk)
+
+    def rank_many(self, queries: List[str], topk: int = 10) -> List[List[Tuple[int, float]]]:
+        """rank หลายคำถามพร้อมกันด้วยการคูณ sparse matrix ครั้งเดียว"""
+        if self.vectorizer is None:
+            return [[] for _ in queries]
+        qm = self.vectorizer.transform([analyze(q) for q in queries])
+        if self.dense is not None:
+            # สินค้ามีไม่มาก คำนวณคะแนนเต็มของทุกแถวได้เลย
+            lexical = (self.matrix @ qm.T).toarray()
+            dense = self.dense @ self.embedder.embed_queries(queries).T
+            fused = fuse_scores(lexical, dense.astype(np.float64), self.alpha)
+            return [top_k(fused[:, j], topk) for j in range(len(queries))]
+        scores = (self.matrix @ qm.T).tocsc()  # สินค้า x คำถาม
+        results = []
+        for j in range(len(queries)):
+            lo, hi = scores.indptr[j], scores.indptr[j + 1]
+            idxs, vals = scores.indices[lo:hi], scores.data[lo:hi]
+            order = np.lexsort((idxs, -vals))[:topk]
+            results.append([(int(idxs[i]), float(vals[i])) for i in order if vals[i] > 0])
+        return results
+
+
+def _dense_rows(texts: List[str], vectors, model: str) -> np.ndarray:
+    # แถวที่ยังไม่มีเวกเตอร์ (สินค้าใหม่ที่ยังไม่ได้ ingest) ได้เวกเตอร์ศูนย์ = ค้นด้วย TF-IDF อย่างเดียว
+    from vector_index import text_key
+    key_rows = vectors.key_rows()
+    rows = np.array([key_rows.get(text_key(model, t), -1) for t in texts], dtype=np.int64)
+    dense = np.zeros((len(texts), vectors.dim), dtype=np.float32)
+    found = rows >= 0
+    dense[found] = vectors.rows(rows[found])
+    return dense
+
+
+class ProductIndexCache:
+    """ถือ ProductIndex ปัจจุบันไว้ refresh() สร้างใหม่เมื่อ mtime/hash ของ CSV เปลี่ยน
+    ระหว่างสร้างใหม่ ผู้เรียก get() ได้ดัชนีเดิม (ไม่ต้องรอ)
+    vectors_dir: โฟลเดอร์เวกเตอร์สินค้า (โหมด dense/hybrid) สร้างใหม่เมื่อมีเวกเตอร์รุ่นใหม่ด้วย"""
+
+    def __init__(self, csv_path: str, loader: Callable[[], "pd.DataFrame"],
+                 vectors_dir: Optional[str] = None, alpha: float = HYBRID_ALPHA):
+        self.csv_path = csv_path
+        self.loader = loader
+        self.vectors_dir = vectors_dir
+        self.alpha = alpha
+        self._index: Optional[ProductIndex] = None
+        self._mtime: Optional[tuple] = None
+        self._hash: Optional[str] = None
+        self._vectors_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _stat_mtime(self) -> Optional[tuple]:
+        stamps = []
+        for path in (self.csv_path, self.vectors_dir and os.path.join(self.vectors_dir, "current.json")):
+            try:
+                stamps.append(os.stat(path).st_mtime if path else None)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _vectors(self):
+        if self.vectors_dir is None:
+            return None, None
+        from vector_index import VectorFile, get_embedder
+        vectors = VectorFile.open(self.vectors_dir)
+        return (vectors, get_embedder(vectors.meta["model"])) if vectors is not None else (None, None)
+
+    def get(self) -> ProductIndex:
+        """ดัชนีที่มีอยู่ (ไม่ตรวจไฟล์ ไม่สร้างใหม่บนเส้นทางของคำถาม) ถ้ายังไม่มีจะสร้างแบบรอจนเสร็จ"""
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def refresh(self) -> bool:
+        """สร้างดัชนีใหม่ถ้า CSV/เวกเตอร์เปลี่ยน (เรียกจาก thread ที่เฝ้าไฟล์) คืน True ถ้าสลับดัชนี
+        ระหว่างสร้าง get() ยังคืนดัชนีเดิม"""
+        with self._lock:
+            mtime = self._stat_mtime()
+            if self._index is not None and mtime == self._mtime:
+                return False
+            digest = file_hash(self.csv_path) if mtime[0] is not None else None
+            vectors, embedder = self._vectors()
+            version = vectors.meta["version"] if vectors is not None else None
+            self._mtime = mtime
+            if self._index is not None and digest == self._hash and version == self._vectors_version:
+                return False
+            self._index = ProductIndex(self.loader(), vectors, embedder, self.alpha)
+            self._hash = digest
+            self._vectors_version = version
+            return True
@@ -0,0 +1,103 @@
+# products.py
+# ตัวโหลดรายการสินค้า (Product List.csv) ที่ใช้ร่วมกันระหว่าง qa_engine และ app.py
+# - เดา encoding จากไบต์ของไฟล์ครั้งเดียว (แทนการลอง read_csv ซ้ำทีละ encoding) และแคชไว้ตาม mtime/size
+# - ผลการโหลดแคชไว้ตาม mtime/size เช่นกัน: ไฟล์เดิมถูก parse ครั้งเดียวต่อ process
+# - import pandas เมื่อโหลดครั้งแรกเท่านั้น
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PRODUCT_CSV_PATH = "Product List.csv"
+PRODUCT_COLUMNS = ["ID", "ชื่อสินค้า", "ศูนย์", "link"]
+
+# ลำดับเดียวกับที่เคยลองใน read_csv: utf-8 (มี/ไม่มี BOM) -> cp874 (ไทยของ Excel) -> latin-1
+_FALLBACK_ENCODINGS = ["utf-8", "cp874"]
+
+_lock = threading.Lock()
+_encodings: Dict[Tuple[str, float, int], str] = {}
+_frames: Dict[str, Tuple[Tuple[float, int], "pd.DataFrame"]] = {}
+
+
+def _signature(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def detect_encoding(path: str) -> str:
+    """encoding ของไฟล์ CSV (แคชตาม path + mtime + size)"""
+    sig = _signature(path)
+    key = (path, *sig) if sig else None
+    if key in _encodings:
+        return _encodings[key]
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(b"\xef\xbb\xbf"):
+        enc = "utf-8-sig"
+    else:
+        enc = "latin-1"  # ถอดรหัสได้ทุกไบต์
+        for candidate in _FALLBACK_ENCODINGS:
+            try:
+                raw.decode(candidate)
+                enc = candidate
+                break
+            except UnicodeDecodeError:
+                pass
+    if key:
+        _encodings[key] = enc
+    return enc
+
+
+def normalize_product_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """ทำชื่อคอลัมน์ให้เป็นมาตรฐาน: ID / ชื่อสินค้า / ศูนย์ / link และตัดช่องว่างหัว-ท้าย"""
+    rename_map = {}
+    lower_map = {c.lower().strip(): c for c in df.columns}
+
+    if "id" in lower_map: rename_map[lower_map["id"]] = "ID"
+    for key in ["name", "product", "product name", "ชื่อสินค้า", "รายชื่อสินค้า", "รายการสินค้า"]:
+        if key in lower_map: rename_map[lower_map[key]] = "ชื่อสินค้า"; break
+    for key in ["center", "ศูนย์", "ศูนย์งาน", "หน่วยงาน"]:
+        if key in lower_map: rename_map[lower_map[key]] = "ศูนย์"; break
+    # รองรับทั้ง "ลิงก์" และ "ลิ้งค์" + url
+    for key in ["link", "url", "ลิงก์", "ลิ้งค์"]:
+        if key in lower_map: rename_map[lower_map[key]] = "link"; break
+
+    df = df.rename(columns=rename_map)
+    for col in PRODUCT_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[PRODUCT_COLUMNS].copy()
+    # ทำคอลัมน์ข้อความเป็น str ป้องกัน NaN และกรองไม่ติดเพราะช่องว่าง
+    for col in PRODUCT_COLUMNS:
+        df[col] = df[col].fillna("").astype(str).str.strip()
+    return df
+
+
+def _empty() -> "pd.DataFrame":
+    import pandas as pd
+    return pd.DataFrame(columns=PRODUCT_COLUMNS)
+
+
+def load_products(csv_path: str = PRODUCT_CSV_PATH) -> "pd.DataFrame":
+    """DataFrame สินค้าที่ normalize แล้ว (ไฟล์ไม่มี/อ่านไม่ได้ = DataFrame ว่าง)
+    ผลลัพธ์ถูกแชร์ระหว่างผู้เรียก ห้ามแก้ไขในที่ (ใช้ .copy() ก่อน)"""
+    sig = _signature(csv_path)
+    if sig is None:
+        return _empty()
+    with _lock:
+        cached = _frames.get(csv_path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        import pandas as pd
+        try:
+            df = normalize_product_columns(pd.read_csv(csv_path, encoding=detect_encoding(csv_path)))
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read product list {csv_path}: {e}")
+            return _empty()
+        _frames[csv_path] = (sig, df)
+        return df
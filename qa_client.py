@@ -0,0 +1,46 @@
+# qa_client.py
+# ไคลเอนต์ของ qa_service สำหรับให้ app.py เป็นหน้าเว็บบางๆ ที่ส่งคำถามไปยังบริการกลาง
+# ตั้ง QA_SERVICE_URL=http://host:8080 เพื่อใช้บริการ (ไม่ตั้ง = ตอบในโปรเซสเดียวกับ Streamlit ตามเดิม)
+import os
+from typing import List, Optional, Tuple
+
+import requests
+
+QA_SERVICE_URL = os.environ.get("QA_SERVICE_URL") or None
+REQUEST_TIMEOUT = float(os.environ.get("QA_SERVICE_TIMEOUT", "180"))
+
+_session = requests.Session()  # keep-alive ระหว่างคำถาม
+
+
+class ServiceError(Exception):
+    pass
+
+
+def ask(question: str, base_url: Optional[str] = None, timeout: float = REQUEST_TIMEOUT) -> dict:
+    """ส่งคำถามไปที่ POST /answer คืน {"answer", "cached", "deduplicated", "latency_s", ...}"""
+    url = (base_url or QA_SERVICE_URL).rstrip("/") + "/answer"
+    try:
+        resp = _session.post(url, json={"question": question}, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise ServiceError(f"ติดต่อบริการถาม-ตอบไม่ได้: {e}") from e
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+    if resp.status_code == 503:
+        raise ServiceError("ระบบมีผู้ใช้งานจำนวนมาก กรุณาลองใหม่อีกครั้งในอีกสักครู่")
+    if resp.status_code == 504:
+        raise ServiceError("ระบบใช้เวลาตอบนานเกินกำหนด กรุณาลองใหม่อีกครั้ง")
+    if resp.status_code != 200:
+        raise ServiceError(data.get("error") or f"HTTP {resp.status_code}")
+    return data
+
+
+def popular(n: int = 5, base_url: Optional[str] = None) -> Tuple[List[Tuple[str, int]], dict]:
+    """(คำถามยอดนิยม, สถิติแคช) จากบริการ; ติดต่อไม่ได้ = ค่าว่าง"""
+    url = (base_url or QA_SERVICE_URL).rstrip("/") + "/popular"
+    try:
+        data = _session.get(url, params={"n": n}, timeout=5).json()
+    except (requests.exceptions.RequestException, ValueError):
+        return [], {}
+    return [tuple(q) for q in data.get("questions", [])], data.get("cache", {})
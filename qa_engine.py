@@ -1,140 +1,293 @@
-import json
-from ollama_utils import ask_llama
-from pythainlp.tokenize import word_tokenize
-from sklearn.feature_extraction.text import TfidfVectorizer
+from functools import lru_cache
+from ollama_utils import OLLAMA_NUM_CTX, SYSTEM_PROMPT, ask_llama, ask_llama_stream, preload_model
+from answer_cache import AnswerCache, make_key
+from doc_store import DOCS_STORE_PATH, DocStore, convert_json
+from products import PRODUCT_CSV_PATH, load_products
+from snapshot import Snapshot, SnapshotManager
+from startup import STARTUP, lazy
+from thai_analyzer import preload as _preload_thai, thai_normalize, word_tokenize
+from context_builder import assemble_context, token_counter
+from tracing import span, trace
 
 # ----------------------------- NEW: product search deps -----------------------------
+# pythainlp (thai_analyzer) / scipy (doc_index, product_index) / pandas ถูก import เมื่อใช้ครั้งแรก
+# เพื่อให้ import qa_engine (และหน้า Streamlit แรก) เร็ว; ดูเวลาแต่ละขั้นด้วย python startup.py
 import os
 import re
-import pandas as pd
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 
-PRODUCT_CSV_PATH = "Product List.csv"
+if TYPE_CHECKING:
+    import pandas as pd
+
+DOCS_JSON_PATH = "output_data.json"  # รูปแบบเดิม (แปลงเป็น DocStore อัตโนมัติถ้ายังไม่มี store หรือไฟล์ใหม่กว่า store)
+CRAWL_CHANGES_PATH = "crawl_changes.json"  # Req.py เขียนเมื่อ crawl + ดัชนีเสร็จ = มีข้อมูลใหม่
+DATA_RELOAD_INTERVAL = float(os.environ.get("DATA_RELOAD_INTERVAL", "10"))  # วินาทีระหว่างการตรวจไฟล์
 MAX_PRODUCTS_TO_SHOW = 5
+TOP_K_CHUNKS = 5             # จำนวน chunk สูงสุดที่ส่งให้ LLM
+# งบ token ของเนื้อหาเว็บใน prompt (นับด้วย tokenizer ของโมเดลถ้ามี ดู context_builder.py)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+ANSWER_TOKEN_RESERVE = 1024  # token ที่เว้นไว้ให้คำตอบใน context window (OLLAMA_NUM_CTX)
+LLM_MODEL = "gemma2"
+PROMPT_TEMPLATE_VERSION = 2  # เพิ่มเลขทุกครั้งที่แก้ build_prompt เพื่อไม่ให้ใช้คำตอบเก่าในแคช
+# ตั้ง ANSWER_CACHE_DB=answer_cache.sqlite เพื่อให้แคชคำตอบอยู่รอดหลังรีสตาร์ท
+ANSWER_CACHE_DB = os.environ.get("ANSWER_CACHE_DB") or None
 # ------------------------------------------------------------------------------------
 
-# Load data from JSON (เดิม)
-with open("output_data.json", encoding="utf-8") as f:
-    docs = json.load(f)
+# ข้อมูลเอกสารเป็น snapshot ที่มีรุ่น (snapshot.py): DocStore + ดัชนี + retriever ของรุ่นเดียวกัน
+# start_data_watcher() เฝ้า output_data.json / crawl_changes.json (เขียนตอนจบ crawl) / Product List.csv
+# แล้วสร้างรุ่นใหม่ใน background; คำถามที่กำลังตอบอยู่ใช้รุ่นเดิมจนจบ (pinned_snapshot)
+class DataSet:
+    """ข้อมูลเอกสารหนึ่งรุ่น (ไม่แก้ไขหลังสร้าง)"""
+
+    def __init__(self, store: DocStore, index=None, retriever=None):
+        self.store = store
+        self.index = index
+        self.retriever = retriever
+        # แคช record เต็มต่อรุ่น: เนื้อหาที่เปลี่ยนในรุ่นใหม่ไม่ถูกอ่านจากแคชเก่า
+        self.get_document = lru_cache(maxsize=256)(self._read)
+
+    def _read(self, doc_id: str) -> dict:
+        return self.store.get(doc_id) or {}
+
+
+def _file_sig(path: str):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+def _data_signature() -> tuple:
+    """(ลายเซ็นไฟล์เอกสาร, ลายเซ็นไฟล์สินค้า) ใช้ตัดสินว่าต้องโหลดส่วนไหนใหม่"""
+    docs = [DOCS_JSON_PATH, CRAWL_CHANGES_PATH]
+    products = [PRODUCT_CSV_PATH]
+    if os.environ.get("RETRIEVER", "tfidf") != "tfidf":
+        # เวกเตอร์รุ่นใหม่จาก python vector_index.py
+        from vector_index import DOC_VECTORS_DIR, PRODUCT_VECTORS_DIR
+        docs.append(os.path.join(DOC_VECTORS_DIR, "current.json"))
+        products.append(os.path.join(PRODUCT_VECTORS_DIR, "current.json"))
+    return tuple(_file_sig(p) for p in docs), tuple(_file_sig(p) for p in products)
+
+def _json_newer() -> bool:
+    """output_data.json ใหม่กว่า docs.jsonl (หรือยังไม่มี store) = ต้องแปลงก่อนใช้"""
+    if not os.path.exists(DOCS_JSON_PATH):
+        return False
+    return not os.path.exists(DOCS_STORE_PATH) or os.path.getmtime(DOCS_JSON_PATH) > os.path.getmtime(DOCS_STORE_PATH)
+
+def _load_docs(convert: bool) -> DataSet:
+    with STARTUP.phase("open doc store"):
+        if convert and os.path.exists(DOCS_JSON_PATH):
+            convert_json(DOCS_JSON_PATH, DOCS_STORE_PATH)  # เขียนเฉพาะหน้าที่เปลี่ยน (ถือล็อกเดียวกับ crawler)
+        store = DocStore(DOCS_STORE_PATH).open_reader()
+    if not len(store):
+        return DataSet(store)
+    # ดัชนี TF-IDF ที่ fit ไว้แล้วตอน crawl (โหลดจากดิสก์ ถ้าไม่มี/ไม่ตรงจะ fit ใหม่ โดยตัดคำเฉพาะหน้าที่เปลี่ยน)
+    with STARTUP.phase("load doc index"):
+        with STARTUP.phase("import doc_index (scipy)"):
+            from doc_index import load_or_build
+        index = load_or_build(store)
+    # RETRIEVER=tfidf (ค่า default) / dense / hybrid ดู retriever.py
+    with STARTUP.phase("load retriever"):
+        from retriever import make_retriever
+        retriever = make_retriever(index)
+    return DataSet(store, index, retriever)
+
+def _build_data(previous, signature: tuple) -> DataSet:
+    if previous is None:
+        return _load_docs(convert=_json_newer())
+    if previous.signature[0] == signature[0]:
+        data = previous.data  # เปลี่ยนแค่ไฟล์สินค้า
+    else:
+        # output_data.json ถูกแก้ = แปลงลง DocStore ก่อน; crawler เขียน DocStore เองแล้ว
+        data = _load_docs(convert=previous.signature[0][0] != signature[0][0] or _json_newer())
+    if previous.signature[1] != signature[1] and _product_index_cache.loaded():
+        _product_index_cache().refresh()  # สร้างดัชนีสินค้าใหม่ใน thread นี้ คำถามใช้ดัชนีเดิมระหว่างนั้น
+    return data
+
+@lazy("load data snapshot")
+def _snapshots() -> SnapshotManager:
+    return SnapshotManager(_build_data, _data_signature, interval=DATA_RELOAD_INTERVAL, name="documents")
+
+def current_snapshot() -> Snapshot:
+    """ข้อมูลรุ่นที่คำถามนี้ใช้ (รุ่นที่ pin ไว้ ถ้าไม่มีใช้รุ่นล่าสุด)"""
+    return _snapshots().current()
+
+def pinned_snapshot(snapshot: Snapshot = None):
+    """context manager: ใช้ข้อมูลรุ่นเดียวตลอดบล็อก แม้จะโหลดรุ่นใหม่ระหว่างนั้น"""
+    return _snapshots().pin(snapshot)
+
+def reload_data(force: bool = False) -> bool:
+    """โหลดข้อมูลใหม่ทันทีถ้าไฟล์เปลี่ยน (หรือ force) คืน True ถ้าสลับรุ่น"""
+    return _snapshots().reload(force)
+
+def start_data_watcher() -> None:
+    _snapshots().start()
+
+def stop_data_watcher() -> None:
+    if _snapshots.loaded():
+        _snapshots().stop()
+
+def on_reload(fn) -> None:
+    """เรียก fn(snapshot) หลังโหลดข้อมูลรุ่นใหม่ (เช่น ล้างแคชของ Streamlit)"""
+    _snapshots().on_swap(fn)
+
+def data_status() -> dict:
+    return _snapshots().status()
+
+def _doc_store() -> DocStore:
+    return current_snapshot().data.store
+
+def _doc_index():
+    return current_snapshot().data.index
+
+def _retriever():
+    return current_snapshot().data.retriever
+
+def __getattr__(name):
+    # qa_engine.docs = metadata ของทุกหน้า (ไม่มีฟิลด์ HTML) ของข้อมูลรุ่นปัจจุบัน
+    if name == "docs":
+        return _doc_store().metadata()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_document(doc_id: str) -> dict:
+    """record เต็มของหน้า (รวม HTML) อ่านจาก DocStore เมื่อต้องใช้"""
+    return current_snapshot().data.get_document(str(doc_id))
+
+# แคชคำตอบของ LLM สำหรับคำถามที่ถามซ้ำ
+answer_cache = AnswerCache(db_path=ANSWER_CACHE_DB)
+
+def warm_up() -> None:
+    """โหลดทุกส่วนที่ปกติโหลดตอนถามคำถามแรก (เรียกใน background หลังหน้าเว็บแสดงแล้ว)"""
+    _preload_thai()
+    _retriever()
+    _product_index_cache()
+    preload_model(LLM_MODEL)
 
 # Improved Token Matching
 def tokenize_and_clean(text: str):
-    return word_tokenize(text.lower(), engine='newmm')
+    return word_tokenize(text.lower())
 
-# Use TF-IDF for more context-aware document retrieval (เดิม)
+def normalize_question(question: str) -> List[str]:
+    """ตัดคำคำถามหลัง normalize ตัวอักษรไทย/ช่องว่าง (ใช้เป็นส่วนหนึ่งของคีย์แคช)"""
+    text = " ".join(thai_normalize(question).split())
+    return [t for t in tokenize_and_clean(text) if t.strip()]
+
+# Use TF-IDF for more context-aware document retrieval (ใช้ดัชนีที่ fit ไว้แล้ว)
+# ดัชนีตัดคำคำถามเองด้วย thai_analyzer ตัวเดียวกับตอนสร้างดัชนี จึงส่งคำถามดิบเข้าไป
 def find_best_context(question: str):
-    question_words = tokenize_and_clean(question)
-    corpus = [entry.get("HTML", "") + " " + entry.get("Header", "") + " " + entry.get("Tag", "") for entry in docs]
-    vectorizer = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = vectorizer.fit_transform(corpus)
-    question_vec = vectorizer.transform([" ".join(question_words)])
-    similarities = tfidf_matrix * question_vec.T
-    scores = similarities.toarray().flatten()
+    data = current_snapshot().data  # retriever กับ store ต้องเป็นรุ่นเดียวกัน (เลขแถว = ลำดับใน store)
+    if data.retriever is None:
+        return None
+    scores = data.retriever.scores(question)
     best_match_idx = scores.argmax()
     if scores[best_match_idx] == 0:
         return None
-    return docs[best_match_idx]
+    return data.get_document(str(data.store.metadata()[best_match_idx].get("ID")))
 
-# Combine metadata into the context to enhance response generation (เดิม)
-def build_prompt(question: str, context_html: str, metadata: dict):
-    base = """
-กรุณาตอบเป็นภาษาไทยเท่านั้น โดยอ้างอิงจากเนื้อหาของหน้าเว็บไซต์ด้านล่าง
+# ดึง chunk ที่เกี่ยวข้องที่สุดข้ามทุกหน้า (ภายในงบ token) แทนการใช้ทั้งหน้า
+def find_best_chunks(question: str, k: int = TOP_K_CHUNKS,
+                     token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[Tuple[dict, float]]:
+    retriever = _retriever()
+    if retriever is None:
+        return []
+    return retriever.search(question, k=k, token_budget=token_budget)
+
+def _chunk_text(chunk: dict) -> str:
+    from doc_index import chunk_text
+    return chunk_text(chunk, get_document(str(chunk.get("ID"))).get("HTML") or "")
+
+def _chunks_to_context(chunks: List[Tuple[dict, float]], budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """เนื้อหาของ chunk ตามลำดับคะแนน ตัดบรรทัดซ้ำ ไม่เกิน budget token"""
+    blocks = [(f"[{c.get('ID', '')}] {c.get('Header', '')}", _chunk_text(c)) for c, _ in chunks]
+    return assemble_context(blocks, budget)[0]
+
+def _chunk_urls(chunks: List[Tuple[dict, float]]) -> List[str]:
+    urls = []
+    for c, _ in chunks:
+        u = c.get("URL")
+        if u and u not in urls:
+            urls.append(u)
+    return urls
+
+# คำสั่งคงที่ทั้งหมดอยู่ใน system message (เหมือนกันทุกคำถาม Ollama จึงใช้ KV cache ของส่วนนี้ซ้ำได้)
+# ส่วนที่เปลี่ยนตามคำถามอยู่ใน user message เท่านั้น
+ANSWER_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+กรุณาตอบเป็นภาษาไทยเท่านั้น โดยอ้างอิงจากเนื้อหาของหน้าเว็บไซต์ที่ให้มาในข้อความของผู้ใช้
 นำข้อมูลทั้งหมดมาตอบเลยและสรุปให้กระชับและเข้าใจง่าย
 แต่ถ้ามีคำถามที่มีบริบทเกี่ยวกับ มี/อยู่ไหน สินค้า/บริการ ไหมให้ทำการตอบกลับด้วยลักษณะของการแนะนำสินค้า/บริการที่เกี่ยวข้องกับคำถามนั้นๆ
 คำตอบควรมีความละเอียดและชัดเจน ไม่ต้องให้ลิงก์ใดๆในการตอบ
 
 ข้อกำหนด:
-- ตอบเฉพาะจากข้อมูลที่มีในบริบทด้านล่างเท่านั้น
-- หากสรุป ให้ไม่สั้นจนเกินไปและชัดเจนรายละเอียดครบถ้วน
-"""
+- ตอบเฉพาะจากข้อมูลที่มีในบริบทที่ให้มาเท่านั้น
+- หากสรุป ให้ไม่สั้นจนเกินไปและชัดเจนรายละเอียดครบถ้วน"""
+
+# Combine metadata into the context to enhance response generation (user message)
+def build_prompt(question: str, context_html: str, metadata: dict):
     meta = f"""[ชื่อหน้าเว็บ]: {metadata.get("NamePage", "")}
 [หมวดหมู่/ศูนย์]: {metadata.get("Center", "")}
 [หัวข้อ]: {metadata.get("Header", "")}
 [แท็ก]: {metadata.get("Tag", "")}"""
 
-    return f"""{base}
-
-คำถาม:
-{question}
-
-ข้อมูลสรุปจากหน้าเว็บไซต์:
+    return f"""ข้อมูลสรุปจากหน้าเว็บไซต์:
 {meta}
 
-[HTML ของเว็บไซต์]:
+[เนื้อหาที่เกี่ยวข้องจากเว็บไซต์]:
 {context_html}
 
+คำถาม:
+{question}
+
 คำตอบ:
 """
 
+def context_budget(question: str, metadata: dict) -> int:
+    """งบ token ของเนื้อหาเว็บ: CONTEXT_TOKEN_BUDGET แต่ไม่เกินที่เหลือใน context window ของโมเดล"""
+    count = token_counter()
+    fixed = count(ANSWER_SYSTEM_PROMPT) + count(build_prompt(question, "", metadata))
+    return max(0, min(CONTEXT_TOKEN_BUDGET, OLLAMA_NUM_CTX - ANSWER_TOKEN_RESERVE - fixed))
+
 # ================================== NEW: PRODUCT SEARCH ==================================
 
-def _normalize_product_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """ทำชื่อคอลัมน์ให้เป็นมาตรฐาน: ID / ชื่อสินค้า / ศูนย์ / link"""
-    rename_map = {}
-    lower_map = {c.lower().strip(): c for c in df.columns}
-
-    if "id" in lower_map: rename_map[lower_map["id"]] = "ID"
-    for key in ["name", "product", "product name", "ชื่อสินค้า", "รายชื่อสินค้า", "รายการสินค้า"]:
-        if key in lower_map: rename_map[lower_map[key]] = "ชื่อสินค้า"; break
-    for key in ["center", "ศูนย์", "ศูนย์งาน", "หน่วยงาน"]:
-        if key in lower_map: rename_map[lower_map[key]] = "ศูนย์"; break
-    for key in ["link", "url", "ลิงก์", "ลิ้งค์"]:
-        if key in lower_map: rename_map[lower_map[key]] = "link"; break
-
-    df = df.rename(columns=rename_map)
-    for col in ["ID", "ชื่อสินค้า", "ศูนย์", "link"]:
-        if col not in df.columns:
-            df[col] = ""
-    return df[["ID", "ชื่อสินค้า", "ศูนย์", "link"]].copy()
-
-def _load_products() -> pd.DataFrame:
-    if not os.path.exists(PRODUCT_CSV_PATH):
-        return pd.DataFrame(columns=["ID", "ชื่อสินค้า", "ศูนย์", "link"])
-    # รองรับหลาย encoding
-    encodings = [None, "utf-8-sig", "cp874", "latin-1"]
-    last_err = None
-    df = None
-    for enc in encodings:
-        try:
-            df = pd.read_csv(PRODUCT_CSV_PATH, encoding=enc) if enc else pd.read_csv(PRODUCT_CSV_PATH)
-            break
-        except Exception as e:
-            last_err = e
-    if df is None:
-        return pd.DataFrame(columns=["ID", "ชื่อสินค้า", "ศูนย์", "link"])
-
-    df = _normalize_product_columns(df)
-    # ทำคอลัมน์ข้อความเป็น str ป้องกัน NaN
-    for c in ["ID", "ชื่อสินค้า", "ศูนย์", "link"]:
-        df[c] = df[c].astype(str).fillna("").str.strip()
-    return df
-
-_PRODUCTS_DF = _load_products()
+# ดัชนีสินค้าที่ตัดคำไว้แล้ว (สร้างเมื่อใช้ครั้งแรก และสร้างใหม่เมื่อ CSV เปลี่ยนใน thread ที่เฝ้าไฟล์เท่านั้น)
+# ใช้ตัวโหลดเดียวกับ app.py (products.load_products) ไฟล์จึงถูก parse ครั้งเดียว
+@lazy("build product index")
+def _product_index_cache():
+    with STARTUP.phase("import product_index"):
+        from product_index import ProductIndexCache
+        from retriever import HYBRID_ALPHA, RETRIEVER_MODE
+    vectors_dir = None
+    if RETRIEVER_MODE != "tfidf":
+        from vector_index import PRODUCT_VECTORS_DIR as vectors_dir
+    cache = ProductIndexCache(PRODUCT_CSV_PATH, lambda: load_products(PRODUCT_CSV_PATH), vectors_dir,
+                              alpha=0.0 if RETRIEVER_MODE == "dense" else HYBRID_ALPHA)
+    cache.get()
+    return cache
+
+def _product_index():
+    return _product_index_cache().get()
+
+def current_products() -> "pd.DataFrame":
+    """DataFrame สินค้าปัจจุบัน (ตามดัชนีล่าสุด ถ้า CSV ถูกแก้ ตัวเฝ้าไฟล์จะสร้างดัชนีรุ่นใหม่)"""
+    return _product_index().df
 
 def _extract_possible_ids(text: str) -> List[str]:
     """ดึงรูปแบบที่ดูเหมือนรหัสสินค้า (อักษร/ตัวเลข/ขีดล่าง/ขีดกลาง) ยาว >= 3"""
     tokens = re.findall(r"[A-Za-z0-9_-]{3,}", text)
     return [t for t in tokens if not re.search(r"[ก-๙]", t)]
 
-def _tfidf_rank_products(query: str, df: pd.DataFrame, topk: int = 10) -> List[Tuple[int, float]]:
-    """จัดอันดับสินค้าด้วย TF-IDF จากคอลัมน์ ID/ชื่อ/ศูนย์/ลิงก์"""
-    if df.empty:
-        return []
-    corpus = (df["ID"].fillna("") + " " +
-              df["ชื่อสินค้า"].fillna("") + " " +
-              df["ศูนย์"].fillna("") + " " +
-              df["link"].fillna("")).tolist()
-    vec = TfidfVectorizer()
-    X = vec.fit_transform(corpus)
-    qv = vec.transform([" ".join(tokenize_and_clean(query))])
-    scores = (X * qv.T).toarray().ravel()
-    idxs = scores.argsort()[::-1]  # desc
-    ranked = [(int(i), float(scores[i])) for i in idxs[:topk] if scores[i] > 0]
-    return ranked
-
-def find_related_products(question: str, max_rows: int = MAX_PRODUCTS_TO_SHOW) -> pd.DataFrame:
-    """คืน DataFrame สินค้าที่เกี่ยวข้องกับคำถาม (อาจว่างได้)"""
-    df = _PRODUCTS_DF
+def _tfidf_rank_products(query: str, topk: int = 10) -> List[Tuple[int, float]]:
+    """จัดอันดับสินค้าด้วย TF-IDF จากคอลัมน์ ID/ชื่อ/ศูนย์/ลิงก์ (ใช้ดัชนีที่สร้างไว้แล้ว)"""
+    return _product_index().rank(query, topk=topk)
+
+def find_related_products(question: str, max_rows: int = MAX_PRODUCTS_TO_SHOW,
+                          ranked: List[Tuple[int, float]] = None, index=None) -> "pd.DataFrame":
+    """คืน DataFrame สินค้าที่เกี่ยวข้องกับคำถาม (อาจว่างได้)
+    ranked: ผลจัดอันดับ TF-IDF ที่คำนวณไว้แล้วด้วย index (จาก find_related_products_batch)"""
+    import pandas as pd
+    if index is None:
+        index = _product_index()  # ใช้ดัชนีตัวเดียวตลอด (df กับผลจัดอันดับต้องเป็นรุ่นเดียวกัน)
+    df = index.df
     if df.empty:
         return df
 
@@ -148,7 +301,8 @@ def find_related_products(question: str, max_rows: int = MAX_PRODUCTS_TO_SHOW) -
             return exact_hit.head(max_rows).reset_index(drop=True)
 
     # 2) ไม่พบ ID → ใช้ TF-IDF จัดอันดับความใกล้เคียง
-    ranked = _tfidf_rank_products(question, df, topk=max_rows)
+    if ranked is None:
+        ranked = index.rank(question, topk=max_rows)
     if not ranked:
         return pd.DataFrame(columns=df.columns)
     take_idxs = [i for i, _ in ranked]
@@ -161,7 +315,7 @@ def _mk_link_cell(url: str) -> str:
         return f"[link]({u})"
     return "ไม่พบข้อมูล"
 
-def _products_to_markdown_table(pdf: pd.DataFrame) -> str:
+def _products_to_markdown_table(pdf: "pd.DataFrame") -> str:
     if pdf.empty:
         return ""
     header = "| ID | ชื่อสินค้า | ศูนย์ | link |\n|---|---|---|---|"
@@ -174,27 +328,124 @@ def _products_to_markdown_table(pdf: pd.DataFrame) -> str:
 
 # =========================================================================================
 
-# Function to answer the question based on the context (เดิม + แนบสินค้า)
-def answer_question(question: str):
-    # 1) ระบบเดิม: หา context จากเว็บ TISTR แล้วให้ LLaMA ตอบ
-    context = find_best_context(question)
-    if not context:
-        base_answer = "❌ ไม่พบเนื้อหาที่เกี่ยวข้องในฐานข้อมูล"
-        product_df = find_related_products(question)
-        product_block = _products_to_markdown_table(product_df)
-        if product_block:
-            return f"{base_answer}\n\n---\n\n**สินค้า/บริการที่อาจเกี่ยวข้องกับคำถามคุณ:**\n\n{product_block}"
-        return base_answer
-
-    html_content = context.get("HTML", "")[:10000]
-    prompt = build_prompt(question, html_content, context)
-    reply = ask_llama(prompt)
-    base_answer = f"{reply.strip()}\n\n🔗 อ้างอิง: {context.get('URL', 'ไม่พบ URL')}"
-
-    # 2) NEW: แนบ “ลิสต์สินค้า” เพิ่มเติม ถ้าดูมีความเกี่ยวข้องกับคำถาม
-    product_df = find_related_products(question)
+def _no_context_answer(question: str, product_df: "pd.DataFrame" = None) -> str:
+    base_answer = "❌ ไม่พบเนื้อหาที่เกี่ยวข้องในฐานข้อมูล"
+    if product_df is None:
+        with span("products"):
+            product_df = find_related_products(question)
     product_block = _products_to_markdown_table(product_df)
     if product_block:
-        base_answer += f"\n\n---\n\n**สินค้า/บริการที่เกี่ยวข้อง:**\n\n{product_block}"
-
+        return f"{base_answer}\n\n---\n\n**สินค้า/บริการที่อาจเกี่ยวข้องกับคำถามคุณ:**\n\n{product_block}"
     return base_answer
+
+def answer_prompt(question: str, chunks: List[Tuple[dict, float]]) -> str:
+    """user message ของคำถาม (ใช้คู่กับ system=ANSWER_SYSTEM_PROMPT)"""
+    context = _doc_store().meta(str(chunks[0][0].get("ID"))) or {}  # metadata ของหน้าที่ตรงที่สุด
+    return build_prompt(question, _chunks_to_context(chunks, context_budget(question, context)), context)
+
+def answer_cache_key(question: str, chunks: List[Tuple[dict, float]]) -> str:
+    # chunk ตามลำดับ (ID + hash ของเนื้อหา + ช่วงข้อความ): หน้าที่ถูกแก้หลัง crawl หรือ chunk คนละชุด
+    # จากหน้าเดียวกันจะไม่ได้คำตอบที่สร้างจาก context อื่น
+    store = _doc_store()
+    passages = [(c.get("ID", ""), (store.digest(c.get("ID", "")) or "")[:12], c.get("start"), c.get("end"))
+                for c, _ in chunks]
+    return make_key(normalize_question(question), passages, LLM_MODEL, PROMPT_TEMPLATE_VERSION)
+
+def _answer_suffix(question: str, chunks: List[Tuple[dict, float]], product_df: "pd.DataFrame" = None) -> str:
+    """ส่วนท้ายคำตอบ: ลิงก์อ้างอิง + ตารางสินค้าที่เกี่ยวข้อง"""
+    suffix = f"\n\n🔗 อ้างอิง: {', '.join(_chunk_urls(chunks)) or 'ไม่พบ URL'}"
+
+    # NEW: แนบ “ลิสต์สินค้า” เพิ่มเติม ถ้าดูมีความเกี่ยวข้องกับคำถาม
+    if product_df is None:
+        with span("products"):
+            product_df = find_related_products(question)
+    product_block = _products_to_markdown_table(product_df)
+    if product_block:
+        suffix += f"\n\n---\n\n**สินค้า/บริการที่เกี่ยวข้อง:**\n\n{product_block}"
+    return suffix
+
+# Function to answer the question based on the context (เดิม + แนบสินค้า)
+# แต่ละขั้นตอนถูกจับเวลาเป็น span ของ trace "answer_question" (ดู tracing.py / แผง Debug ใน app.py)
+def answer_question(question: str):
+    with trace("answer_question", question=question) as t, pinned_snapshot() as snap:
+        t.set(data_version=snap.version)
+        # 1) หา chunk ที่เกี่ยวข้องจากเว็บ TISTR แล้วให้ LLaMA ตอบ
+        with span("retrieve") as s:
+            chunks = find_best_chunks(question)
+            s.set(chunks=len(chunks))
+        if not chunks:
+            with span("compose"):
+                return _no_context_answer(question)
+
+        with span("cache_lookup") as s:
+            key = answer_cache_key(question, chunks)
+            reply = answer_cache.get(key)
+            s.set(hit=reply is not None)
+        t.set(cache_hit=reply is not None)
+        if reply is None:
+            with span("prompt") as s:
+                prompt = answer_prompt(question, chunks)
+                s.set(chars=len(prompt), tokens=token_counter()(prompt))
+            reply = ask_llama(prompt, model=LLM_MODEL, system=ANSWER_SYSTEM_PROMPT)
+            answer_cache.set(key, question, reply)
+        # 2) แนบลิงก์อ้างอิงและสินค้าที่เกี่ยวข้อง
+        with span("compose"):
+            return compose_answer(question, chunks, reply)
+
+def compose_answer(question: str, chunks: List[Tuple[dict, float]], reply: str,
+                   product_df: "pd.DataFrame" = None) -> str:
+    """คำตอบเต็ม = คำตอบของ LLM + ลิงก์อ้างอิง + ตารางสินค้า (ไม่มี chunk = คำตอบแบบไม่พบเนื้อหา)"""
+    if not chunks:
+        return _no_context_answer(question, product_df)
+    return reply.strip() + _answer_suffix(question, chunks, product_df)
+
+# เหมือน answer_question แต่ yield คำตอบทีละส่วน (ใช้กับ st.write_stream)
+def answer_question_stream(question: str) -> Iterator[str]:
+    with trace("answer_question", question=question, stream=True) as t, pinned_snapshot() as snap:
+        t.set(data_version=snap.version)
+        with span("retrieve") as s:
+            chunks = find_best_chunks(question)
+            s.set(chunks=len(chunks))
+        if not chunks:
+            with span("compose"):
+                text = _no_context_answer(question)
+            yield text
+            return
+
+        with span("cache_lookup") as s:
+            key = answer_cache_key(question, chunks)
+            reply = answer_cache.get(key)
+            s.set(hit=reply is not None)
+        t.set(cache_hit=reply is not None)
+        if reply is not None:
+            yield reply
+        else:
+            with span("prompt") as s:
+                prompt = answer_prompt(question, chunks)
+                s.set(chars=len(prompt), tokens=token_counter()(prompt))
+            parts = []
+            for piece in ask_llama_stream(prompt, model=LLM_MODEL, system=ANSWER_SYSTEM_PROMPT):
+                parts.append(piece)
+                yield piece
+            # เก็บลงแคชเมื่อ stream จบครบเท่านั้น
+            answer_cache.set(key, question, "".join(parts).strip())
+        with span("compose"):
+            suffix = _answer_suffix(question, chunks)
+        yield suffix
+
+# ================================== BATCH (ดู batch_qa.py) ==================================
+
+def find_best_chunks_batch(questions: List[str], k: int = TOP_K_CHUNKS,
+                           token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[List[Tuple[dict, float]]]:
+    """find_best_chunks ของหลายคำถาม ด้วยการคูณ sparse matrix ครั้งเดียว"""
+    retriever = _retriever()
+    if retriever is None:
+        return [[] for _ in questions]
+    return retriever.search_many(questions, k=k, token_budget=token_budget)
+
+def find_related_products_batch(questions: List[str],
+                                max_rows: int = MAX_PRODUCTS_TO_SHOW) -> List["pd.DataFrame"]:
+    """find_related_products ของหลายคำถาม (จัดอันดับ TF-IDF ทุกคำถามในการคูณครั้งเดียว)"""
+    index = _product_index()
+    ranked = index.rank_many(questions, topk=max_rows)
+    return [find_related_products(q, max_rows, ranked=r, index=index) for q, r in zip(questions, ranked)]
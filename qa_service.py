@@ -0,0 +1,395 @@
+# qa_service.py
+# บริการ HTTP แบบ async ครอบ qa_engine สำหรับรับคำถามพร้อมกันหลาย session
+# - ค้นเอกสาร/สินค้าแบบ micro-batch: คำถามที่เข้ามาในช่วง --batch-window-ms เดียวกันค้นด้วยการคูณเมทริกซ์ครั้งเดียว
+# - คิวงาน LLM มีขนาดจำกัด (--queue-size): คิวเต็มตอบ 503 + Retry-After แทนการรับงานเพิ่มไม่จำกัด
+# - เรียก Ollama พร้อมกันไม่เกิน --workers งาน, แต่ละคำขอมีเวลารอสูงสุด (--timeout)
+# - คำถามที่ได้คีย์แคชเดียวกันและกำลังรอ LLM อยู่ จะรอคำตอบเดียวกัน (ไม่เรียก LLM ซ้ำ)
+# - โหลดเอกสาร/สินค้าใหม่เมื่อไฟล์เปลี่ยน (qa_engine.start_data_watcher) งานที่ค้างอยู่ใช้ข้อมูลรุ่นที่ค้นได้จนจบ
+#
+#   python qa_service.py --port 8080 --workers 2
+#   curl -X POST localhost:8080/answer -d '{"question": "บริการตรวจวิเคราะห์มีอะไรบ้าง"}'
+#   curl localhost:8080/metrics       # ความยาวคิว, จำนวนงาน, เวลาแฝง (Prometheus text format)
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+import qa_engine
+from metrics import REGISTRY, Registry
+from ollama_utils import ask_llama
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 2          # จำนวนการเรียก Ollama พร้อมกันสูงสุด
+DEFAULT_QUEUE_SIZE = 64      # จำนวนงาน LLM ที่รอคิวได้สูงสุด
+DEFAULT_TIMEOUT = 120.0      # วินาทีที่คำขอหนึ่งรอคำตอบได้ (รวมเวลาในคิว)
+DEFAULT_BATCH_WINDOW = 0.005
+DEFAULT_MAX_BATCH = 32
+MAX_POPULAR = 100            # จำนวนคำถามยอดนิยมสูงสุดที่ /popular คืนได้
+
+logger = logging.getLogger("qa.service")
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class _Job:
+    key: str
+    question: str
+    chunks: list
+    deadline: float              # เวลาที่ผู้รอคนสุดท้ายเลิกรอ (ขยายเมื่อมีคำขอใหม่มารอผลเดียวกัน)
+    future: asyncio.Future
+    snapshot: object = None  # ข้อมูลรุ่นที่ใช้ค้น chunks (สร้าง prompt จากรุ่นเดียวกัน)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class _RetrievalBatcher:
+    """รวมคำถามที่เข้ามาใกล้กันเป็นชุดเดียว แล้วเรียก find_*_batch ครั้งเดียวใน thread แยก"""
+
+    def __init__(self, executor: ThreadPoolExecutor, window: float, max_batch: int, service: "QAService"):
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.service = service
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def retrieve(self, question: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((question, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        questions = [q for q, _ in batch]
+        self.service.m_batch_size.observe(len(batch))
+        t0 = time.perf_counter()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, _retrieve_batch, questions)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.service.m_retrieve.observe(time.perf_counter() - t0)
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+
+def _retrieve_batch(questions: List[str]) -> List[tuple]:
+    """[(chunks, สินค้า, คีย์แคช, ข้อมูลรุ่นที่ใช้)] ของแต่ละคำถาม (คีย์เป็น None ถ้าไม่พบเนื้อหา)"""
+    with qa_engine.pinned_snapshot() as snapshot:
+        chunks_list = qa_engine.find_best_chunks_batch(questions)
+        products_list = qa_engine.find_related_products_batch(questions)
+        return [(chunks, products, qa_engine.answer_cache_key(q, chunks) if chunks else None, snapshot)
+                for q, chunks, products in zip(questions, chunks_list, products_list)]
+
+
+def _generate(question: str, chunks: list, snapshot=None) -> str:
+    with qa_engine.pinned_snapshot(snapshot):
+        prompt = qa_engine.answer_prompt(question, chunks)
+    return ask_llama(prompt, model=qa_engine.LLM_MODEL, system=qa_engine.ANSWER_SYSTEM_PROMPT)
+
+
+class QAService:
+    """ตัวจัดคิวคำถาม: ค้นแบบ micro-batch -> แคช -> dedupe -> คิว LLM ที่จำกัดขนาด"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH, registry: Registry = REGISTRY):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.registry = registry
+        self._queue: Optional[asyncio.Queue] = None
+        self._inflight: Dict[str, _Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._llm_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+        self._cpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieve")
+        self._batcher: Optional[_RetrievalBatcher] = None
+
+        r = registry
+        self.m_requests = r.counter("qa_requests_total", "Questions received")
+        self.m_cache_hits = r.counter("qa_cache_hits_total", "Answers served from the answer cache")
+        self.m_deduped = r.counter("qa_deduplicated_total", "Questions that joined an identical in-flight LLM job")
+        self.m_rejected = r.counter("qa_rejected_total", "Questions rejected because the LLM queue was full")
+        self.m_timeouts = r.counter("qa_timeouts_total", "Questions that exceeded the request timeout")
+        self.m_errors = r.counter("qa_errors_total", "Questions that failed with an error")
+        self.m_llm_calls = r.counter("qa_llm_calls_total", "LLM generations started")
+        self.m_queue_depth = r.gauge("qa_llm_queue_depth", "LLM jobs waiting in the queue")
+        self.m_llm_active = r.gauge("qa_llm_active", "LLM generations running now")
+        self.m_inflight = r.gauge("qa_inflight_jobs", "Distinct LLM jobs queued or running")
+        self.m_latency = r.histogram("qa_request_seconds", "End-to-end latency of /answer")
+        self.m_queue_wait = r.histogram("qa_llm_queue_wait_seconds", "Time an LLM job waited in the queue")
+        self.m_llm = r.histogram("qa_llm_seconds", "Duration of one LLM generation")
+        self.m_retrieve = r.histogram("qa_retrieve_batch_seconds", "Duration of one retrieval micro-batch")
+        self.m_batch_size = r.histogram("qa_retrieve_batch_size", "Questions per retrieval micro-batch",
+                                        buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+    # ----------------------------- lifecycle -----------------------------
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._batcher = _RetrievalBatcher(self._cpu_executor, self.batch_window, self.max_batch, self)
+        # โหลดดัชนี/ตัวตัดคำก่อนรับคำขอแรก
+        await asyncio.get_running_loop().run_in_executor(self._cpu_executor, qa_engine.warm_up)
+        qa_engine.start_data_watcher()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        qa_engine.stop_data_watcher()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._llm_executor.shutdown(wait=False)
+        self._cpu_executor.shutdown(wait=False)
+
+    # ----------------------------- คำถาม -----------------------------
+    async def answer(self, question: str) -> dict:
+        """คำตอบเต็ม + ข้อมูลประกอบ; raise QueueFull / asyncio.TimeoutError"""
+        self.m_requests.inc()
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        try:
+            chunks, products, key, snapshot = await asyncio.wait_for(self._batcher.retrieve(question),
+                                                                     self.timeout)
+            info = {"cached": False, "deduplicated": False}
+            if chunks:
+                reply = qa_engine.answer_cache.get(key)
+                if reply is not None:
+                    self.m_cache_hits.inc()
+                    info["cached"] = True
+                else:
+                    job = self._inflight.get(key)
+                    if job is not None:
+                        self.m_deduped.inc()
+                        info["deduplicated"] = True
+                        job.deadline = max(job.deadline, deadline)
+                    else:
+                        job = self._submit(key, question, chunks, deadline, snapshot)
+                    # shield: คำขอนี้หมดเวลาได้โดยไม่ยกเลิกงานที่คำขออื่นรออยู่
+                    reply = await asyncio.wait_for(asyncio.shield(job.future),
+                                                   max(0.0, deadline - time.perf_counter()))
+            else:
+                reply = ""
+            # ตารางสินค้า (iterrows/markdown) ทำใน thread เพื่อไม่บล็อก event loop
+            answer = await asyncio.get_running_loop().run_in_executor(
+                self._cpu_executor, qa_engine.compose_answer, question, chunks, reply, products)
+        except asyncio.TimeoutError:
+            self.m_timeouts.inc()
+            raise
+        except QueueFull:
+            self.m_rejected.inc()
+            raise
+        except Exception:
+            self.m_errors.inc()
+            raise
+        finally:
+            self.m_latency.observe(time.perf_counter() - started)
+        return {
+            "question": question,
+            "answer": answer,
+            "doc_ids": [c.get("ID") for c, _ in chunks],
+            "data_version": snapshot.version,
+            "latency_s": round(time.perf_counter() - started, 4),
+            **info,
+        }
+
+    def _submit(self, key: str, question: str, chunks: list, deadline: float, snapshot=None) -> _Job:
+        job = _Job(key, question, chunks, deadline, asyncio.get_running_loop().create_future(), snapshot=snapshot)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"LLM queue is full ({self.queue_size} jobs waiting)")
+        self._inflight[key] = job
+        self.m_inflight.set(len(self._inflight))
+        self.m_queue_depth.set(self._queue.qsize())
+        return job
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self.m_queue_depth.set(self._queue.qsize())
+            try:
+                self.m_queue_wait.observe(time.perf_counter() - job.enqueued)
+                remaining = job.deadline - time.perf_counter()
+                if remaining <= 0:
+                    # ผู้ถามเลิกรอไปแล้ว ไม่ต้องเรียก LLM
+                    job.future.set_exception(asyncio.TimeoutError())
+                    continue
+                self.m_llm_calls.inc()
+                self.m_llm_active.inc()
+                t0 = time.perf_counter()
+                llm = loop.run_in_executor(self._llm_executor, _generate, job.question, job.chunks, job.snapshot)
+                try:
+                    reply = await self._until_deadline(job, llm)
+                except asyncio.TimeoutError:
+                    # ผู้รอได้ 504 ทันที แต่ worker นี้ไม่รับงานใหม่จนกว่า thread จะเรียก LLM เสร็จจริง
+                    # (ไม่อย่างนั้นงานถัดไปไปค้างในคิวไม่จำกัดของ executor หลัง LLM ที่ยังรันอยู่ ข้ามขนาดคิว/503)
+                    job.future.set_exception(asyncio.TimeoutError())
+                    self._forget(job)
+                    await asyncio.wait({llm})
+                    reply = None if llm.exception() else llm.result()
+                finally:
+                    self.m_llm_active.dec()
+                    self.m_llm.observe(time.perf_counter() - t0)
+                if reply is not None:
+                    qa_engine.answer_cache.set(job.key, job.question, reply)  # ได้หลังหมดเวลาก็ยังเก็บลงแคช
+                if not job.future.done():
+                    job.future.set_result(reply)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._forget(job)
+                # ไม่มีใครรอผลแล้ว: ไม่ต้องเตือน "exception was never retrieved"
+                if job.future.done() and not job.future.cancelled():
+                    job.future.exception()
+                self._queue.task_done()
+
+    def _forget(self, job: _Job) -> None:
+        """ไม่ให้คำขอใหม่มารอผลของงานนี้ (ถ้ายังเป็นงานของคีย์นี้อยู่)"""
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        self.m_inflight.set(len(self._inflight))
+
+    @staticmethod
+    async def _until_deadline(job: _Job, future: asyncio.Future):
+        """รอผลของ future จนถึง job.deadline (อ่านค่าใหม่ทุกรอบ เพราะผู้ที่มารอทีหลังขยายได้)"""
+        # ถ้าเลิกรอ ไม่ต้องเตือน "exception was never retrieved" ของงานที่ยังรันอยู่ใน thread
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        while True:
+            remaining = job.deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({future}, timeout=remaining)
+            if done:
+                return future.result()
+
+    def status(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "inflight": len(self._inflight),
+            "cache": qa_engine.answer_cache.stats(),
+            "data": qa_engine.data_status(),
+        }
+
+
+# ----------------------------- HTTP -----------------------------
+_SERVICE_KEY = web.AppKey("service", QAService)
+
+
+async def _handle_answer(request: web.Request) -> web.Response:
+    service = request.app[_SERVICE_KEY]
+    try:
+        body = await request.json()
+        question = str(body.get("question", "")).strip()
+    except (ValueError, AttributeError):
+        return web.json_response({"error": "expected a JSON object with a 'question' field"}, status=400)
+    if not question:
+        return web.json_response({"error": "question is empty"}, status=400)
+    try:
+        return web.json_response(await service.answer(question))
+    except QueueFull as e:
+        return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        return web.json_response({"error": f"no answer within {service.timeout:g} s"}, status=504)
+    except Exception:
+        logger.exception("/answer failed for question %r", question)
+        return web.json_response({"error": "internal error"}, status=500)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=request.app[_SERVICE_KEY].registry.render(), content_type="text/plain")
+
+
+async def _handle_status(request: web.Request) -> web.Response:
+    service = request.app[_SERVICE_KEY]
+    return web.json_response({**service.status(), "metrics": service.registry.snapshot()})
+
+
+async def _handle_popular(request: web.Request) -> web.Response:
+    try:
+        n = int(request.query.get("n", 5))
+    except ValueError:
+        return web.json_response({"error": "n must be an integer"}, status=400)
+    n = max(1, min(n, MAX_POPULAR))
+    return web.json_response({"questions": qa_engine.answer_cache.top_questions(n),
+                              "cache": qa_engine.answer_cache.stats()})
+
+
+async def _handle_health(request: web.Request) -> web.Response:
+    return web.json_response({"ok": True})
+
+
+def create_app(service: Optional[QAService] = None) -> web.Application:
+    service = service or QAService()
+    app = web.Application()
+    app[_SERVICE_KEY] = service
+
+    async def on_startup(_app):
+        await service.start()
+
+    async def on_cleanup(_app):
+        await service.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/answer", _handle_answer)
+    app.router.add_get("/metrics", _handle_metrics)
+    app.router.add_get("/status", _handle_status)
+    app.router.add_get("/popular", _handle_popular)
+    app.router.add_get("/healthz", _handle_health)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="บริการ HTTP ถาม-ตอบ (ครอบ qa_engine)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="จำนวนการเรียก Ollama พร้อมกันสูงสุด")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="จำนวนงาน LLM ที่รอคิวได้สูงสุด")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="เวลารอคำตอบสูงสุดต่อคำขอ (วินาที)")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW * 1000,
+                        help="เวลารอรวมคำถามเป็นชุดก่อนค้นดัชนี (มิลลิวินาที)")
+    parser.add_argument("--fake", action="store_true", help="ใช้ fake_ollama แทนเซิร์ฟเวอร์ Ollama จริง")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fake_ollama
+        from ollama_utils import set_client
+        set_client(fake_ollama)
+    service = QAService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout,
+                        batch_window=args.batch_window_ms / 1000)
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# retriever.py
+# ตัวค้น chunk ที่สลับได้ (ตั้ง RETRIEVER=tfidf / dense / hybrid)
+# - tfidf   ดัชนี TF-IDF (doc_index) อย่างเดียว ตามเดิม
+# - dense   cosine ของ embedding คำถามกับ embedding ของ chunk (vector_index) ผ่าน ANN
+# - hybrid  รวมคะแนนทั้งสองแบบ: alpha * TF-IDF + (1 - alpha) * dense บน chunk ที่ติดอันดับต้นของฝั่งใดฝั่งหนึ่ง
+#           ช่วยให้คำถามที่ใช้คำต่างจากหน้าเว็บ (คำพ้อง/ถอดความ) ยังค้นเจอ
+# เวกเตอร์ของ chunk คำนวณตอน ingest เท่านั้น ถ้ายังไม่มี (หรือไม่ตรงกับดัชนีปัจจุบัน) จะใช้ TF-IDF แทน
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from doc_index import DocIndex
+
+RETRIEVER_MODE = os.environ.get("RETRIEVER", "tfidf")
+HYBRID_ALPHA = float(os.environ.get("HYBRID_ALPHA", "0.5"))  # น้ำหนักของคะแนน TF-IDF
+# cosine ของ embedding แทบไม่เป็นศูนย์ จึงตัดค่าที่ต่ำกว่านี้ทิ้ง (ไม่งั้นทุกคำถามจะมี "เนื้อหาที่เกี่ยวข้อง")
+DENSE_MIN_SIMILARITY = float(os.environ.get("DENSE_MIN_SIMILARITY", "0.3"))
+DENSE_CANDIDATES = 50  # จำนวน chunk ที่ดึงจากแต่ละฝั่งก่อนรวมคะแนน
+
+Candidates = Tuple[np.ndarray, np.ndarray]  # (แถว chunk, คะแนน)
+
+
+def fuse_scores(lexical: np.ndarray, dense: np.ndarray, alpha: float = HYBRID_ALPHA,
+                min_similarity: float = DENSE_MIN_SIMILARITY) -> np.ndarray:
+    """คะแนน hybrid ของแถวเดียวกัน (dense ต่ำกว่า min_similarity นับเป็น 0)"""
+    return alpha * lexical + (1.0 - alpha) * np.where(dense >= min_similarity, dense, 0.0)
+
+
+def _top_candidates(ids: np.ndarray, scores: np.ndarray, n: int) -> np.ndarray:
+    if len(ids) > n:
+        ids = ids[np.argpartition(-scores, n - 1)[:n]]
+    return ids
+
+
+class Retriever:
+    """ค้น chunk ของคำถาม: คลาสย่อยให้ candidates() แล้วส่วนที่เหลือ (เรียง, งบ token, คะแนนต่อหน้า) ใช้ร่วมกัน"""
+
+    mode = ""
+
+    def __init__(self, index: DocIndex):
+        self.index = index
+
+    def candidates(self, questions: List[str], k: int) -> List[Candidates]:
+        raise NotImplementedError
+
+    def search_many(self, questions: List[str], k: int = 5,
+                    token_budget: Optional[int] = None) -> List[List[Tuple[dict, float]]]:
+        results = []
+        for ids, scores in self.candidates(questions, k):
+            order = np.lexsort((ids, -scores))  # คะแนนเท่ากันเรียงตามแถว (ผลคงที่)
+            results.append(self.index.take(ids[order], scores[order], k, token_budget))
+        return results
+
+    def search(self, question: str, k: int = 5, token_budget: Optional[int] = None) -> List[Tuple[dict, float]]:
+        return self.search_many([question], k, token_budget)[0]
+
+    def scores(self, question: str) -> np.ndarray:
+        """คะแนนของแต่ละหน้า = คะแนนของ chunk ที่ดีที่สุดในหน้านั้น"""
+        ids, scores = self.candidates([question], 1)[0]
+        doc_scores = np.zeros(self.index.n_docs)
+        np.maximum.at(doc_scores, self.index.chunk_doc[ids], scores)
+        return doc_scores
+
+
+class LexicalRetriever(Retriever):
+    mode = "tfidf"
+
+    def candidates(self, questions: List[str], k: int) -> List[Candidates]:
+        scores = self.index.score_matrix(questions)
+        return [(scores.indices[scores.indptr[j]:scores.indptr[j + 1]].astype(np.int64),
+                 scores.data[scores.indptr[j]:scores.indptr[j + 1]]) for j in range(len(questions))]
+
+    def search_many(self, questions, k=5, token_budget=None):
+        return self.index.search_many(questions, k, token_budget)
+
+    def scores(self, question: str) -> np.ndarray:
+        return self.index.scores(question)
+
+
+class DenseRetriever(Retriever):
+    mode = "dense"
+
+    def __init__(self, index: DocIndex, vectors, embedder):
+        super().__init__(index)
+        self.vectors = vectors
+        self.embedder = embedder
+
+    def candidates(self, questions: List[str], k: int) -> List[Candidates]:
+        results = []
+        for query in self.embedder.embed_queries(questions):
+            ids, sims = self.vectors.search(query, max(DENSE_CANDIDATES, 4 * k))
+            keep = sims >= DENSE_MIN_SIMILARITY
+            results.append((ids[keep], sims[keep].astype(np.float64)))
+        return results
+
+
+class HybridRetriever(DenseRetriever):
+    mode = "hybrid"
+
+    def candidates(self, questions: List[str], k: int) -> List[Candidates]:
+        n = max(DENSE_CANDIDATES, 4 * k)
+        lexical = self.index.score_matrix(questions)  # ฝั่ง TF-IDF ของทุกคำถามในการคูณครั้งเดียว
+        results = []
+        for j, query in enumerate(self.embedder.embed_queries(questions)):
+            lo, hi = lexical.indptr[j], lexical.indptr[j + 1]
+            lex_ids, lex_vals = lexical.indices[lo:hi].astype(np.int64), lexical.data[lo:hi]
+            dense_ids, _ = self.vectors.search(query, n)
+            ids = np.union1d(_top_candidates(lex_ids, lex_vals, n), dense_ids)
+            # คะแนนจริงของทั้งสองฝั่งบนทุกแถวที่เป็นตัวเลือก (indices ใน score_matrix เรียงแล้ว)
+            lex = np.zeros(len(ids))
+            if len(lex_ids):
+                pos = np.minimum(np.searchsorted(lex_ids, ids), len(lex_ids) - 1)
+                hit = lex_ids[pos] == ids
+                lex[hit] = lex_vals[pos[hit]]
+            fused = fuse_scores(lex, self.vectors.dot_rows(ids, query).astype(np.float64))
+            keep = fused > 0
+            results.append((ids[keep], fused[keep]))
+        return results
+
+
+def make_retriever(index: DocIndex, mode: str = RETRIEVER_MODE, vectors_dir: Optional[str] = None,
+                   embedder=None) -> Retriever:
+    """Retriever ตาม mode; dense/hybrid ที่ยังไม่มีเวกเตอร์ของดัชนีนี้จะได้ LexicalRetriever"""
+    if mode == "tfidf":
+        return LexicalRetriever(index)
+    if mode not in ("dense", "hybrid"):
+        raise ValueError(f"unknown RETRIEVER mode: {mode}")
+    from vector_index import DOC_VECTORS_DIR, VectorFile, get_embedder
+    vectors = VectorFile.open(vectors_dir or DOC_VECTORS_DIR)
+    if (vectors is None or vectors.meta.get("source_hash") != index.source_hash
+            or len(vectors) != len(index.chunks)):
+        print("⚠️ No embeddings for the current index (run python vector_index.py), using TF-IDF only")
+        return LexicalRetriever(index)
+    embedder = embedder or get_embedder(vectors.meta["model"])
+    return (DenseRetriever if mode == "dense" else HybridRetriever)(index, vectors, embedder)
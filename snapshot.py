@@ -0,0 +1,150 @@
+# snapshot.py
+# ข้อมูลแบบมีรุ่น (versioned snapshot) ที่โหลดใหม่ได้ระหว่างระบบทำงาน โดยไม่ต้องรีสตาร์ท
+# - build(previous, signature) สร้างข้อมูลรุ่นใหม่ (ใช้ส่วนที่ไม่เปลี่ยนจากรุ่นก่อนซ้ำได้)
+# - signature() = ลายเซ็นของไฟล์ต้นทาง (mtime/ขนาด) ถ้าไม่เปลี่ยนจะไม่ build ใหม่
+# - สลับรุ่นแบบ atomic (แทนที่ reference เดียว) งานที่ pin รุ่นเก่าไว้ทำต่อกับรุ่นเก่าจนจบ
+# - start() เปิด thread ที่ตรวจ signature ทุก interval วินาที และโหลดใหม่เมื่อไฟล์นิ่งแล้ว (ไม่เปลี่ยนอีกหนึ่งรอบ)
+# - build ไม่สำเร็จ = ใช้รุ่นเดิมต่อ
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, eq=False)
+class Snapshot(Generic[T]):
+    version: int
+    signature: Hashable
+    data: T
+    created_at: float
+    build_seconds: float
+
+
+class SnapshotManager(Generic[T]):
+    """ถือ Snapshot ปัจจุบัน โหลดครั้งแรกเมื่อถูกเรียก และโหลดใหม่เมื่อ signature เปลี่ยน"""
+
+    def __init__(self, build: Callable[[Optional[Snapshot], Hashable], T], signature: Callable[[], Hashable],
+                 interval: float = 10.0, name: str = "data"):
+        self.build = build
+        self.signature = signature
+        self.interval = interval
+        self.name = name
+        self.last_error: Optional[str] = None
+        self._current: Optional[Snapshot] = None
+        self._lock = threading.Lock()  # build ทีละครั้ง
+        self._listeners: List[Callable[[Snapshot], None]] = []
+        self._pinned: contextvars.ContextVar = contextvars.ContextVar(f"snapshot_{name}", default=None)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------- อ่าน -----------------------------
+    def current(self) -> Snapshot:
+        """รุ่นที่ pin ไว้ใน context นี้ ถ้าไม่มีใช้รุ่นล่าสุด (ครั้งแรกโหลดแบบรอจนเสร็จ)"""
+        snap = self._pinned.get() or self._current
+        if snap is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._build(None, self.signature())
+            snap = self._current
+        return snap
+
+    @contextmanager
+    def pin(self, snapshot: Optional[Snapshot] = None) -> Iterator[Snapshot]:
+        """ใช้รุ่นเดียวตลอดบล็อก (เช่น ทั้งคำถาม) แม้จะมีการสลับรุ่นระหว่างนั้น"""
+        snapshot = snapshot or self.current()
+        token = self._pinned.set(snapshot)
+        try:
+            yield snapshot
+        finally:
+            try:
+                self._pinned.reset(token)
+            except ValueError:  # generator ถูกปิดจาก context อื่น
+                pass
+
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    # ----------------------------- โหลดใหม่ -----------------------------
+    def _build(self, previous: Optional[Snapshot], signature: Hashable) -> Snapshot:
+        t0 = time.perf_counter()
+        data = self.build(previous, signature)
+        return Snapshot(version=(previous.version if previous else 0) + 1, signature=signature, data=data,
+                        created_at=time.time(), build_seconds=time.perf_counter() - t0)
+
+    def reload(self, force: bool = False) -> bool:
+        """สร้างรุ่นใหม่ถ้า signature เปลี่ยน (หรือ force) แล้วสลับ; คืน True ถ้าสลับรุ่น"""
+        with self._lock:
+            previous = self._current
+            signature = self.signature()
+            if previous is not None and not force and signature == previous.signature:
+                return False
+            try:
+                snap = self._build(previous, signature)
+            except Exception as e:
+                if previous is None:
+                    raise
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Reload of {self.name} failed, keeping version {previous.version}: {self.last_error}")
+                return False
+            self._current = snap
+            self.last_error = None
+        print(f"✅ {self.name} {'reloaded' if previous else 'loaded'}: version {snap.version} "
+              f"({snap.build_seconds:.2f}s)")
+        for fn in list(self._listeners):
+            try:
+                fn(snap)
+            except Exception as e:
+                print(f"⚠️ {self.name} reload listener failed: {e}")
+        return True
+
+    def on_swap(self, fn: Callable[[Snapshot], None]) -> None:
+        """เรียก fn(snapshot ใหม่) หลังสลับรุ่นทุกครั้ง (ใน thread ที่โหลดใหม่)"""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    # ----------------------------- เฝ้าไฟล์ -----------------------------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name=f"watch-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _watch(self) -> None:
+        pending = None
+        while not self._stop.wait(self.interval):
+            current = self._current
+            if current is None:
+                continue
+            try:
+                signature = self.signature()
+            except Exception as e:
+                print(f"⚠️ Cannot check {self.name} files: {e}")
+                continue
+            if signature == current.signature:
+                pending = None
+            elif signature != pending:
+                pending = signature  # ไฟล์ยังถูกเขียนอยู่ รอให้นิ่งก่อน
+            else:
+                self.reload()
+                pending = None
+
+    def status(self) -> dict:
+        snap = self._current
+        return {
+            "version": snap.version if snap else 0,
+            "loaded_at": snap.created_at if snap else None,
+            "build_s": round(snap.build_seconds, 3) if snap else None,
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "last_error": self.last_error,
+        }
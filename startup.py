@@ -0,0 +1,91 @@
+# startup.py
+# จับเวลาการเริ่มระบบแยกตามขั้นตอน (import / โหลดข้อมูล) เพื่อติดตาม cold start
+# ส่วนที่หนัก (scipy, pythainlp, pandas, ollama, ดัชนี, CSV สินค้า) โหลดเมื่อถูกใช้ครั้งแรกผ่าน lazy()
+#
+#   python startup.py            # import qa_engine + warm up ทุกส่วน แล้วพิมพ์รายงานเวลา
+#   STARTUP_REPORT=1 streamlit run app.py   # พิมพ์รายงานหลัง warm up ใน log ของเซิร์ฟเวอร์
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """เก็บเวลาของแต่ละขั้นตอน (ชื่อ, วินาที, ระดับซ้อน) ตามลำดับที่เริ่ม; ขั้นตอนย่อยแสดงเยื้องเข้าไป"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float, int]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def phase(self, name: str):
+        depth = getattr(self._local, "depth", 0)
+        with self._lock:
+            slot = len(self.phases)
+            self.phases.append((name, 0.0, depth))
+        self._local.depth = depth + 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            with self._lock:
+                self.phases[slot] = (name, time.perf_counter() - t0, depth)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds, _ in self.phases}
+
+    def report(self) -> str:
+        with self._lock:
+            phases = list(self.phases)
+        rows = [("  " * depth + name, seconds) for name, seconds, depth in phases]
+        rows.append(("total (top-level phases)", sum(s for _, s, d in phases if d == 0)))
+        rows.append(("wall clock since import", time.perf_counter() - _PROCESS_START))
+        width = max(len(n) for n, _ in rows)
+        return "\n".join(f"{name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in rows)
+
+
+STARTUP = StartupTimer()
+
+
+def lazy(phase: str) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """decorator สำหรับฟังก์ชันไม่มีอาร์กิวเมนต์: รันครั้งแรกที่ถูกเรียก (ครั้งเดียว แม้หลาย thread)
+    จับเวลาเป็นขั้นตอน phase แล้วคืนค่าเดิมทุกครั้งถัดไป; reset() ล้างค่าเพื่อโหลดใหม่"""
+    def decorator(fn: Callable[[], T]) -> Callable[[], T]:
+        lock = threading.Lock()
+        state = {}
+
+        @functools.wraps(fn)
+        def wrapper() -> T:
+            if "value" in state:
+                return state["value"]
+            with lock:
+                if "value" not in state:
+                    with STARTUP.phase(phase):
+                        state["value"] = fn()
+            return state["value"]
+
+        def reset() -> None:
+            with lock:
+                state.clear()
+
+        wrapper.reset = reset
+        wrapper.loaded = lambda: "value" in state
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    # ใช้ตัวจับเวลาของโมดูล startup ตัวเดียวกับที่ qa_engine import (ไม่ใช่ของ __main__)
+    from startup import STARTUP as timer
+    with timer.phase("import qa_engine"):
+        import qa_engine
+    qa_engine.warm_up()
+    print(timer.report())
@@ -0,0 +1,48 @@
+# tests/conftest.py
+# ทดสอบแบบออฟไลน์: fake_ollama แทนเซิร์ฟเวอร์ Ollama, ข้อมูลสังเคราะห์ขนาดเล็ก (benchmarks/synthetic.py)
+# ในโฟลเดอร์ชั่วคราว, เว็บจำลองในเครื่อง (benchmarks/local_site.py)
+#
+#   python -m pytest -q
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# ต้องตั้งก่อน import โมดูลของระบบ (อ่านค่าตอน import)
+os.environ["OLLAMA_FAKE"] = "1"
+os.environ["FAKE_OLLAMA_TOKEN_DELAY"] = "0"
+os.environ["RETRIEVER"] = "tfidf"
+os.environ.pop("ANSWER_CACHE_DB", None)
+
+import pytest  # noqa: E402
+
+CORPUS_SCALE = 0.05  # ~24 หน้า / ~31 สินค้า
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(tmp_path_factory):
+    """โฟลเดอร์ที่มี output_data.json / Product List.csv สังเคราะห์ (สร้างครั้งเดียวต่อรอบทดสอบ)"""
+    from synthetic import write_corpus
+    path = tmp_path_factory.mktemp("corpus")
+    write_corpus(str(path), CORPUS_SCALE)
+    return path
+
+
+@pytest.fixture
+def qa(corpus_dir, monkeypatch):
+    """qa_engine ที่ทำงานกับข้อมูลสังเคราะห์ แคชคำตอบว่าง และ client ของ Ollama เป็น fake_ollama"""
+    import ollama_utils
+    import qa_engine
+    from answer_cache import AnswerCache
+    monkeypatch.chdir(corpus_dir)
+    monkeypatch.setattr(ollama_utils, "_client", None)
+    monkeypatch.setattr(qa_engine, "answer_cache", AnswerCache())
+    qa_engine.stop_data_watcher()
+    qa_engine._snapshots.reset()
+    qa_engine._product_index_cache.reset()
+    yield qa_engine
+    qa_engine.stop_data_watcher()
+    qa_engine._snapshots.reset()
+    qa_engine._product_index_cache.reset()
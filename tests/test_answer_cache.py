@@ -0,0 +1,12 @@
+# tests/test_answer_cache.py
+# คีย์แคชคำตอบขึ้นกับ chunk ที่ใช้เป็น context จริง (ไม่ใช่แค่ชุด ID ของหน้า)
+def test_key_depends_on_the_chosen_passages_and_their_order(qa):
+    doc_id = qa.current_snapshot().data.store.ids()[0]
+    a = ({"ID": doc_id, "start": 0, "end": 400}, 0.9)
+    b = ({"ID": doc_id, "start": 400, "end": 800}, 0.8)
+    question = "บริการทดสอบ มีอะไรบ้าง"
+
+    assert qa.answer_cache_key(question, [a]) == qa.answer_cache_key(question, [(dict(a[0]), 0.5)])  # คะแนนไม่มีผล
+    assert qa.answer_cache_key(question, [a]) != qa.answer_cache_key(question, [b])  # หน้าเดียวกันคนละช่วง
+    assert qa.answer_cache_key(question, [a, b]) != qa.answer_cache_key(question, [b, a])
+    assert qa.answer_cache_key(question, [a, b]) != qa.answer_cache_key(question, [a])
@@ -0,0 +1,173 @@
+# tests/test_crawler.py
+# crawler.py และการ crawl แบบ incremental ของ Req.py กับเว็บจำลองในเครื่อง (benchmarks/local_site.py)
+import csv
+import os
+import random
+import time
+
+import pytest
+
+import crawler
+import Req
+from doc_store import DocStore
+from crawler import CrawlMetrics, backoff_delay, crawl_sync
+from local_site import LocalSite
+
+
+def test_per_host_concurrency_is_capped():
+    with LocalSite(latency=0.05) as site:
+        results = crawl_sync([site.url(i) for i in range(24)], per_host=3, max_connections=32)
+    assert [r.status for r in results] == [200] * 24
+    assert 2 <= site.max_active <= 3
+
+
+def test_backoff_delay_is_full_jitter_within_cap():
+    random.seed(0)
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, base=0.5, cap=4.0) for _ in range(200)]
+        assert all(0 <= d <= min(4.0, 0.5 * 2 ** attempt) for d in delays)
+        assert len(set(delays)) > 1  # สุ่มจริง ไม่ใช่ค่าคงที่
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_on_throttle_and_server_errors(status, monkeypatch):
+    calls = []
+
+    def fake_backoff(attempt, base=0.5, cap=30.0):
+        calls.append(attempt)
+        return 0.01
+
+    monkeypatch.setattr(crawler, "backoff_delay", fake_backoff)
+    metrics = CrawlMetrics()
+    with LocalSite() as site:
+        site.script(1, [(status, {}), (status, {})])
+        [result] = crawl_sync([site.url(1)], retries=3, metrics=metrics)
+    assert result.status == 200 and result.error is None
+    assert result.attempts == 3
+    assert metrics.retries == 2
+    assert calls == [0, 1]  # backoff แบบ exponential + jitter ต่อครั้งที่ลองใหม่
+
+
+def test_gives_up_after_last_retry(monkeypatch):
+    monkeypatch.setattr(crawler, "backoff_delay", lambda attempt, base=0.5, cap=30.0: 0.01)
+    with LocalSite() as site:
+        site.script(1, [(503, {})] * 3)
+        [result] = crawl_sync([site.url(1)], retries=3)
+    assert result.status == 503
+    assert result.attempts == 3
+
+
+def test_honors_retry_after(monkeypatch):
+    monkeypatch.setattr(crawler, "backoff_delay", lambda *a, **k: pytest.fail("Retry-After ignored"))
+    with LocalSite() as site:
+        site.script(1, [(429, {"Retry-After": "1"})])
+        [result] = crawl_sync([site.url(1)], retries=3)
+        first, second = site.hits[1]
+    assert result.status == 200
+    assert second - first >= 0.95
+
+
+def test_retry_after_is_capped(monkeypatch):
+    with LocalSite() as site:
+        site.script(1, [(503, {"Retry-After": "120"})])
+        t0 = time.perf_counter()
+        [result] = crawl_sync([site.url(1)], retries=2, backoff_cap=0.2)
+    assert result.status == 200
+    assert time.perf_counter() - t0 < 5
+
+
+def test_etag_304_is_reused_through_page_result():
+    with LocalSite() as site:
+        url = site.url(7)
+        [first] = crawl_sync([url])
+        page = Req._page_result(first.status, first.body, first.headers, first.charset)
+        assert page["status"] == "changed" and page["etag"]
+        state = {k: page[k] for k in ("etag", "last_modified", "hash")}
+
+        headers = Req._conditional_headers(state, has_prev=True)
+        assert headers["If-None-Match"] == page["etag"]
+        [second] = crawl_sync([url], headers_for=lambda u: headers)
+        assert second.status == 304 and site.not_modified == 1
+    again = Req._page_result(second.status, second.body, second.headers, second.charset, state, has_prev=True)
+    assert again == {**state, "status": "unchanged"}
+
+
+def _write_csv(site, n_pages):
+    with open("ข้อมูลลิงก์เว็บ - BIO-INDUSTRIES.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ID", "URL", "Center", "Header", "NamePage", "Tag"])
+        for i in range(n_pages):
+            writer.writerow([f"BIO-{i}", site.url(i), "ศูนย์ทดสอบ", f"หัวข้อ {i}", f"หน้า {i}", "บริการ"])
+
+
+def test_second_incremental_crawl_gets_304s_and_skips_index_rebuild(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    n_pages = 40
+    with LocalSite(words=80) as site:
+        _write_csv(site, n_pages)
+
+        Req.main()
+        assert site.requests == n_pages and site.not_modified == 0
+
+        builds = []
+        monkeypatch.setattr(Req, "build_index", lambda store: builds.append(store))
+        Req.main()
+        assert site.requests == 2 * n_pages
+        assert site.not_modified == n_pages
+    assert builds == []  # ไม่มีหน้าเปลี่ยน = ไม่ fit ดัชนีใหม่
+    changes = Req._load_json(Req.CRAWL_CHANGES_FILE, {})
+    assert len(changes["unchanged"]) == n_pages
+    assert not (changes["added"] or changes["changed"] or changes["removed"])
+
+
+class _Killed(Exception):
+    pass
+
+
+def test_interrupted_crawl_keeps_pages_written_so_far(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    n_pages, n_done = 40, 15
+    real_page_result = Req._page_result
+    seen = []
+
+    def dies_halfway(*args, **kwargs):
+        if len(seen) == n_done:
+            raise _Killed()
+        seen.append(args)
+        return real_page_result(*args, **kwargs)
+
+    with LocalSite(words=80) as site:
+        _write_csv(site, n_pages)
+        monkeypatch.setattr(Req, "_page_result", dies_halfway)
+        with pytest.raises(_Killed):
+            Req.main()
+
+        os.remove(Req.DOCS_STORE_PATH + ".idx")  # เหมือนโปรเซสตายก่อนบันทึก index: อ่านจาก JSONL ได้
+        store = DocStore(Req.DOCS_STORE_PATH)
+        assert len(store) == n_done
+        assert all(store.get_body(doc_id) not in (None, Req.FETCH_FAILED_TEXT) for doc_id in store.ids())
+        assert not os.path.exists(Req.CRAWL_CHANGES_FILE)  # แอปไม่โหลดรอบที่ยังไม่จบ
+
+        # รอบถัดไป: หน้าที่เขียนแล้วได้ 304 (ETag ถูกบันทึกตอนหยุด) ที่เหลือดึงใหม่
+        monkeypatch.setattr(Req, "_page_result", real_page_result)
+        Req.main()
+        assert site.not_modified == n_done
+    assert len(DocStore(Req.DOCS_STORE_PATH)) == n_pages
+    changes = Req._load_json(Req.CRAWL_CHANGES_FILE, {})
+    assert len(changes["added"]) == n_pages - n_done
+
+
+def test_full_reextract_keeps_conditional_headers_for_next_crawl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    n_pages = 20
+    with LocalSite(words=80) as site:
+        _write_csv(site, n_pages)
+        Req.main()
+        before = Req._load_json(Req.CRAWL_STATE_FILE, {})
+
+        Req.main(incremental=False, reextract=True)
+        assert site.requests == n_pages  # reextract ไม่ดึงเว็บ
+        assert Req._load_json(Req.CRAWL_STATE_FILE, {}) == before
+
+        Req.main()
+        assert site.not_modified == n_pages
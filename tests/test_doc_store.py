@@ -0,0 +1,52 @@
+# tests/test_doc_store.py
+# ผู้เขียน DocStore หลายตัว (crawler / แอปที่แปลง output_data.json) และการแปลงตอนแอปเริ่ม
+import json
+import os
+import shutil
+import threading
+
+from doc_store import DocStore, convert_json
+
+
+def test_writers_take_turns_and_see_each_others_records(tmp_path):
+    path = str(tmp_path / "docs.jsonl")
+    first, second = DocStore(path), DocStore(path)  # เปิดพร้อมกัน (เช่น crawler เปิดไว้ตั้งแต่ก่อน fetch)
+    entered = threading.Event()
+
+    def other_writer():
+        with second.writing():
+            entered.set()
+            assert "a" in second  # อ่าน index ใหม่หลังได้ล็อก
+            second.put({"ID": "b", "HTML": "สอง"})
+
+    with first.writing():
+        first.put({"ID": "a", "HTML": "หนึ่ง"})
+        t = threading.Thread(target=other_writer)
+        t.start()
+        assert not entered.wait(0.3)  # รอจนผู้เขียนแรกปล่อยล็อก
+    t.join(5)
+    assert entered.is_set()
+
+    store = DocStore(path)
+    assert store.get_body("a") == "หนึ่ง" and store.get_body("b") == "สอง"
+
+
+def test_startup_converts_output_data_newer_than_store(qa, corpus_dir, tmp_path, monkeypatch):
+    for name in os.listdir(corpus_dir):
+        if os.path.isfile(corpus_dir / name):
+            shutil.copy(corpus_dir / name, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    convert_json("output_data.json")
+
+    with open("output_data.json", encoding="utf-8") as f:
+        records = json.load(f)
+    records[0]["HTML"] = "ข้อความที่แก้ตอนแอปปิดอยู่"
+    with open("output_data.json", "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False)
+    t = os.path.getmtime("output_data.json") - 60
+    os.utime("docs.jsonl", (t, t))  # store เก่ากว่า json ที่เพิ่งแก้
+    assert qa._json_newer()
+
+    store = qa.current_snapshot().data.store
+    assert store.get_body(records[0]["ID"]) == "ข้อความที่แก้ตอนแอปปิดอยู่"
+    assert not qa._json_newer()  # เริ่มรอบหน้าไม่ต้องแปลงซ้ำ
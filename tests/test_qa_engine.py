@@ -0,0 +1,54 @@
+# tests/test_qa_engine.py
+# การค้นเอกสาร/สินค้าใช้ข้อมูลรุ่นเดียวกันตลอดการเรียกหนึ่งครั้ง แม้มีการโหลดรุ่นใหม่ระหว่างนั้น
+# และดัชนี/แคตตาล็อกสินค้าสร้างใหม่เฉพาะใน thread ที่เฝ้าไฟล์
+import os
+import shutil
+import time
+import types
+
+import product_catalog
+from products import detect_encoding
+
+
+def test_product_batch_uses_one_index_across_a_reload(qa, monkeypatch):
+    index = qa._product_index()
+    questions = [index.df["ชื่อสินค้า"].iloc[i] for i in (5, 15, 25)]
+    expected = qa.find_related_products_batch(questions)
+    assert sum(len(e) for e in expected) > len(questions)
+
+    reloaded = types.SimpleNamespace(df=index.df.head(1), rank=lambda *a, **k: [(0, 1.0)])
+    calls = iter([index])
+    monkeypatch.setattr(qa, "_product_index", lambda: next(calls, reloaded))  # สลับรุ่นหลังเรียกครั้งแรก
+    got = qa.find_related_products_batch(questions)
+    assert [g.to_dict("records") for g in got] == [e.to_dict("records") for e in expected]
+
+
+def test_best_context_maps_scores_into_the_same_snapshot(qa, monkeypatch):
+    snap = qa.current_snapshot()
+    doc = qa.find_best_context("บริการทดสอบ")
+    assert doc
+
+    # store ของรุ่นอื่นที่เรียงเอกสารต่างกัน: ต้องไม่ถูกใช้กับคะแนนของ retriever รุ่นนี้
+    other = types.SimpleNamespace(metadata=lambda: list(reversed(snap.data.store.metadata())))
+    monkeypatch.setattr(qa, "_doc_store", lambda: other)
+    with qa.pinned_snapshot(snap):
+        assert qa.find_best_context("บริการทดสอบ") == doc
+
+
+def test_product_index_is_rebuilt_by_the_watcher_not_by_questions(qa, corpus_dir, tmp_path, monkeypatch):
+    shutil.copy(corpus_dir / qa.PRODUCT_CSV_PATH, tmp_path / qa.PRODUCT_CSV_PATH)
+    monkeypatch.chdir(tmp_path)  # แก้ไฟล์สินค้าในสำเนา ไม่กระทบชุดข้อมูลของการทดสอบอื่น
+    monkeypatch.setattr(product_catalog, "_cache", (None, None, None))
+    cache = qa._product_index_cache()
+    index = cache.get()
+    catalog = product_catalog.load_catalog()
+    with open(qa.PRODUCT_CSV_PATH, "a", encoding=detect_encoding(qa.PRODUCT_CSV_PATH)) as f:
+        f.write("BIO-NEW,สินค้าใหม่ทดสอบ,ศูนย์ทดสอบ,\n")
+    os.utime(qa.PRODUCT_CSV_PATH, (time.time() + 5, time.time() + 5))
+
+    assert cache.get() is index  # คำถามไม่รอสร้างดัชนีใหม่
+    assert product_catalog.load_catalog() is catalog
+    assert cache.refresh() and product_catalog.refresh_catalog()
+    assert len(cache.get().df) == len(index.df) + 1
+    assert len(product_catalog.load_catalog().df) == len(catalog.df) + 1
+    assert not cache.refresh() and not product_catalog.refresh_catalog()
@@ -0,0 +1,161 @@
+# tests/test_qa_service.py
+# qa_service กับ fake_ollama: คิวเต็ม (503), หมดเวลา (504), รวมคำถามซ้ำ, micro-batch, /popular และข้อผิดพลาด (500)
+import asyncio
+import threading
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import fake_ollama
+import ollama_utils
+from metrics import Registry
+from qa_service import QAService, create_app
+
+QUESTIONS = ["บริการทดสอบ มีอะไรบ้าง", "ห้องปฏิบัติการ มาตรฐาน", "ปุ๋ย หมัก เกษตร", "สารสกัด สมุนไพร",
+             "เพาะเลี้ยง เนื้อเยื่อ พืช", "จุลินทรีย์ ตัวอย่าง", "ค่าบริการ ติดต่อ", "เครื่องสำอาง วัตถุดิบ"]
+
+
+class CountingClient:
+    """fake_ollama ที่นับจำนวนการ generate (ไม่นับคำขอโหลดโมเดลที่ไม่มีข้อความ)"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, model="", messages=None, **kwargs):
+        if messages:
+            with self._lock:
+                self.calls += 1
+        return fake_ollama.chat(model, messages, **kwargs)
+
+
+@pytest.fixture
+def llm(qa, monkeypatch):
+    """LLM จำลองที่ใช้เวลาตอบ ~1 วินาทีต่อคำถาม"""
+    client = CountingClient()
+    monkeypatch.setattr(ollama_utils, "_client", client)
+    monkeypatch.setattr(fake_ollama, "TOKEN_DELAY", 0.15)
+    return client
+
+
+def _run(service: QAService, scenario):
+    async def main():
+        async with TestClient(TestServer(create_app(service))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_full_queue_returns_503_with_retry_after(llm):
+    service = QAService(workers=1, queue_size=1, timeout=30, registry=Registry())
+
+    async def scenario(client):
+        responses = await asyncio.gather(*(client.post("/answer", json={"question": q}) for q in QUESTIONS[:4]))
+        return [(r.status, r.headers.get("Retry-After")) for r in responses]
+
+    results = _run(service, scenario)
+    rejected = [r for r in results if r[0] == 503]
+    assert rejected and all(retry == "1" for _, retry in rejected)
+    assert any(status == 200 for status, _ in results)
+    assert service.m_rejected.value == len(rejected)
+
+
+def test_deadline_returns_504(llm):
+    service = QAService(workers=1, timeout=0.2, registry=Registry())
+
+    async def scenario(client):
+        resp = await client.post("/answer", json={"question": QUESTIONS[0]})
+        return resp.status, await resp.json()
+
+    status, body = _run(service, scenario)
+    assert status == 504 and "no answer within" in body["error"]
+    assert service.m_timeouts.value == 1
+
+
+def test_identical_questions_make_one_llm_call(llm):
+    service = QAService(workers=2, timeout=30, registry=Registry())
+
+    async def scenario(client):
+        responses = await asyncio.gather(*(client.post("/answer", json={"question": QUESTIONS[0]})
+                                           for _ in range(5)))
+        return [await r.json() for r in responses]
+
+    bodies = _run(service, scenario)
+    assert llm.calls == 1
+    assert len({b["answer"] for b in bodies}) == 1
+    assert sum(b["deduplicated"] for b in bodies) == 4
+
+
+def test_joined_request_keeps_its_own_deadline(llm):
+    service = QAService(workers=1, timeout=0.3, registry=Registry())
+
+    async def scenario(client):
+        first = asyncio.ensure_future(service.answer(QUESTIONS[0]))
+        await asyncio.sleep(0.1)
+        service.timeout = 5.0  # คำขอที่สองรอได้นานกว่าคำขอแรก
+        second = await service.answer(QUESTIONS[0])
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+        return second
+
+    second = _run(service, scenario)
+    assert second["deduplicated"] and second["answer"]
+    assert llm.calls == 1
+
+
+def test_timed_out_generation_keeps_its_worker_busy(llm):
+    service = QAService(workers=1, queue_size=1, timeout=0.3, registry=Registry())
+
+    async def scenario(client):
+        first = await client.post("/answer", json={"question": QUESTIONS[0]})
+        service.timeout = 30.0
+        # LLM ของคำถามแรกยังรันอยู่: worker ยังไม่รับงานใหม่ งานที่สองค้างในคิว (ขนาด 1) งานถัดไปได้ 503
+        second = asyncio.ensure_future(client.post("/answer", json={"question": QUESTIONS[1]}))
+        await asyncio.sleep(0.1)
+        later = await asyncio.gather(second, *(client.post("/answer", json={"question": q}) for q in QUESTIONS[2:4]))
+        return first.status, sorted(r.status for r in later)
+
+    first, later = _run(service, scenario)
+    assert first == 504
+    assert later.count(503) == 2 and later.count(200) == 1
+    assert service.m_llm_active.value == 0
+
+
+def test_micro_batcher_groups_concurrent_questions(llm, monkeypatch):
+    monkeypatch.setattr(fake_ollama, "TOKEN_DELAY", 0)
+    service = QAService(workers=2, timeout=30, batch_window=0.05, registry=Registry())
+
+    async def scenario(client):
+        responses = await asyncio.gather(*(client.post("/answer", json={"question": q}) for q in QUESTIONS))
+        return [r.status for r in responses]
+
+    assert _run(service, scenario) == [200] * len(QUESTIONS)
+    assert service.m_batch_size.count == 1
+    assert service.m_batch_size.sum == len(QUESTIONS)
+
+
+@pytest.mark.parametrize("query, status", [("?n=abc", 400), ("?n=-3", 200), ("?n=100000", 200), ("", 200)])
+def test_popular_validates_n(qa, query, status):
+    service = QAService(registry=Registry())
+
+    async def scenario(client):
+        resp = await client.get("/popular" + query)
+        return resp.status
+
+    assert _run(service, scenario) == status
+
+
+def test_internal_error_is_logged_not_returned(llm, monkeypatch, caplog):
+    service = QAService(workers=1, timeout=30, registry=Registry())
+
+    async def broken(question):
+        raise RuntimeError("secret path /srv/data")
+
+    monkeypatch.setattr(service, "answer", broken)
+
+    async def scenario(client):
+        resp = await client.post("/answer", json={"question": QUESTIONS[0]})
+        return resp.status, await resp.json()
+
+    status, body = _run(service, scenario)
+    assert status == 500 and body == {"error": "internal error"}
+    assert "secret path" in caplog.text
@@ -0,0 +1,30 @@
+# tests/test_streaming.py
+# เส้นทาง streaming กับ fake_ollama (OLLAMA_FAKE=1)
+import ollama_utils
+
+QUESTION = "บริการทดสอบ ห้องปฏิบัติการ มีอะไรบ้าง"
+
+
+def test_ask_llama_stream_joins_into_full_answer(monkeypatch):
+    monkeypatch.setattr(ollama_utils, "_client", None)
+    prompt = f"ข้อมูล\n\nคำถาม:\n{QUESTION}\n\nคำตอบ:\n"
+    pieces = list(ollama_utils.ask_llama_stream(prompt))
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == ollama_utils.ask_llama(prompt)
+    assert QUESTION in "".join(pieces)
+
+
+def test_answer_question_stream_caches_streamed_answer(qa):
+    chunks = qa.find_best_chunks(QUESTION)
+    assert chunks
+    pieces = list(qa.answer_question_stream(QUESTION))
+    reply, suffix = "".join(pieces[:-1]), pieces[-1]
+    assert "🔗 อ้างอิง:" in suffix
+
+    key = qa.answer_cache_key(QUESTION, chunks)
+    assert qa.answer_cache.get(key) == reply.strip()
+
+    # ครั้งที่สองตอบจากแคช ได้คำตอบเดียวกับที่ stream ไป
+    hits = qa.answer_cache.hits
+    assert qa.answer_question(QUESTION) == reply.strip() + suffix
+    assert qa.answer_cache.hits == hits + 1
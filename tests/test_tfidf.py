@@ -0,0 +1,40 @@
+# tests/test_tfidf.py
+# tfidf.py ให้ผลเท่ากับ TfidfVectorizer ค่า default (smooth idf, l2) บนคำที่ตัดด้วย thai_analyzer
+# และ store ที่ไม่มีคำใดเลยได้ดัชนีว่างที่ค้นแล้ว "ไม่พบ" แทนการ raise
+import json
+
+import numpy as np
+import pytest
+
+from doc_index import load_or_build
+from doc_store import DocStore
+from tfidf import TfidfModel, fit_tfidf
+from thai_analyzer import analyze, analyze_many
+
+
+def test_matches_sklearn_on_the_fixture_corpus(corpus_dir):
+    text = pytest.importorskip("sklearn.feature_extraction.text")
+    with open(corpus_dir / "output_data.json", encoding="utf-8") as f:
+        token_lists = analyze_many([r["Header"] + "\n" + r["HTML"] for r in json.load(f)])
+    queries = [analyze(q) for q in ["บริการทดสอบ มาตรฐาน", "ปุ๋ยหมัก จุลินทรีย์", "คำที่ไม่มีในเอกสาร"]]
+
+    vocab, idf, matrix = fit_tfidf(token_lists)
+    sk = text.TfidfVectorizer(analyzer=lambda tokens: tokens)
+    expected = sk.fit_transform(token_lists)
+    # sklearn เรียงคอลัมน์ตามตัวอักษร ของเราเรียงตามลำดับที่พบ: เทียบผ่านคำ
+    assert set(vocab) == set(sk.vocabulary_)
+    cols = [vocab[t] for t in sk.get_feature_names_out()]
+    np.testing.assert_allclose(idf[cols], sk.idf_)
+    np.testing.assert_allclose(matrix[:, cols].toarray(), expected.toarray(), atol=1e-12)
+    np.testing.assert_allclose(TfidfModel(vocab, idf).transform(queries)[:, cols].toarray(),
+                               sk.transform(queries).toarray(), atol=1e-12)
+
+
+def test_store_without_any_terms_builds_an_empty_index(tmp_path):
+    with DocStore(str(tmp_path / "docs.jsonl")) as store:
+        store.put({"ID": "1", "HTML": "... !!! ---", "Header": "", "Tag": ""})
+        store.put({"ID": "2", "HTML": "", "Header": "", "Tag": ""})
+    index = load_or_build(DocStore(str(tmp_path / "docs.jsonl")), str(tmp_path / "index"))
+    assert index.search("บริการทดสอบ") == []
+    assert index.search_many(["บริการ", "ปุ๋ย"]) == [[], []]
+    assert not index.scores("บริการ").any()
@@ -0,0 +1,55 @@
+# tests/test_tracing.py
+# trace ของคำถามต้องเป็นของผู้เรียกคนนั้น แม้มีหลาย session ถามพร้อมกัน (แผง debug ใน app.py)
+import contextvars
+import threading
+
+import fake_ollama
+from tracing import span, trace
+
+
+def test_concurrent_sessions_get_their_own_trace(qa, monkeypatch):
+    monkeypatch.setattr(fake_ollama, "TOKEN_DELAY", 0.01)
+    questions = ["บริการทดสอบ มีอะไรบ้าง", "ปุ๋ย หมัก เกษตร", "สารสกัด สมุนไพร", "จุลินทรีย์ ตัวอย่าง"]
+    traces = {}
+    barrier = threading.Barrier(len(questions))
+
+    def session(question):
+        barrier.wait()
+        with trace("app.ask", question=question) as t:
+            qa.answer_question(question)
+        traces[question] = t.as_dict()
+
+    threads = [threading.Thread(target=session, args=(q,)) for q in questions]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    for question, data in traces.items():
+        assert data["question"] == question
+        inner = [s for s in data["spans"] if s["name"] == "answer_question"]
+        assert len(inner) == 1 and inner[0]["question"] == question
+        assert {"retrieve", "llm", "compose"} <= {s["name"] for s in data["spans"]}
+
+
+def test_spans_in_worker_threads_nest_under_their_own_parent():
+    barrier = threading.Barrier(2)
+
+    def work(i):
+        with span(f"worker{i}"):
+            barrier.wait()
+            with span(f"step{i}"):
+                barrier.wait()
+
+    with trace("batch") as t:
+        with span("pool"):
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(work, i)) for i in range(2)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        with span("after"):
+            pass
+
+    depths = {s["name"]: s["depth"] for s in t.as_dict()["spans"]}
+    assert depths == {"pool": 0, "worker0": 1, "worker1": 1, "step0": 2, "step1": 2, "after": 0}
@@ -0,0 +1,65 @@
+# tests/test_vector_index.py
+# การสลับรุ่นของไฟล์เวกเตอร์ (current.json) กับ embedding ของ fake_ollama
+import os
+import threading
+
+import vector_index
+from file_lock import file_lock
+from vector_index import Embedder, VectorFile, build_vectors, text_key
+
+
+def _build(index_dir, texts):
+    embedder = Embedder("fake-embed")
+    return build_vectors(((text_key(embedder.model, t), t) for t in texts), str(index_dir), embedder,
+                         dtype="float32", ann_kind="exact")
+
+
+def test_switch_keeps_previous_version_for_readers(tmp_path):
+    first = _build(tmp_path, ["บริการทดสอบ", "ปุ๋ยหมัก"])
+    second = _build(tmp_path, ["บริการทดสอบ", "ปุ๋ยหมัก", "สารสกัดสมุนไพร"])
+    assert first["version"] != second["version"]
+
+    # ผู้อ่านที่อ่าน current.json ก่อนสลับ (ได้ meta ของรุ่นแรก) ยังเปิดไฟล์ได้
+    reader = VectorFile(str(tmp_path), first)
+    assert len(reader) == 2
+
+    third = _build(tmp_path, ["บริการทดสอบ"])
+    versions = sorted(n for n in os.listdir(tmp_path) if os.path.isdir(tmp_path / n))
+    assert versions == sorted([second["version"], third["version"]])  # ลบเฉพาะรุ่นที่เก่ากว่ารุ่นก่อนหน้า
+    assert VectorFile.open(str(tmp_path)).meta["version"] == third["version"]
+    assert len(VectorFile(str(tmp_path), second)) == 3
+
+
+def test_versions_built_in_the_same_second_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index.time, "strftime", lambda fmt: "20260101-000000")
+    a = _build(tmp_path, ["ก"])
+    b = _build(tmp_path, ["ข"])
+    assert a["version"] != b["version"]
+    assert VectorFile.open(str(tmp_path)).keys == [text_key("fake-embed", "ข")]
+
+
+def test_build_waits_for_another_builder_instead_of_deleting_its_version(tmp_path):
+    _build(tmp_path, ["ก"])
+    _build(tmp_path, ["ข"])
+    partial = tmp_path / "20990101-000000-1-abcdef"  # รุ่นที่ผู้สร้างอื่นกำลังเขียน
+    release, built = threading.Event(), []
+    locked = threading.Event()
+
+    def other_builder():
+        with file_lock(str(tmp_path / ".lock")):
+            partial.mkdir()
+            locked.set()
+            release.wait(5)
+            partial.rename(tmp_path / "unused")  # จำลองว่าสลับไปแล้ว/ย้ายออก
+
+    holder = threading.Thread(target=other_builder)
+    holder.start()
+    locked.wait(5)
+    builder = threading.Thread(target=lambda: built.append(_build(tmp_path, ["ค"])))
+    builder.start()
+    builder.join(0.3)
+    assert builder.is_alive() and partial.is_dir()  # รอล็อก ไม่ลบไดเรกทอรีที่ยังเขียนไม่เสร็จ
+    release.set()
+    holder.join()
+    builder.join(5)
+    assert built and VectorFile.open(str(tmp_path)).meta["version"] == built[0]["version"]
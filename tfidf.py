@@ -0,0 +1,64 @@
+# tfidf.py
+# TF-IDF บนรายการคำที่ตัดไว้แล้ว (ใช้ร่วมกันระหว่างดัชนีเอกสารและดัชนีสินค้า)
+# สูตรเดียวกับ TfidfVectorizer ค่า default (smooth idf, tf ดิบ, normalize แบบ l2) แต่ใช้แค่ numpy/scipy
+# จึงไม่ต้อง import sklearn ทั้งตอน fit และตอนค้น
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def _l2_normalize(matrix: sp.csr_matrix) -> sp.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms) @ matrix)
+
+
+def fit_tfidf(token_lists: Sequence[Sequence[str]]) -> Tuple[Dict[str, int], np.ndarray, sp.csr_matrix]:
+    """vocabulary, idf และเมทริกซ์ TF-IDF (แถวละเอกสาร) ของเอกสารที่ตัดคำแล้ว
+    ไม่มีคำเลย = vocabulary ว่าง และเมทริกซ์ n x 0 (ทุกคำถามได้คะแนน 0 คือไม่พบ) แทนการ raise แบบ sklearn"""
+    vocab: Dict[str, int] = {}
+    rows, cols, vals = [], [], []
+    for r, tokens in enumerate(token_lists):
+        for term, count in Counter(tokens).items():
+            rows.append(r)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            vals.append(count)
+    n = len(token_lists)
+    if not vocab:
+        return vocab, np.zeros(0), sp.csr_matrix((n, 0))
+    tf = sp.csr_matrix((np.asarray(vals, dtype=np.float64), (rows, cols)), shape=(n, len(vocab)))
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+    return vocab, idf, _l2_normalize(tf @ sp.diags(idf))
+
+
+class TfidfModel:
+    """vocabulary + idf ที่ fit แล้ว ใช้แปลงรายการคำ (เช่น คำถาม) เป็นเวกเตอร์"""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray):
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+
+    def transform(self, token_lists: Sequence[Sequence[str]]) -> sp.csr_matrix:
+        rows, cols, vals = [], [], []
+        for r, tokens in enumerate(token_lists):
+            counts = Counter(self.vocabulary_[t] for t in tokens if t in self.vocabulary_)
+            if not counts:
+                continue
+            idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf_[idx]
+            weights /= np.sqrt(np.dot(weights, weights))
+            rows.extend([r] * len(idx))
+            cols.extend(idx.tolist())
+            vals.extend(weights.tolist())
+        return sp.csr_matrix((vals, (rows, cols)), shape=(len(token_lists), len(self.vocabulary_)))
+
+
+def terms_of(vocabulary: Dict[str, int]) -> List[str]:
+    """รายการคำเรียงตาม index ของคอลัมน์"""
+    terms = [""] * len(vocabulary)
+    for term, i in vocabulary.items():
+        terms[i] = term
+    return terms
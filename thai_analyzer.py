@@ -0,0 +1,187 @@
+# thai_analyzer.py
+# ตัวตัดคำที่ใช้ร่วมกันระหว่างดัชนีเอกสาร (doc_index) และดัชนีสินค้า (product_index) ทั้งตอนสร้างดัชนีและตอนค้น
+# - แปลงเลขไทยเป็นเลขอารบิก, ช่องว่างแปลกๆ / zero-width เป็นช่องว่าง, ตัวพิมพ์เล็ก (ความยาวข้อความไม่เปลี่ยน)
+# - ตัดคำด้วย newmm แล้ว normalize สระ/วรรณยุกต์ของแต่ละคำ (pythainlp.util.normalize)
+# - ตัด stop word ไทย (pythainlp) + อังกฤษ, เครื่องหมายวรรคตอน และอักษรตัวเดียว
+# - ผลตัดคำของแต่ละเอกสารเก็บพร้อมตำแหน่งเริ่ม (offset) ใน TokenCache (SQLite) คีย์ด้วย hash ของเนื้อหา
+#   จึงตัดคำใหม่เฉพาะหน้าที่เปลี่ยน และนำไปแบ่งตาม chunk ได้โดยไม่ต้องตัดคำซ้ำ
+# - เอกสารจำนวนมากตัดคำใน process pool (newmm ใช้ CPU ล้วน ถ้าทำใน thread จะติด GIL)
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from startup import lazy
+
+# เพิ่มเลขทุกครั้งที่เปลี่ยนกฎการตัดคำ (ดัชนีและแคชผลตัดคำเดิมจะถูกสร้างใหม่)
+ANALYZER_VERSION = 1
+# ต่ำกว่านี้ตัดคำใน process เดียวเร็วกว่าเปิด process pool (แต่ละ process ต้องโหลดพจนานุกรมเอง)
+MIN_DOCS_FOR_POOL = 64
+
+Span = Tuple[int, str]  # (ตำแหน่งเริ่มในข้อความ, คำที่ normalize แล้ว)
+
+_THAI_DIGITS = "๐๑๒๓๔๕๖๗๘๙"
+_CHAR_MAP = str.maketrans({
+    **{d: str(i) for i, d in enumerate(_THAI_DIGITS)},
+    **{c: " " for c in "\t\r\f\v\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008"
+                        "\u2009\u200a\u200b\u200c\u200d\u2028\u2029\u202f\u205f\u2060\u3000\ufeff"},
+})
+_STRIP_CHARS = "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~“”‘’«»…•·–—ฯ๏๚๛"
+# newmm ไม่ตัดคำภาษาอังกฤษ/ตัวเลขที่ติดเครื่องหมาย เช่น "analysis/testing" จึงแยกเพิ่มตรงนี้
+_SPLIT_RE = re.compile(r"[/\\|&+()\[\]{}<>\"'“”‘’:;!?]+")
+_ENGLISH_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with we you your our their can do does not no".split()
+)
+
+
+@lazy("import pythainlp")
+def _pythainlp():
+    from pythainlp.corpus import thai_stopwords
+    from pythainlp.tokenize import word_tokenize
+    from pythainlp.util import normalize
+    word_tokenize("ทดสอบ", engine="newmm")  # โหลดพจนานุกรม newmm ไว้ก่อน
+    return word_tokenize, normalize, frozenset(thai_stopwords()) | _ENGLISH_STOPWORDS
+
+
+def preload() -> None:
+    """โหลด pythainlp + พจนานุกรมไว้ก่อนคำถามแรก"""
+    _pythainlp()
+
+
+def prenormalize(text: str) -> str:
+    """เลขไทย -> อารบิก, ช่องว่างทุกชนิด -> " ", ตัวพิมพ์เล็ก โดยความยาวเท่าเดิม (offset ยังใช้กับข้อความเดิมได้)"""
+    text = (text or "").translate(_CHAR_MAP)
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else text
+
+
+def word_tokenize(text: str) -> List[str]:
+    """newmm ล้วน (ไม่ตัด stop word) สำหรับส่วนที่ต้องการคำครบ เช่น คีย์แคชคำตอบ"""
+    tokenize, _, _ = _pythainlp()
+    return tokenize(text, engine="newmm")
+
+
+def thai_normalize(text: str) -> str:
+    _, normalize, _ = _pythainlp()
+    return normalize(text)
+
+
+@lru_cache(maxsize=65536)
+def _normalize_token(token: str) -> str:
+    # normalize ทีละคำช้า (~50 µs) แต่คำซ้ำกันมาก จึงจำผลไว้
+    _, normalize, _ = _pythainlp()
+    return normalize(token)
+
+
+def analyze_spans(text: str) -> List[Span]:
+    """คำที่ใช้ทำดัชนีพร้อมตำแหน่งเริ่มใน text"""
+    tokenize, _, stopwords = _pythainlp()
+    spans: List[Span] = []
+    pos = 0
+    # keep_whitespace: คำที่ได้ต่อกันแล้วเท่ากับข้อความเดิมพอดี จึงนับ offset ได้
+    for raw in tokenize(prenormalize(text), engine="newmm", keep_whitespace=True):
+        start = pos
+        pos += len(raw)
+        for part in _SPLIT_RE.split(raw.strip()):
+            token = _normalize_token(part.strip(_STRIP_CHARS))
+            if not token or token in stopwords or (len(token) < 2 and not token.isdigit()):
+                continue
+            spans.append((start, token))
+    return spans
+
+
+def analyze(text: str) -> List[str]:
+    """คำที่ใช้ทำดัชนี/ค้นของข้อความ (คำถาม, ชื่อสินค้า, ...)"""
+    return [token for _, token in analyze_spans(text)]
+
+
+def analyze_spans_many(texts: Sequence[str], workers: Optional[int] = None) -> List[List[Span]]:
+    """analyze_spans ของหลายข้อความ: ถ้ามีมากพอ (และมีหลาย CPU) จะกระจายไปใน process pool"""
+    workers = workers or os.cpu_count() or 1
+    if len(texts) < MIN_DOCS_FOR_POOL or workers == 1:
+        return [analyze_spans(t) for t in texts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze_spans, texts, chunksize=16))
+
+
+def analyze_many(texts: Sequence[str], workers: Optional[int] = None) -> List[List[str]]:
+    return [[token for _, token in spans] for spans in analyze_spans_many(texts, workers)]
+
+
+def text_key(text: str) -> str:
+    """คีย์ของผลตัดคำ: เปลี่ยนเมื่อเนื้อหาหรือ ANALYZER_VERSION เปลี่ยน"""
+    return hashlib.sha1(f"{ANALYZER_VERSION}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """ผลตัดคำ (พร้อม offset) ของแต่ละเอกสารใน SQLite คีย์ด้วย text_key(เนื้อหา)"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, spans TEXT)")
+        self._db.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[Span]]:
+        keys = list(keys)
+        found: Dict[str, List[Span]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # จำกัดจำนวนพารามิเตอร์ต่อคำสั่ง SQL
+                batch = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, spans FROM tokens WHERE key IN ({','.join('?' * len(batch))})", batch)
+                for key, spans in rows:
+                    found[key] = [(start, token) for start, token in json.loads(spans)]
+        return found
+
+    def put_many(self, items: Dict[str, List[Span]]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tokens (key, spans) VALUES (?, ?)",
+                [(key, json.dumps(spans, ensure_ascii=False)) for key, spans in items.items()])
+            self._db.commit()
+
+    def retain(self, keys: Iterable[str]) -> int:
+        """ลบผลตัดคำของเนื้อหาที่ไม่มีในคลังแล้ว คืนจำนวนที่ลบ"""
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS keep (key TEXT PRIMARY KEY)")
+            self._db.execute("DELETE FROM keep")
+            self._db.executemany("INSERT OR IGNORE INTO keep (key) VALUES (?)", ((k,) for k in keys))
+            removed = self._db.execute("DELETE FROM tokens WHERE key NOT IN (SELECT key FROM keep)").rowcount
+            self._db.commit()
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cached_analyze_spans(texts: Sequence[str], cache: Optional[TokenCache] = None,
+                         workers: Optional[int] = None) -> List[List[Span]]:
+    """analyze_spans_many ที่อ่าน/เขียน TokenCache: ตัดคำใหม่เฉพาะข้อความที่ยังไม่เคยเห็น"""
+    keys = [text_key(t) for t in texts]
+    known = cache.get_many(set(keys)) if cache is not None else {}
+    todo: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in known and key not in todo:
+            todo[key] = text
+    if todo:
+        fresh = dict(zip(todo, analyze_spans_many(list(todo.values()), workers)))
+        if cache is not None:
+            cache.put_many(fresh)
+        known.update(fresh)
+    return [known[key] for key in keys]
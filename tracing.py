@@ -0,0 +1,208 @@
+# tracing.py
+# จับเวลาแต่ละขั้นตอนของการตอบคำถาม / การ crawl แบบเบาๆ
+#
+#   with trace("answer_question", question=q) as t:     # 1 trace ต่อ 1 คำถาม (หรือ 1 รอบ crawl)
+#       with span("retrieve"):                          # ขั้นตอนย่อย ซ้อนกันได้
+#           ...
+#       with span("llm", model=m) as s:
+#           s.set(prompt_tokens=..., completion_tokens=...)
+#
+# ผลลัพธ์ของแต่ละ span ไปที่
+# - metrics.REGISTRY: histogram qa_stage_<ชื่อ>_seconds และตัวนับ token ของ LLM (GET /metrics ของ qa_service)
+# - log แบบ JSON หนึ่งบรรทัดต่อ trace ผ่าน logger "qa.trace" (ตั้ง QA_TRACE_LOG=ไฟล์ หรือ - สำหรับ stderr)
+# - cProfile หนึ่งไฟล์ต่อ trace ถ้าตั้ง QA_PROFILE_DIR (เปิดด้วย python -m pstats หรือ snakeviz)
+# - last_trace() = trace ล่าสุดของทั้งโปรเซส (สคริปต์/CLI) ถ้ามีหลายผู้ใช้ให้ครอบการเรียกด้วย trace() ของตัวเอง
+#   แล้วใช้ Trace ที่ได้ (คำถามข้างในกลายเป็น span ของ trace นั้น) เหมือนแผง debug ใน app.py
+# span ที่อยู่นอก trace (เช่นใน thread ของ qa_service) ยังนับลง metrics ตามปกติ
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from metrics import REGISTRY, Registry
+
+PROFILE_DIR = os.environ.get("QA_PROFILE_DIR") or None
+TRACE_LOG = os.environ.get("QA_TRACE_LOG") or None
+
+logger = logging.getLogger("qa.trace")
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("qa_trace", default=None)
+# span ที่เปิดอยู่ของ context นี้ (ความลึกแยกตาม thread/task; thread ที่รันด้วย context ที่ copy มาเริ่มต่อจาก span ของผู้ส่งงาน)
+_parent: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("qa_span", default=None)
+_last_lock = threading.Lock()
+_last: Optional[dict] = None
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "depth", "attrs")
+
+    def __init__(self, name: str, start: float, depth: int, attrs: dict):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.depth = depth
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        """เพิ่มข้อมูลประกอบ เช่น จำนวน token (ค่า None ถูกข้าม)"""
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+
+class Trace:
+    def __init__(self, name: str, attrs: dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration, 6),
+            **self.attrs,
+            "spans": [{"name": s.name, "start_s": round(s.start, 6), "duration_s": round(s.duration, 6),
+                       "depth": s.depth, **s.attrs} for s in self.spans],
+        }
+
+
+def _metric_name(name: str) -> str:
+    return "qa_stage_" + re.sub(r"[^a-zA-Z0-9_]", "_", name) + "_seconds"
+
+
+@contextmanager
+def span(name: str, registry: Registry = REGISTRY, **attrs) -> Iterator[Span]:
+    """ขั้นตอนย่อยภายใน trace ปัจจุบัน (ไม่มี trace = นับแค่ metrics)"""
+    tr = _current.get()
+    parent = _parent.get()
+    t0 = time.perf_counter()
+    s = Span(name, t0 - tr.t0 if tr is not None else 0.0, parent.depth + 1 if parent is not None else 0, dict(attrs))
+    if tr is not None:
+        with tr._lock:
+            tr.spans.append(s)
+    token = _parent.set(s)
+    try:
+        yield s
+    finally:
+        s.duration = time.perf_counter() - t0
+        _reset(_parent, token)
+        registry.histogram(_metric_name(name), f"Duration of the {name} stage").observe(s.duration)
+
+
+@contextmanager
+def trace(name: str, registry: Registry = REGISTRY, **attrs) -> Iterator[Trace]:
+    """เริ่ม trace ใหม่ ถ้าอยู่ใน trace อื่นแล้วจะกลายเป็น span ของ trace นั้นแทน"""
+    outer = _current.get()
+    if outer is not None:
+        with span(name, registry, **attrs):
+            yield outer
+        return
+    tr = Trace(name, dict(attrs))
+    token, parent_token = _current.set(tr), _parent.set(None)
+    profiler = cProfile.Profile() if PROFILE_DIR else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield tr
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        tr.duration = time.perf_counter() - tr.t0
+        _reset(_current, token)
+        _reset(_parent, parent_token)
+        registry.histogram(_metric_name(name), f"Duration of {name}").observe(tr.duration)
+        _finish(tr, profiler)
+
+
+def _reset(var: contextvars.ContextVar, token: contextvars.Token) -> None:
+    try:
+        var.reset(token)
+    except ValueError:  # generator ที่ถูกทิ้งกลางทางแล้วปิดใน context อื่น
+        var.set(None)
+
+
+def _finish(tr: Trace, profiler: Optional[cProfile.Profile]) -> None:
+    global _last
+    if profiler is not None:
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{tr.name}-{tr.trace_id}.prof")
+            profiler.dump_stats(path)
+            tr.set(profile=path)
+        except OSError as e:
+            logger.warning("cannot write profile: %s", e)
+    data = tr.as_dict()
+    with _last_lock:
+        _last = data
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(data, ensure_ascii=False, default=str))
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def last_trace() -> Optional[dict]:
+    """trace ล่าสุดที่จบแล้วในโปรเซสนี้ (dict แบบเดียวกับที่ log)"""
+    with _last_lock:
+        return _last
+
+
+def llm_stats(response) -> dict:
+    """จำนวน token และเวลา prefill / generate จาก metadata ของคำตอบ Ollama (ชิ้นสุดท้ายเมื่อ stream)"""
+    def get(key):
+        try:
+            return response.get(key)
+        except AttributeError:
+            return None
+    ns = 1e-9
+    prompt_tokens, completion_tokens = get("prompt_eval_count"), get("eval_count")
+    prefill, generate, load = get("prompt_eval_duration"), get("eval_duration"), get("load_duration")
+    stats = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "load_s": load * ns if load else None,
+        "prefill_s": prefill * ns if prefill else None,
+        "generate_s": generate * ns if generate else None,
+    }
+    if completion_tokens and generate:
+        stats["tokens_per_s"] = round(completion_tokens / (generate * ns), 1)
+    return {k: v for k, v in stats.items() if v is not None}
+
+
+def count_tokens(stats: dict, registry: Registry = REGISTRY) -> None:
+    """นับ token ของ LLM ลง metrics"""
+    if stats.get("prompt_tokens"):
+        registry.counter("qa_llm_prompt_tokens_total", "Prompt tokens evaluated by the LLM").inc(stats["prompt_tokens"])
+    if stats.get("completion_tokens"):
+        registry.counter("qa_llm_completion_tokens_total",
+                         "Tokens generated by the LLM").inc(stats["completion_tokens"])
+
+
+def configure_logging(target: Optional[str] = TRACE_LOG) -> None:
+    """ส่ง log ของ trace (JSON บรรทัดละ trace) ไปที่ไฟล์ target หรือ stderr ถ้า target เป็น "-" """
+    if not target or logger.handlers:
+        return
+    handler = logging.StreamHandler() if target == "-" else logging.FileHandler(target, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+configure_logging()
@@ -0,0 +1,325 @@
+# vector_index.py
+# เวกเตอร์ embedding ของ chunk เอกสาร / สินค้า สำหรับการค้นแบบ dense และ hybrid (ดู retriever.py)
+# - embedding มาจากโมเดลที่รันในเครื่องผ่าน Ollama (ค่า default: bge-m3 รองรับภาษาไทย) คำนวณตอน ingest เท่านั้น
+#   ตอนถามคำถามจะ embed แค่ตัวคำถาม ถ้ายังไม่มีไฟล์เวกเตอร์ retriever จะใช้ TF-IDF อย่างเดียว
+# - ทำแบบเพิ่มเติม: เวกเตอร์คีย์ด้วย hash ของ (โมเดล, ข้อความ) chunk ที่ข้อความไม่เปลี่ยนคัดลอกจากไฟล์เดิม
+# - เก็บเป็นไฟล์ .npy float32 หรือ int8 (+ scale ต่อแถว) เปิดด้วย np.load(mmap_mode="r") ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ
+# - แต่ละรุ่นอยู่ในโฟลเดอร์ย่อยของตัวเอง แล้วสลับด้วย current.json (เขียนทับแบบ atomic) ผู้อ่านจึงไม่เห็นไฟล์ครึ่งๆ กลางๆ
+#
+#   EMBED_MODEL=bge-m3 EMBED_DTYPE=int8 python vector_index.py   # สร้าง/อัปเดตเวกเตอร์จาก docs.jsonl + CSV สินค้า
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ann import build_ann, load_ann, save_ann
+from chunking import normalize_text
+from doc_index import INDEX_DIR
+from file_lock import file_lock
+from ollama_utils import get_client
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from doc_index import DocIndex
+
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "bge-m3")
+EMBED_DTYPE = os.environ.get("EMBED_DTYPE", "float32")  # float32 หรือ int8 (เล็กกว่า 4 เท่า)
+ANN_KIND = os.environ.get("ANN", "auto")                # auto / exact / ivf / hnsw
+EMBED_BATCH = 32     # ข้อความต่อคำขอ embed
+EMBED_BLOCK = 1024   # ข้อความที่ embed แล้วเขียนลงไฟล์ต่อรอบ
+DOC_VECTORS_DIR = os.path.join(INDEX_DIR, "vectors")
+PRODUCT_VECTORS_DIR = os.path.join(INDEX_DIR, "product_vectors")
+
+_CURRENT_FILE = "current.json"
+_DATA_FILE = "vectors.npy"
+_SCALES_FILE = "scales.npy"
+_KEYS_FILE = "keys.json"
+_LOCK_FILE = ".lock"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 แบบสมมาตรต่อแถว: แถว ≈ q * scale"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class Embedder:
+    """เวกเตอร์ (float32, normalize แล้ว) จากโมเดล embedding ผ่าน ollama_utils.get_client().embed"""
+
+    def __init__(self, model: str = EMBED_MODEL, batch_size: int = EMBED_BATCH, cache_size: int = 1024):
+        self.model = model
+        self.batch_size = batch_size
+        # คำถามเดียวกันถูก embed ครั้งเดียวแม้ใช้ทั้งค้นเอกสารและค้นสินค้า
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        parts = []
+        for i in range(0, len(texts), self.batch_size):
+            resp = get_client().embed(model=self.model, input=list(texts[i:i + self.batch_size]))
+            parts.append(np.asarray(resp["embeddings"], dtype=np.float32))
+        return _normalize_rows(np.vstack(parts)) if parts else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """เวกเตอร์ของคำถาม (embed คำถามที่ยังไม่อยู่ในแคชในคำขอเดียว)"""
+        with self._lock:
+            known = {t: self._cache[t] for t in texts if t in self._cache}
+        missing = [t for t in dict.fromkeys(texts) if t not in known]
+        if missing:
+            known.update(zip(missing, self.embed(missing)))
+            with self._lock:
+                for t in missing:
+                    self._cache[t] = known[t]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.vstack([known[t] for t in texts])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_queries([text])[0]
+
+
+@lru_cache(maxsize=None)
+def get_embedder(model: str = EMBED_MODEL) -> Embedder:
+    """Embedder ที่ใช้ร่วมกันทั้งโปรเซส (แคชเวกเตอร์คำถามร่วมกัน)"""
+    return Embedder(model)
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class VectorFile:
+    """เวกเตอร์รุ่นปัจจุบันในโฟลเดอร์ (memory-mapped) + คีย์ของแต่ละแถว + ANN"""
+
+    def __init__(self, index_dir: str, meta: dict):
+        self.index_dir = index_dir
+        self.meta = meta
+        path = os.path.join(index_dir, meta["version"])
+        self.data = np.load(os.path.join(path, _DATA_FILE), mmap_mode="r")
+        self.scales = (np.load(os.path.join(path, _SCALES_FILE), mmap_mode="r")
+                       if meta["dtype"] == "int8" else None)
+        with open(os.path.join(path, _KEYS_FILE), encoding="utf-8") as f:
+            self.keys: List[str] = json.load(f)
+        self.ann = load_ann(path, self)
+
+    @staticmethod
+    def read_meta(index_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(index_dir, _CURRENT_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, index_dir: str) -> Optional["VectorFile"]:
+        meta = cls.read_meta(index_dir)
+        if not meta:
+            return None
+        try:
+            return cls(index_dir, meta)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def dim(self) -> int:
+        return int(self.data.shape[1])
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    def key_rows(self) -> Dict[str, int]:
+        return {key: i for i, key in enumerate(self.keys)}
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """เวกเตอร์ float32 ของแถวที่ระบุ"""
+        rows = np.asarray(self.data[ids], dtype=np.float32)
+        return rows * self.scales[ids][:, None] if self.scales is not None else rows
+
+    def dot_rows(self, ids: np.ndarray, query: np.ndarray) -> np.ndarray:
+        sims = np.asarray(self.data[ids], dtype=np.float32) @ query
+        return sims * self.scales[ids] if self.scales is not None else sims
+
+    def dot(self, query: np.ndarray, block: int = 65536) -> np.ndarray:
+        """cosine กับทุกแถว (คูณทีละ block เพื่อไม่ให้แปลง int8 ทั้งไฟล์เป็น float32 พร้อมกัน)"""
+        n = len(self)
+        sims = np.empty(n, dtype=np.float32)
+        for lo in range(0, n, block):
+            hi = min(lo + block, n)
+            sims[lo:hi] = np.asarray(self.data[lo:hi], dtype=np.float32) @ query
+        return sims * self.scales if self.scales is not None else sims
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(แถว, cosine) ใกล้คำถามที่สุด k แถวผ่าน ANN"""
+        return self.ann.search(query, k)
+
+
+def build_vectors(keyed_texts: Iterable[Tuple[str, str]], index_dir: str, embedder: Embedder,
+                  dtype: str = EMBED_DTYPE, ann_kind: str = ANN_KIND, full: bool = False, **extra_meta) -> dict:
+    """สร้างเวกเตอร์รุ่นใหม่จาก (คีย์, ข้อความ) ตามลำดับแถว: ใช้เวกเตอร์เดิมของคีย์ที่เคย embed แล้ว
+    embed เฉพาะคีย์ใหม่ (full=True = embed ใหม่ทั้งหมด) แล้วสลับ current.json ไปยังรุ่นใหม่
+    คืน meta ของรุ่นใหม่ (มีจำนวน reused / embedded)
+    ผู้สร้างถือล็อก <index_dir>/.lock ตลอดการสร้าง: ผู้สร้างอื่นรอ จึงไม่ลบไดเรกทอรีรุ่นที่ยังเขียนไม่เสร็จของกันและกัน"""
+    if dtype not in ("float32", "int8"):
+        raise ValueError(f"unsupported EMBED_DTYPE: {dtype}")
+    os.makedirs(index_dir, exist_ok=True)
+    with file_lock(os.path.join(index_dir, _LOCK_FILE)):
+        return _build_version(keyed_texts, index_dir, embedder, dtype, ann_kind, full, extra_meta)
+
+
+def _build_version(keyed_texts: Iterable[Tuple[str, str]], index_dir: str, embedder: Embedder,
+                   dtype: str, ann_kind: str, full: bool, extra_meta: dict) -> dict:
+    prev = None if full else VectorFile.open(index_dir)
+    if prev is not None and prev.meta.get("model") != embedder.model:
+        prev = None
+    prev_rows = prev.key_rows() if prev is not None else {}
+
+    keys: List[str] = []
+    todo: Dict[str, str] = {}  # คีย์ใหม่ -> ข้อความ (เก็บเฉพาะข้อความที่ต้อง embed)
+    for key, text in keyed_texts:
+        keys.append(key)
+        if key not in prev_rows and key not in todo:
+            todo[key] = text
+
+    # embed ทีละก้อนแล้วเขียนลงไฟล์ทันที (ไม่ถือเวกเตอร์ใหม่ทั้งหมดไว้ในหน่วยความจำ)
+    fresh_keys = list(todo)
+    first = embedder.embed([todo[k] for k in fresh_keys[:EMBED_BLOCK]]) if fresh_keys else None
+    dim = prev.dim if prev is not None else (first.shape[1] if first is not None else 0)
+    if first is not None and first.shape[1] != dim:
+        raise ValueError(f"embedding dimension changed ({dim} -> {first.shape[1]}); rebuild with full=True")
+
+    # ชื่อรุ่นไม่ซ้ำกันแม้สร้างหลายครั้งในวินาทีเดียว (ห้ามเขียนทับรุ่นที่ผู้อ่านใช้อยู่)
+    version = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    path = os.path.join(index_dir, version)
+    os.makedirs(path)
+    n = len(keys)
+    out = np.lib.format.open_memmap(os.path.join(path, _DATA_FILE), mode="w+",
+                                    dtype=np.int8 if dtype == "int8" else np.float32, shape=(n, dim))
+    scales = np.ones(n, dtype=np.float32)
+
+    dst_old = np.array([i for i, k in enumerate(keys) if k in prev_rows], dtype=np.int64)
+    for lo in range(0, len(dst_old), EMBED_BLOCK):
+        dst = dst_old[lo:lo + EMBED_BLOCK]
+        src = np.array([prev_rows[keys[i]] for i in dst], dtype=np.int64)
+        _write_rows(out, scales, dst, prev.rows(src), dtype)
+    rows_of: Dict[str, List[int]] = {}
+    for i, k in enumerate(keys):
+        if k in todo:
+            rows_of.setdefault(k, []).append(i)
+    for lo in range(0, len(fresh_keys), EMBED_BLOCK):
+        block = fresh_keys[lo:lo + EMBED_BLOCK]
+        vectors = first if lo == 0 else embedder.embed([todo[k] for k in block])
+        dst = np.array([i for k in block for i in rows_of[k]], dtype=np.int64)
+        src = np.array([j for j, k in enumerate(block) for _ in rows_of[k]], dtype=np.int64)
+        _write_rows(out, scales, dst, vectors[src], dtype)
+    out.flush()
+    del out
+    if dtype == "int8":
+        np.save(os.path.join(path, _SCALES_FILE), scales)
+    with open(os.path.join(path, _KEYS_FILE), "w", encoding="utf-8") as f:
+        json.dump(keys, f)
+
+    meta = {"version": version, "model": embedder.model, "dtype": dtype, "dim": dim, "n": n, **extra_meta}
+    current = VectorFile(index_dir, {**meta, "ann": "exact"})
+    ann = build_ann(current, ann_kind) if n else current.ann
+    save_ann(ann, path)
+    meta["ann"] = ann.kind
+    _switch(index_dir, meta)
+    return {**meta, "reused": len(dst_old), "embedded": len(fresh_keys)}
+
+
+def _write_rows(out: np.ndarray, scales: np.ndarray, dst: np.ndarray, rows: np.ndarray, dtype: str) -> None:
+    if dtype == "int8":
+        out[dst], scales[dst] = quantize_int8(rows)
+    else:
+        out[dst] = rows
+
+
+def _switch(index_dir: str, meta: dict) -> None:
+    """ชี้ current.json ไปยังรุ่นใหม่ แล้วลบรุ่นที่เก่ากว่ารุ่นก่อนหน้า (เรียกขณะถือล็อกของ build_vectors
+    ไดเรกทอรีอื่นจึงเป็นรุ่นเก่าหรือเศษของการสร้างที่ล้มไปแล้วเท่านั้น)
+    รุ่นก่อนหน้าเก็บไว้หนึ่งรุ่น: ผู้อ่านที่เพิ่งอ่าน current.json เดิมยังเปิดไฟล์ได้ (ไฟล์ที่เปิด mmap แล้วอ่านได้เสมอ)"""
+    previous = (VectorFile.read_meta(index_dir) or {}).get("version")
+    tmp = os.path.join(index_dir, f"{_CURRENT_FILE}.{meta['version']}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(index_dir, _CURRENT_FILE))
+    for name in os.listdir(index_dir):
+        old = os.path.join(index_dir, name)
+        if name not in (meta["version"], previous) and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+# ----------------------------- ingest -----------------------------
+def _doc_keyed_texts(index: "DocIndex", store, model: str) -> Iterator[Tuple[str, str]]:
+    # chunk ของหน้าเดียวกันอยู่ติดกันในดัชนี จึงอ่านเนื้อหาแต่ละหน้าจาก DocStore ครั้งเดียว
+    current, body = None, ""
+    for chunk in index.chunks:
+        if chunk["ID"] != current:
+            current = chunk["ID"]
+            body = normalize_text(store.get_body(str(current)) or "")
+        header = chunk.get("Header")
+        text = (header if isinstance(header, str) else "") + "\n" + body[chunk["start"]:chunk["end"]]
+        yield text_key(model, text), text
+
+
+def build_doc_vectors(index: "DocIndex", store, embedder: Optional[Embedder] = None,
+                      index_dir: str = DOC_VECTORS_DIR, **kwargs) -> dict:
+    """เวกเตอร์ของทุก chunk ในดัชนี TF-IDF (แถวตรงกัน) ผูกกับ source_hash ของดัชนี"""
+    embedder = embedder or get_embedder()
+    return build_vectors(_doc_keyed_texts(index, store, embedder.model), index_dir, embedder,
+                         source_hash=index.source_hash, **kwargs)
+
+
+def build_product_vectors(df: "pd.DataFrame", embedder: Optional[Embedder] = None,
+                          index_dir: str = PRODUCT_VECTORS_DIR, **kwargs) -> dict:
+    """เวกเตอร์ของสินค้าแต่ละแถว (ProductIndex จับคู่แถวด้วยคีย์ของข้อความ จึงใช้ได้แม้ CSV เปลี่ยนบางแถว)"""
+    from product_index import product_texts
+    embedder = embedder or get_embedder()
+    texts = product_texts(df)
+    return build_vectors(((text_key(embedder.model, t), t) for t in texts), index_dir, embedder, **kwargs)
+
+
+def ingest(store, index: "DocIndex", products: Optional["pd.DataFrame"] = None, full: bool = False) -> None:
+    """คำนวณ embedding ที่ยังไม่มีของเอกสาร (และสินค้า) หลัง fit ดัชนี TF-IDF (เรียกจาก Req.py)"""
+    jobs = [("doc", lambda: build_doc_vectors(index, store, full=full))]
+    if products is not None:
+        jobs.append(("product", lambda: build_product_vectors(products, full=full)))
+    for name, build in jobs:
+        try:
+            info = build()
+        except Exception as e:  # เซิร์ฟเวอร์ Ollama/โมเดลไม่พร้อม: ยังค้นด้วย TF-IDF ได้ตามเดิม
+            print(f"⚠️ Cannot build {name} embeddings: {e}")
+        else:
+            print(f"✅ {name} embeddings: {info['n']} rows ({info['dtype']}, {info['ann']}), "
+                  f"embedded {info['embedded']}, reused {info['reused']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from doc_index import load_or_build
+    from doc_store import DOCS_STORE_PATH, DocStore
+    from products import PRODUCT_CSV_PATH, load_products
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="embed ใหม่ทั้งหมด (ไม่ใช้เวกเตอร์เดิม)")
+    args = parser.parse_args()
+    with DocStore(DOCS_STORE_PATH) as doc_store:
+        ingest(doc_store, load_or_build(doc_store), load_products(PRODUCT_CSV_PATH), full=args.full)